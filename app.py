@@ -1,5 +1,17 @@
 # app.py
-from flask import Flask, render_template, request, send_file, send_from_directory, session
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    make_response,
+    render_template,
+    request,
+    send_file,
+    send_from_directory,
+    session,
+    stream_with_context,
+)
 from flask_session import Session
 from llm_pipeline.case_generator import generate_case
 from llm_pipeline.character_generator import generate_characters
@@ -10,15 +22,28 @@ from rag.recipes_retriever import (
     load_all_recipes,
     get_menu_for_location,
     get_menu_by_ingredients,
-    Recipe,
 )
 import secrets
 import os
-import zipfile
 from datetime import datetime
-from rag.retriever import RagRetriever
+from rag.registry import get_registry
 from dotenv import load_dotenv
-from image_tool.image_generator import generate_character_image
+from image_tool.image_generator import (
+    PROGRESSIVE_PORTRAITS,
+    generate_character_images,
+    start_progressive_portraits,
+)
+from image_tool.portrait_store import PORTRAIT_STORE_DIR, image_id_from_path, portrait_path
+from llm_pipeline.export_jobs import export_status, get_export, schedule_export
+from llm_pipeline.mystery_store import get_mystery_store
+from llm_pipeline.scheduler import QueueFull, current_job, get_scheduler, tenant_key
+from llm_pipeline.profiling import (
+    NULL_PROFILER,
+    PROFILE_HEADER,
+    StageProfiler,
+    metrics_text,
+    requested_profiles,
+)
 
 # Load .env when running via `python app.py`
 load_dotenv()
@@ -27,6 +52,9 @@ load_dotenv()
 # from image_tool.image_generator import generate_character_image  # Commented out
 
 NUM_CHARACTERS = 7
+RAG_INDEX_PATH = "data/index"
+# Keep a copy of every exported PDF package under outputs/pdfs (off by default)
+PDF_EXPORT_SAVE_COPY = os.environ.get("PDF_EXPORT_SAVE_COPY", "0") == "1"
 
 app = Flask(__name__)
 #app.secret_key = secrets.token_hex(16)
@@ -35,7 +63,7 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-only-change-me")
 
 # Configure Flask-Session for server-side storage
 app.config["SESSION_TYPE"] = "filesystem"
-app.config["SESSION_FILE_DIR"] = "./flask_session"
+app.config["SESSION_FILE_DIR"] = os.environ.get("SESSION_FILE_DIR", "./flask_session")
 app.config["SESSION_PERMANENT"] = False
 app.config["SESSION_USE_SIGNER"] = True
 
@@ -45,15 +73,270 @@ Session(app)
 
 print(" Flask-Session initialized with filesystem storage")
 
+# Load the retrieval index once per process (in the background) and keep it
+# hot-reloaded; requests only read the shared instance. Under `python app.py`
+# the spawned PDF render workers re-import this script as __mp_main__: they
+# serve no requests and must not load the index.
+retriever_registry = get_registry(RAG_INDEX_PATH) if __name__ != "__mp_main__" else None
+
+
+# Opt-in per-request CPU / memory profiles: MYSTERY_PROFILE=1|memory|cpu,memory
+# for every request, or MYSTERY_PROFILE=header for requests sending
+# `X-Mystery-Profile: 1|memory|cpu,memory`
+@app.before_request
+def _start_profiler():
+    modes = requested_profiles(request.headers.get(PROFILE_HEADER))
+    if modes:
+        run_id = f"{datetime.now():%Y%m%d_%H%M%S}_{request.endpoint or 'request'}_{secrets.token_hex(3)}"
+        g.profiler = StageProfiler.for_modes(modes, run_id=run_id)
+
+
+@app.after_request
+def _add_profile_header(response):
+    profiler = g.get("profiler")
+    if profiler is not None:
+        response.headers[PROFILE_HEADER] = profiler.run_id
+    return response
+
+
+@app.teardown_request
+def _write_profile(exc):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.write_summary()
+
+
+def _profiler() -> StageProfiler:
+    return g.get("profiler", NULL_PROFILER)
+
+
+# The session is pickled after the view returns; profile that as its own stage
+_save_session = app.session_interface.save_session
+
+
+def _profiled_save_session(*args, **kwargs):
+    with _profiler().stage("session_save"):
+        return _save_session(*args, **kwargs)
+
+
+app.session_interface.save_session = _profiled_save_session
+
+
+# Admission control: every generation is a job of the LLM scheduler, queued
+# fairly per client and refused with 429 once the queue is full. Clients are
+# told apart by a cookie set with the form (not by address: NAT, proxies)
+CLIENT_COOKIE = "mystery_client"
+
+
+def client_tenant() -> str:
+    return tenant_key(request.cookies.get(CLIENT_COOKIE), request.remote_addr)
+
+
+def queue_full_page(error: QueueFull) -> str:
+    return (
+        f"<h1>Too many mysteries in progress</h1><p>{error} Please try again in "
+        f'{error.retry_after} seconds. <a href="/">Back</a></p>'
+    )
+
+
+@app.before_request
+def _admit_generation():
+    if request.method != "POST" or request.endpoint != "index":
+        return None
+    try:
+        job = get_scheduler().admit(client_tenant(), "interactive")
+    except QueueFull as e:
+        return queue_full_page(e), 429, {"Retry-After": str(e.retry_after)}
+    g.llm_job = (job, current_job.set(job))
+    return None
+
+
+@app.teardown_request
+def _finish_generation(exc):
+    admitted = g.pop("llm_job", None)
+    if admitted is not None:
+        job, token = admitted
+        current_job.reset(token)
+        get_scheduler().finish(job)
+
 
 @app.route("/character_images/<path:filename>")
 def character_images(filename):
     return send_from_directory("image_tool/image_output", filename)
 
 
+@app.route("/portraits/<image_id>.png")
+def portraits(image_id):
+    """Portraits by content ID (see image_tool/portrait_store.py)."""
+    return send_from_directory(PORTRAIT_STORE_DIR, f"{image_id}.png", max_age=31536000)
+
+
+@app.route("/retriever_stats")
+def retriever_stats():
+    """Index load time and memory footprint of the shared retriever."""
+    return jsonify(retriever_registry.stats())
+
+
+@app.route("/metrics")
+def metrics():
+    """Worker memory (RSS, per-stage peaks from memory-profiled requests), session and mystery store size, LLM queue."""
+    session_dir = app.config["SESSION_FILE_DIR"]
+    files = [entry for entry in os.scandir(session_dir) if entry.is_file()] if os.path.isdir(session_dir) else []
+    store = get_mystery_store().stats()
+    llm = get_scheduler().stats()
+    body = metrics_text({
+        "mystery_session_files": ("Files in the session store.", len(files)),
+        "mystery_session_bytes": ("Bytes in the session store.", sum(entry.stat().st_size for entry in files)),
+        "mystery_store_entries": ("Mysteries in the mystery store.", store["mysteries"]),
+        "mystery_store_bytes": ("Compressed bytes in the mystery store.", store["bytes"]),
+        "mystery_llm_calls_running": ("LLM calls being served by the backend.", llm["running_calls"]),
+        "mystery_llm_calls_waiting": ("LLM calls waiting in the scheduler queue.", llm["waiting_calls"]),
+        "mystery_llm_jobs_active": ("Generations admitted by the LLM scheduler.", llm["active_jobs"]),
+        "mystery_llm_jobs_rejected": ("Generations refused with 429 since start.", llm["rejected_jobs"]),
+    })
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/queue_status")
+def queue_status():
+    """Queue position of this client's mystery in progress (polled by the loading page)."""
+    return jsonify(get_scheduler().status(client_tenant()))
+
+
+@app.route("/scheduler_stats")
+def scheduler_stats():
+    """LLM slots in use, queue length and queue wait per priority."""
+    return jsonify(get_scheduler().stats())
+
+
+@app.route("/export_status")
+def export_pdf_status():
+    """Whether the PDF package of the current mystery is still being rendered."""
+    mystery_id = request.args.get("id") or session.get("mystery_id")
+    return jsonify({"status": export_status(mystery_id, get_mystery_store().get(mystery_id))})
+
+
+EXPORT_POLL_SECONDS = 3
+
+
+def export_pending_page(mystery_id: str) -> str:
+    """202 page that polls /export_status and retries the download once the package is ready."""
+    return f"""
+        <h1>Your PDF package is still being prepared</h1>
+        <p>The download starts automatically when it is ready.</p>
+        <script>
+            (function poll() {{
+                fetch("/export_status?id={mystery_id}").then(function (r) {{ return r.json(); }})
+                    .then(function (body) {{
+                        if (body.status === "running") {{ setTimeout(poll, {EXPORT_POLL_SECONDS * 1000}); }}
+                        else {{ window.location = "/export_pdf?id={mystery_id}"; }}
+                    }});
+            }})();
+        </script>
+        """
+
+
+# ----------------------------
+# Pipeline steps shared with the ASGI server (asgi.py)
+# ----------------------------
+def select_menu(location, starter_ingredient, main_ingredient, dessert_ingredient, all_recipes):
+    """Menu from the ingredient preferences, falling back to the location."""
+    if starter_ingredient or main_ingredient or dessert_ingredient:
+        print(
+            f"Searching for recipes with: starter={starter_ingredient}, main={main_ingredient}, dessert={dessert_ingredient}"
+        )
+        return get_menu_by_ingredients(
+            starter_ingredient,
+            main_ingredient,
+            dessert_ingredient,
+            all_recipes,
+            location=location,
+        )
+    print(f"Using location-based menu for: {location}")
+    return get_menu_for_location(location, all_recipes)
+
+
+def menu_names(menu):
+    return {course: menu[course].name if menu[course] else None for course in ["starter", "main", "dessert"]}
+
+
+def attach_portraits(characters):
+    """
+    Generate the portraits and set each character's image path. Returns the
+    futures of the full-quality renders still running in the background.
+    """
+    # Set default image path (since image generation is disabled)
+    for c in characters:
+        c["image_path"] = "/static/placeholder.png"
+
+    full_renders = []
+    if PROGRESSIVE_PORTRAITS:
+        # Fast previews now; full-quality portraits replace them in the
+        # page (and the PDFs) once their background renders finish
+        portraits = start_progressive_portraits(characters)
+        for c, portrait in zip(characters, portraits):
+            preview_id = image_id_from_path(portrait["preview"])
+            c["image_id"] = portrait["image_id"]
+            c["full_image_path"] = f"/portraits/{portrait['image_id']}.png"
+            if preview_id:
+                c["preview_image_id"] = preview_id
+                c["image_path"] = f"/portraits/{preview_id}.png"
+            else:
+                c["image_path"] = "/static/generation_failed.png"
+            full_renders.append(portrait["future"])
+    else:
+        image_paths = generate_character_images(characters)
+        for c, img_file_path in zip(characters, image_paths):
+            image_id = image_id_from_path(img_file_path)
+            if image_id:
+                c["image_id"] = image_id
+                c["image_path"] = f"/portraits/{image_id}.png"
+            elif img_file_path:
+                filename = img_file_path.split(os.sep)[-1]
+                c["image_path"] = f"/character_images/{filename}"
+            else:
+                c["image_path"] = "/static/generation_failed.png"
+    return full_renders
+
+
+def store_mystery(menu, case_data, characters, last_day_data, clues, solution, full_renders):
+    """Store a generated mystery server-side and start its PDF export; returns its ID."""
+    # Convert Recipe objects to dictionaries for storage
+    menu_dict = {}
+    for course in ["starter", "main", "dessert"]:
+        if menu[course]:
+            menu_dict[course] = {
+                "city": menu[course].city,
+                "name": menu[course].name,
+                "ingredients": menu[course].ingredients,
+                "preparation": menu[course].preparation,
+                "source": menu[course].source,
+                "course_type": menu[course].course_type,
+            }
+        else:
+            menu_dict[course] = None
+
+    mystery_data = {
+        "menu": menu_dict,
+        "case_data": case_data,
+        "characters": characters,
+        "last_day_data": last_day_data,
+        "clues": clues,
+        "solution": solution,
+    }
+    mystery_id = secrets.token_hex(8)
+    get_mystery_store().put(mystery_id, mystery_data)
+
+    # Render the PDF package in the background so the download is ready
+    # (or already under way) by the time the user clicks it
+    schedule_export(mystery_id, mystery_data, wait_for=full_renders)
+    return mystery_id
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
+        profiler = _profiler()
         # Get form data
         location = request.form.get("location", "").strip() or "Hamburg"
         theme = (
@@ -67,141 +350,134 @@ def index():
         dessert_ingredient = request.form.get("dessert_ingredient", "").strip()
 
         # Load recipes
-        all_recipes = load_all_recipes()
+        with profiler.stage("load_recipes"):
+            all_recipes = load_all_recipes()
 
         # Get menu based on ingredients with location fallback
-        if starter_ingredient or main_ingredient or dessert_ingredient:
-            print(
-                f"Searching for recipes with: starter={starter_ingredient}, main={main_ingredient}, dessert={dessert_ingredient}"
-            )
-            menu = get_menu_by_ingredients(
-                starter_ingredient,
-                main_ingredient,
-                dessert_ingredient,
-                all_recipes,
-                location=location,
-            )
-        else:
-            print(f"Using location-based menu for: {location}")
-            menu = get_menu_for_location(location, all_recipes)
+        with profiler.stage("menu"):
+            menu = select_menu(location, starter_ingredient, main_ingredient, dessert_ingredient, all_recipes)
 
-        # Initialize RAG retriever
-        retriever = RagRetriever(index_path="data/index")
+        # Shared RAG retriever (loaded at startup, swapped on index rebuilds)
+        retriever = retriever_registry.get()
 
         # Generate case
         print("Generating case...")
-        case_data = generate_case(
-            user_prompt=theme,
-            location=location,
-            menu={
-                "starter": menu["starter"].name if menu["starter"] else None,
-                "main": menu["main"].name if menu["main"] else None,
-                "dessert": menu["dessert"].name if menu["dessert"] else None,
-            },
-        )
+        with profiler.stage("case"):
+            case_data = generate_case(user_prompt=theme, location=location, menu=menu_names(menu))
         print(f"Case generated: {case_data.get('victim_name', 'Unknown')}")
 
         # Generate characters
         print("Generating characters...")
-        characters = generate_characters(
-            case_data=case_data,
-            num_characters=NUM_CHARACTERS,
-            retriever=retriever,
-        )
+        with profiler.stage("characters"):
+            characters = generate_characters(
+                case_data=case_data,
+                num_characters=NUM_CHARACTERS,
+                retriever=retriever,
+            )
         print(f"Generated {len(characters)} characters")
 
-        # Set default image path (since image generation is disabled)
-        for c in characters:
-            c["image_path"] = "/static/placeholder.png"
-
-        # generate images
-        for c in characters:
-            img_file_path = generate_character_image(c)
-            if img_file_path:
-                filename = img_file_path.split(os.sep)[-1]
-                c["image_path"] = f"/character_images/{filename}"
-            else:
-                c["image_path"] = "/static/generation_failed.png"
+        # generate images (concurrently, bounded by SD_MAX_CONCURRENCY)
+        with profiler.stage("portraits"):
+            full_renders = attach_portraits(characters)
 
         # Generate last day
         print("Generating victim's last day...")
-        last_day_data = generate_last_day(case_data=case_data, characters=characters)
+        with profiler.stage("last_day"):
+            last_day_data = generate_last_day(case_data=case_data, characters=characters)
 
         # Generate clues
         print("Generating clues...")
-        clues = generate_clues(
-            case_data=case_data, characters=characters, last_day_data=last_day_data
-        )
+        with profiler.stage("clues"):
+            clues = generate_clues(
+                case_data=case_data, characters=characters, last_day_data=last_day_data
+            )
 
         # Generate solution
         print("Generating solution...")
-        solution = generate_solution(
-            case_data=case_data,
-            characters=characters,
-            last_day_data=last_day_data,
-            clues=clues,
-        )
+        with profiler.stage("solution"):
+            solution = generate_solution(
+                case_data=case_data,
+                characters=characters,
+                last_day_data=last_day_data,
+                clues=clues,
+            )
 
         print("Mystery generation complete!")
 
-        # Convert Recipe objects to dictionaries for session storage
-        menu_dict = {}
-        for course in ["starter", "main", "dessert"]:
-            if menu[course]:
-                menu_dict[course] = {
-                    "city": menu[course].city,
-                    "name": menu[course].name,
-                    "ingredients": menu[course].ingredients,
-                    "preparation": menu[course].preparation,
-                    "source": menu[course].source,
-                    "course_type": menu[course].course_type,
-                }
-            else:
-                menu_dict[course] = None
-
-        # Store mystery data in session
-        session["mystery_data"] = {
-            "menu": menu_dict,
-            "case_data": case_data,
-            "characters": characters,
-            "last_day_data": last_day_data,
-            "clues": clues,
-            "solution": solution,
-        }
-
-        # Debug: Confirm session storage
-        print(" Mystery data stored in session")
-        print(f"Session keys: {list(session.keys())}")
-
-        return render_template(
-            "mystery.html",
-            location=location,
-            menu=menu,
-            case=case_data,
-            characters=characters,
-            last_day=last_day_data,
-            clues=clues,
-            solution=solution,
-        )
+        mystery_id = store_mystery(menu, case_data, characters, last_day_data, clues, solution, full_renders)
+        session["mystery_id"] = mystery_id
+        print(f" Mystery {mystery_id} stored")
+
+        with profiler.stage("render_page"):
+            return render_template(
+                "mystery.html",
+                location=location,
+                menu=menu,
+                case=case_data,
+                characters=characters,
+                last_day=last_day_data,
+                clues=clues,
+                solution=solution,
+                mystery_id=mystery_id,
+            )
+
+    response = make_response(render_template("index.html"))
+    if not request.cookies.get(CLIENT_COOKIE):
+        response.set_cookie(CLIENT_COOKIE, secrets.token_hex(8), httponly=True, samesite="Lax")
+    return response
 
-    return render_template("index.html")
+
+@app.route("/mystery/<mystery_id>")
+def show_mystery(mystery_id):
+    """Shareable page of a stored mystery."""
+    mystery_data = get_mystery_store().get(mystery_id)
+    if mystery_data is None:
+        return (
+            '<h1>Mystery not found</h1><p>It may have expired. <a href="/">Generate a new mystery</a>.</p>',
+            404,
+        )
+    session["mystery_id"] = mystery_id
+    characters = mystery_data["characters"]
+    for c in characters:
+        # Show the full-quality portrait once its background render is done
+        if c.get("full_image_path") and portrait_path(c.get("image_id")):
+            c["image_path"] = c["full_image_path"]
+    return render_template(
+        "mystery.html",
+        location=mystery_data["case_data"].get("location", ""),
+        menu=mystery_data["menu"],
+        case=mystery_data["case_data"],
+        characters=characters,
+        last_day=mystery_data["last_day_data"],
+        clues=mystery_data["clues"],
+        solution=mystery_data["solution"],
+        mystery_id=mystery_id,
+    )
+
+
+def _save_pdf_copies(pdf_files, output_dir):
+    """Pass (filename, bytes) pairs through while writing each PDF to output_dir."""
+    for filename, data in pdf_files:
+        with open(os.path.join(output_dir, filename), "wb") as f:
+            f.write(data)
+        yield filename, data
 
 
 @app.route("/export_pdf")
 def export_pdf():
     """Generate and download complete mystery case as PDF package"""
-    from llm_pipeline.pdf_generator import generate_all_pdfs
-    from datetime import datetime
-    import zipfile
-
-    # Debug: Check session
-    print(f"Session keys in export_pdf: {list(session.keys())}")
+    from llm_pipeline.pdf_cache import get_pdf_cache, tee_into_cache
+    from llm_pipeline.pdf_generator import export_cache_key, iter_rendered_pdfs
+    from llm_pipeline.zip_stream import stream_zip
+    import io
+    import itertools
 
-    # Get mystery data from session
-    mystery_data = session.get("mystery_data")
+    # Shared pages pass the ID explicitly; otherwise use the session's mystery
+    mystery_id = request.args.get("id") or session.get("mystery_id")
+    mystery_data = get_mystery_store().get(mystery_id)
 
     if not mystery_data:
-        print(" No mystery data in session!")
+        print(" No stored mystery for this session!")
         return (
             """
         <h1>Error: No Mystery Data Found</h1>
@@ -211,50 +487,99 @@ def export_pdf():
             400,
         )
 
-    print(" Mystery data found in session")
+    print(f" Exporting mystery {mystery_id}")
 
     # Generate timestamp for unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = f"outputs/pdfs/{timestamp}"
-    os.makedirs(output_dir, exist_ok=True)
 
-    # Reconstruct menu Recipe objects from dictionaries
-    menu = {}
-    for course in ["starter", "main", "dessert"]:
-        if mystery_data["menu"][course]:
-            menu[course] = Recipe(**mystery_data["menu"][course])
-        else:
-            menu[course] = None
+    # The PDF renderer reads the menu in its session (dict) form
+    menu = mystery_data["menu"]
+    profiler = _profiler()
 
     try:
-        # Generate all PDFs
-        print(f"Generating PDFs in {output_dir}...")
-        pdf_files = generate_all_pdfs(
+        if request.args.get("format") == "booklet":
+            # Single PDF with bookmarks; fonts and shared sections embedded once
+            from llm_pipeline.pdf_generator import render_booklet
+
+            with profiler.stage("booklet"):
+                data = render_booklet(
+                    menu=menu,
+                    case_data=mystery_data["case_data"],
+                    characters=mystery_data["characters"],
+                    last_day_data=mystery_data["last_day_data"],
+                    clues=mystery_data["clues"],
+                    solution=mystery_data["solution"],
+                )
+            print(f" Generated booklet ({len(data)} bytes)")
+            return send_file(
+                io.BytesIO(data),
+                mimetype="application/pdf",
+                as_attachment=True,
+                download_name=f"mystery_booklet_{timestamp}.pdf",
+            )
+
+        # Render each PDF in memory and stream it into the ZIP response as soon
+        # as it is ready; a disk copy is only written when asked for.
+        save_copy = request.args.get("save") == "1" or PDF_EXPORT_SAVE_COPY
+        pdf_files = iter_rendered_pdfs(
             menu=menu,
             case_data=mystery_data["case_data"],
             characters=mystery_data["characters"],
             last_day_data=mystery_data["last_day_data"],
             clues=mystery_data["clues"],
             solution=mystery_data["solution"],
-            output_dir=output_dir,
+            # Profiled requests lay out in this process, so the profile covers it
+            workers=0 if profiler.enabled else None,
+        )
+        zip_path = None
+        if save_copy:
+            os.makedirs(output_dir, exist_ok=True)
+            pdf_files = _save_pdf_copies(pdf_files, output_dir)
+            zip_path = f"{output_dir}/mystery_complete.zip"
+            print(f"Saving a copy of the PDFs in {output_dir}")
+
+        download_name = f"mystery_case_{timestamp}.zip"
+        if not save_copy:
+            # Pre-rendered right after generation (by any server process) or
+            # cached by an earlier download; a render still running is polled for
+            with profiler.stage("export_wait"):
+                prerendered = get_export(mystery_id, mystery_data)
+            if prerendered is not None:
+                print(" Serving pre-rendered PDF package")
+                return send_file(
+                    io.BytesIO(prerendered),
+                    mimetype="application/zip",
+                    as_attachment=True,
+                    download_name=download_name,
+                )
+            if export_status(mystery_id, mystery_data) == "running":
+                return export_pending_page(mystery_id), 202, {"Retry-After": str(EXPORT_POLL_SECONDS)}
+
+        pdf_cache = get_pdf_cache()
+        archive_key = export_cache_key(
+            mystery_data["menu"],
+            mystery_data["case_data"],
+            mystery_data["characters"],
+            mystery_data["last_day_data"],
+            mystery_data["clues"],
+            mystery_data["solution"],
         )
 
-        print(f" Generated {len(pdf_files)} PDF files")
-
-        # Create zip file containing all PDFs
-        zip_path = f"{output_dir}/mystery_complete.zip"
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-            for pdf_file in pdf_files:
-                zipf.write(pdf_file, os.path.basename(pdf_file))
-
-        print(f" Created zip file: {zip_path}")
+        # Render the first document up front so early failures still become a 500
+        with profiler.stage("pdf_first"):
+            first = next(pdf_files)
+        print(" Streaming PDF package")
+        body = stream_zip(itertools.chain([first], pdf_files), copy_to=zip_path)
+        body = profiler.iterate("pdf_stream", body)
+        body = tee_into_cache(body, pdf_cache, archive_key)
 
-        # Send the zip file for download
-        return send_file(
-            zip_path,
+        return Response(
+            stream_with_context(body),
             mimetype="application/zip",
-            as_attachment=True,
-            download_name=f"mystery_case_{timestamp}.zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{download_name}"'
+            },
         )
 
     except Exception as e:
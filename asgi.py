@@ -0,0 +1,220 @@
+# asgi.py
+"""
+Production entrypoint: the web app as an ASGI application.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --timeout-graceful-shutdown 600
+
+Mystery generation (`POST /`) runs natively async: the LLM calls are awaited
+on the event loop, and portraits, retrieval and store writes run in worker
+threads, so one worker holds hundreds of in-progress generations. When a
+mystery is done the client is redirected to its shareable `/mystery/<id>`
+page. Every other route is the Flask app, run in a thread pool of
+ASGI_WSGI_THREADS threads through a2wsgi.
+
+On shutdown (SIGTERM) new generations are answered with 503; in-flight ones
+finish, then the background portrait renders and PDF pre-renders are
+drained, for up to ASGI_DRAIN_SECONDS in total, and the PDF render
+workers are stopped.
+"""
+import asyncio
+import os
+import time
+import traceback
+from http.cookies import SimpleCookie
+from typing import Dict, Set
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+from app import (
+    CLIENT_COOKIE,
+    NUM_CHARACTERS,
+    app as flask_app,
+    attach_portraits,
+    queue_full_page,
+    load_all_recipes,
+    menu_names,
+    retriever_registry,
+    select_menu,
+    store_mystery,
+)
+from image_tool.image_generator import drain_background_renders
+from llm_pipeline.case_generator import generate_case_async
+from llm_pipeline.character_generator import generate_characters_async
+from llm_pipeline.clue_generator import generate_clues_async
+from llm_pipeline.export_jobs import drain_exports
+from llm_pipeline.last_day_victim import generate_last_day_async
+from llm_pipeline.pdf_generator import close_render_pool
+from llm_pipeline.scheduler import QueueFull, current_job, get_scheduler, tenant_key
+from llm_pipeline.solution_generator import generate_solution_async
+
+# How long shutdown waits for in-flight generations and background renders
+ASGI_DRAIN_SECONDS = float(os.getenv("ASGI_DRAIN_SECONDS", "600"))
+# Threads serving the Flask routes (page views, portraits, PDF exports)
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+# Largest accepted form body for POST /
+MAX_FORM_BYTES = 64 * 1024
+
+
+async def generate_mystery(form: Dict[str, str]) -> str:
+    """The pipeline of `app.index` with awaited LLM calls; returns the stored mystery's ID."""
+    location = form.get("location", "").strip() or "Hamburg"
+    theme = form.get("theme", "").strip() or "A small coastal town with a controversial political scandal"
+    starter_ingredient = form.get("starter_ingredient", "").strip()
+    main_ingredient = form.get("main_ingredient", "").strip()
+    dessert_ingredient = form.get("dessert_ingredient", "").strip()
+
+    all_recipes = await asyncio.to_thread(load_all_recipes)
+    menu = await asyncio.to_thread(
+        select_menu, location, starter_ingredient, main_ingredient, dessert_ingredient, all_recipes
+    )
+    # Blocks until the first index load has finished
+    retriever = await asyncio.to_thread(retriever_registry.get)
+
+    print("Generating case...")
+    case_data = await generate_case_async(user_prompt=theme, location=location, menu=menu_names(menu))
+    print(f"Case generated: {case_data.get('victim_name', 'Unknown')}")
+
+    print("Generating characters...")
+    characters = await generate_characters_async(
+        case_data=case_data, num_characters=NUM_CHARACTERS, retriever=retriever
+    )
+    print(f"Generated {len(characters)} characters")
+
+    # SD calls are blocking (and bounded by SD_MAX_CONCURRENCY): keep them off the loop
+    full_renders = await asyncio.to_thread(attach_portraits, characters)
+
+    print("Generating victim's last day...")
+    last_day_data = await generate_last_day_async(case_data=case_data, characters=characters)
+    print("Generating clues...")
+    clues = await generate_clues_async(case_data=case_data, characters=characters, last_day_data=last_day_data)
+    print("Generating solution...")
+    solution = await generate_solution_async(
+        case_data=case_data, characters=characters, last_day_data=last_day_data, clues=clues
+    )
+    print("Mystery generation complete!")
+
+    mystery_id = await asyncio.to_thread(
+        store_mystery, menu, case_data, characters, last_day_data, clues, solution, full_renders
+    )
+    print(f" Mystery {mystery_id} stored")
+    return mystery_id
+
+
+# ----------------------------
+# ASGI plumbing
+# ----------------------------
+async def _read_body(receive, limit: int) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        body += message.get("body", b"")
+        if len(body) > limit:
+            raise ValueError("request body too large")
+        if not message.get("more_body"):
+            return body
+
+
+def _client_tenant(scope) -> str:
+    """`app.client_tenant` from the ASGI scope."""
+    cookies = SimpleCookie()
+    for name, value in scope.get("headers", []):
+        if name == b"cookie":
+            cookies.load(value.decode("latin-1"))
+    morsel = cookies.get(CLIENT_COOKIE)
+    client = scope.get("client")
+    return tenant_key(morsel.value if morsel else None, client[0] if client else None)
+
+
+async def _respond(send, status: int, body: bytes = b"", headers=()) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/html; charset=utf-8"), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class MysteryASGI:
+    def __init__(self, wsgi_app):
+        self.flask = WSGIMiddleware(wsgi_app, workers=ASGI_WSGI_THREADS)
+        self.generations: Set[asyncio.Task] = set()
+        self.draining = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == "/":
+            await self._generate(scope, receive, send)
+        else:
+            await self.flask(scope, receive, send)
+
+    async def _generate(self, scope, receive, send) -> None:
+        if self.draining:
+            await _respond(send, 503, b"<h1>Server is shutting down</h1><p>Please try again shortly.</p>",
+                           [(b"retry-after", b"30")])
+            return
+        try:
+            body = await _read_body(receive, MAX_FORM_BYTES)
+        except ValueError:
+            await _respond(send, 413, b"<h1>Request too large</h1>")
+            return
+        except ConnectionError:
+            return
+        form = {key: values[0] for key, values in parse_qs(body.decode("utf-8", "replace")).items()}
+
+        scheduler = get_scheduler()
+        try:
+            job = scheduler.admit(_client_tenant(scope), "interactive")
+        except QueueFull as e:
+            await _respond(send, 429, queue_full_page(e).encode(), [(b"retry-after", str(e.retry_after).encode())])
+            return
+        # The task copies the current context, so its LLM calls run as this job
+        token = current_job.set(job)
+        try:
+            task = asyncio.create_task(generate_mystery(form))
+        finally:
+            current_job.reset(token)
+        task.add_done_callback(lambda _: scheduler.finish(job))
+        # Tracked so that shutdown can wait for it
+        self.generations.add(task)
+        task.add_done_callback(self.generations.discard)
+        try:
+            mystery_id = await task
+        except Exception as e:
+            traceback.print_exc()
+            await _respond(send, 500, f"<h1>Mystery generation failed</h1><p>{type(e).__name__}</p>".encode())
+            return
+        await _respond(send, 303, headers=[(b"location", f"/mystery/{mystery_id}".encode())])
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.drain(ASGI_DRAIN_SECONDS)
+                await asyncio.to_thread(close_render_pool)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def drain(self, timeout: float) -> None:
+        """Refuse new generations and wait for in-flight ones and background renders."""
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        if self.generations:
+            print(f"[ASGI] Waiting for {len(self.generations)} in-flight generation(s)")
+            _, pending = await asyncio.wait(set(self.generations), timeout=timeout)
+            if pending:
+                print(f"[Warning] {len(pending)} generation(s) still running at shutdown")
+        for drain_step in (drain_background_renders, drain_exports):
+            remaining = max(0.0, deadline - time.monotonic())
+            if not await asyncio.to_thread(drain_step, remaining):
+                print(f"[Warning] Background work still running after {timeout:.0f}s drain")
+                return
+        print("[ASGI] Drained")
+
+
+app = MysteryASGI(flask_app)
@@ -0,0 +1,315 @@
+# benchmarks/load_test.py
+"""
+HTTP load test of the Flask app: simulated users, each with its own session,
+generate a mystery (`POST /`), load its portraits and download the PDF package
+(`GET /export_pdf`), at increasing numbers of concurrent users.
+
+    python -m benchmarks.load_test --users 1 4 16 --iterations 2
+    python -m benchmarks.load_test --server asgi --users 16 64
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --pid 1234 --session-dir ./flask_session
+
+By default the app is started as a subprocess (Flask's threaded server, or
+uvicorn with the ASGI entrypoint for `--server asgi`), wired
+to the LM Studio and A1111 stand-ins running in this process, with a
+temporary session directory, mystery store, portrait store and PDF cache. With
+`--url` an existing deployment is driven instead. Pass `--pid` (repeatable, e.g. each worker) and
+`--session-dir` to get memory and session store numbers.
+
+Reports, per level: throughput, p50/p95/p99 latency, error rate and the
+share refused with 429 (LLM scheduler backpressure) per endpoint, session store growth (files, bytes) and peak RSS per server process
+(Linux, from /proc).
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["generate", "image", "export"]
+_IMG_SRC_RE = re.compile(r'<img[^>]*\ssrc="(/(?:portraits|character_images)/[^"]+)"')
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+# ----------------------------
+# Server under test
+# ----------------------------
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid and all its descendants (e.g. the PDF render pool)."""
+    pids = [pid]
+    for current in pids:
+        try:
+            tasks = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tasks:
+            try:
+                with open(f"/proc/{current}/task/{tid}/children", encoding="ascii") as f:
+                    pids.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+    return pids
+
+
+class _MemorySampler:
+    """Peak RSS per process of the server(s), sampled in the background."""
+
+    def __init__(self, pids: List[int], interval: float = 0.25):
+        self.pids = pids
+        self.interval = interval
+        self.peak: Dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for root in self.pids:
+                for pid in _process_tree(root):
+                    rss = _rss_bytes(pid)
+                    if rss is not None and rss > self.peak.get(pid, 0):
+                        self.peak[pid] = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _session_store(directory: Optional[str]) -> Dict[str, int]:
+    if not directory or not os.path.isdir(directory):
+        return {"files": 0, "bytes": 0}
+    files = total = 0
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            files += 1
+            total += entry.stat().st_size
+    return {"files": files, "bytes": total}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_app(args, workdir: str):
+    """Start the stand-ins here and the app in a subprocess; returns (url, process, session dir, log path)."""
+    from standins import lm_studio_server, sd_server
+
+    lm, _ = lm_studio_server.start_server(config=lm_studio_server.LmStandinConfig(
+        prefill_tps=args.prefill_tps,
+        decode_tps=args.decode_tps,
+        parallel=args.lm_parallel,
+    ))
+    sd, _ = sd_server.start_server(config=sd_server.SdStandinConfig(
+        base_seconds=args.sd_base_seconds,
+        step_seconds=args.sd_step_seconds,
+        adetailer_seconds=args.sd_base_seconds,
+        workers=args.sd_workers,
+    ))
+    session_dir = os.path.join(workdir, "sessions")
+    os.makedirs(session_dir)
+    env = dict(
+        os.environ,
+        LM_STUDIO_BASE_URL=lm_studio_server.server_url(lm),
+        SD_API_URL=sd_server.server_url(sd),
+        SESSION_FILE_DIR=session_dir,
+        PORTRAIT_STORE_DIR=os.path.join(workdir, "portraits"),
+        PDF_CACHE_DIR=os.path.join(workdir, "pdf_cache"),
+        PDF_IMAGE_CACHE_DIR=os.path.join(workdir, "pdf_cache", "images"),
+        MYSTERY_STORE_PATH=os.path.join(workdir, "mysteries.sqlite3"),
+    )
+    port = _free_port()
+    log_path = os.path.join(workdir, "app.log")
+    if args.server == "asgi":
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port)]
+    else:
+        code = f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+        command = [sys.executable, "-c", code]
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup, see {log_path}")
+        try:
+            requests.get(url + "/", timeout=2)
+            return url, process, session_dir, log_path
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"App did not start within {args.startup_timeout}s, see {log_path}")
+
+
+# ----------------------------
+# Simulated users
+# ----------------------------
+def _timed(samples: List, endpoint: str, call) -> Optional[requests.Response]:
+    started = time.perf_counter()
+    try:
+        response = call()
+        ok = response.status_code < 400
+        rejected = response.status_code == 429
+    except requests.RequestException:
+        response, ok, rejected = None, False, False
+    samples.append((endpoint, time.perf_counter() - started, ok, rejected))
+    return response if ok else None
+
+
+def _user(url: str, iterations: int, timeout: float, location: str) -> List:
+    samples: List = []
+    with requests.Session() as http:  # own cookie jar = own server-side session
+        http.get(url + "/", timeout=timeout)  # the form sets the client cookie
+        for _ in range(iterations):
+            page = _timed(samples, "generate", lambda: http.post(url + "/", data={
+                "location": location,
+                "theme": f"A smuggling ring at the harbor (user {uuid.uuid4().hex[:8]})",
+            }, timeout=timeout))
+            if page is None:
+                continue
+            for src in _IMG_SRC_RE.findall(page.text):
+                _timed(samples, "image", lambda: http.get(url + src, timeout=timeout))
+            _timed(samples, "export", lambda: http.get(url + "/export_pdf", timeout=timeout))
+    return samples
+
+
+def run(args) -> List[Dict]:
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    process = None
+    if args.url:
+        url, session_dir, pids = args.url.rstrip("/"), args.session_dir, list(args.pid)
+    else:
+        url, process, session_dir, log_path = _start_app(args, workdir)
+        pids = [process.pid]
+        print(f"[Load test] App at {url} (log: {log_path})")
+
+    results = []
+    try:
+        for users in args.users:
+            store_before = _session_store(session_dir)
+            started = time.perf_counter()
+            with _MemorySampler(pids) as memory:
+                with ThreadPoolExecutor(max_workers=users) as pool:
+                    per_user = list(pool.map(
+                        lambda _: _user(url, args.iterations, args.timeout, args.location), range(users)
+                    ))
+            wall = time.perf_counter() - started
+            store_after = _session_store(session_dir)
+
+            samples = [s for user_samples in per_user for s in user_samples]
+            row = {
+                "users": users,
+                "iterations": args.iterations,
+                "wall_seconds": round(wall, 3),
+                "requests_per_second": round(len(samples) / wall, 2) if wall else 0.0,
+                "endpoints": {},
+                "session_files": store_after["files"],
+                "session_files_added": store_after["files"] - store_before["files"],
+                "session_bytes": store_after["bytes"],
+                "session_bytes_added": store_after["bytes"] - store_before["bytes"],
+                "peak_rss_mb": {str(pid): round(rss / 1e6, 1) for pid, rss in sorted(memory.peak.items())},
+            }
+            for endpoint in ENDPOINTS:
+                latencies = [seconds for name, seconds, ok, _ in samples if name == endpoint and ok]
+                count = sum(1 for name, *_ in samples if name == endpoint)
+                rejected = sum(1 for name, _, _, refused in samples if name == endpoint and refused)
+                row["endpoints"][endpoint] = {
+                    "requests": count,
+                    "per_second": round(count / wall, 3) if wall else 0.0,
+                    "error_rate": round(1 - len(latencies) / count, 3) if count else 0.0,
+                    "rejected_rate": round(rejected / count, 3) if count else 0.0,
+                    "p50": round(_percentile(latencies, 0.50), 3),
+                    "p95": round(_percentile(latencies, 0.95), 3),
+                    "p99": round(_percentile(latencies, 0.99), 3),
+                }
+            results.append(row)
+            print(
+                f"[Load test] users={users}: {row['requests_per_second']:.2f} req/s, "
+                f"generate p95 {row['endpoints']['generate']['p95']:.2f}s, "
+                f"errors {row['endpoints']['generate']['error_rate']:.0%}"
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Flask endpoints with concurrent users.")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16], help="concurrent users per level")
+    parser.add_argument("--iterations", type=int, default=1, help="mysteries per user and level")
+    parser.add_argument("--timeout", type=float, default=600.0, help="client timeout per request")
+    parser.add_argument("--location", default="Kiel")
+    parser.add_argument("--server", choices=["flask", "asgi"], default="flask", help="how to start the app")
+    parser.add_argument("--url", default="", help="drive this deployment instead of starting the app")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="with --url: server process to measure")
+    parser.add_argument("--session-dir", default="", help="with --url: the app's SESSION_FILE_DIR")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--prefill-tps", type=float, default=20000.0)
+    parser.add_argument("--decode-tps", type=float, default=1000.0)
+    parser.add_argument("--lm-parallel", type=int, default=4)
+    parser.add_argument("--sd-workers", type=int, default=2)
+    parser.add_argument("--sd-base-seconds", type=float, default=0.05)
+    parser.add_argument("--sd-step-seconds", type=float, default=0.01)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print(
+            f"\nusers={row['users']} wall={row['wall_seconds']:.1f}s {row['requests_per_second']:.2f} req/s  "
+            f"sessions: {row['session_files']} files (+{row['session_files_added']}), "
+            f"{row['session_bytes'] / 1e3:.0f} kB (+{row['session_bytes_added'] / 1e3:.0f} kB)"
+        )
+        print(
+            f"  {'endpoint':<10} {'requests':>8} {'req/s':>7} {'errors':>7} {'429':>7} "
+            f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7}"
+        )
+        for endpoint, s in row["endpoints"].items():
+            print(
+                f"  {endpoint:<10} {s['requests']:>8} {s['per_second']:>7.2f} {s['error_rate']:>7.1%} "
+                f"{s['rejected_rate']:>7.1%} "
+                f"{s['p50']:>7.2f} {s['p95']:>7.2f} {s['p99']:>7.2f}"
+            )
+        rss = ", ".join(f"pid {pid}: {mb:.0f} MB" for pid, mb in row["peak_rss_mb"].items())
+        print(f"  peak RSS  {rss or 'n/a'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/pdf_text_cleaning.py
+"""
+Speed of the PDF text cleaning pipeline (_clean_text + _pretty_value) over a
+large corpus of synthetic generated mysteries, compared with the original
+implementation. Also checks that both produce identical text.
+
+    python -m benchmarks.pdf_text_cleaning --mysteries 200 --characters 7
+"""
+import argparse
+import random
+import re
+import time
+from typing import Any, Dict, List
+
+from llm_pipeline import pdf_generator
+
+# ----------------------------
+# Reference: the original cleaning code, kept verbatim for comparison
+# ----------------------------
+def _legacy_clean_text(value: Any) -> str:
+    if value is None:
+        return ""
+    text = str(value)
+    text = re.sub(r"\n?Source References:\s*\n(?:-.*\n?)*", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"([A-Za-zÀ-ÖØ-öø-ÿ])\n([A-Za-zÀ-ÖØ-öø-ÿ])", r"\1\2", text)
+    text = re.sub(r"\s*\n\s*", " ", text)
+    text = re.sub(r"[ \t]{2,}", " ", text).strip()
+    replacements = {
+        "“": '"', "”": '"', "„": '"', "’": "'", "‘": "'", "–": "-", "—": "-",
+        "…": "...", " ": " ", "​": "", "﻿": "",
+    }
+    for k, v in replacements.items():
+        text = text.replace(k, v)
+
+    def split_token(tok: str) -> str:
+        if len(tok) <= 30:
+            return tok
+        return " ".join(tok[i:i + 30] for i in range(0, len(tok), 30))
+
+    return " ".join(split_token(p) for p in text.split(" "))
+
+
+def _legacy_pretty_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        parts: List[str] = []
+        for item in value:
+            if isinstance(item, dict):
+                parts.append("; ".join(f"{k}: {v}" for k, v in item.items()))
+            else:
+                parts.append(str(item))
+        return "\n".join(f"- {p}" for p in parts) if parts else ""
+    if isinstance(value, dict):
+        lines: List[str] = []
+        for k, v in value.items():
+            if isinstance(v, (dict, list)):
+                lines.append(f"{k}:")
+                nested = _legacy_pretty_value(v)
+                if nested:
+                    for ln in nested.splitlines():
+                        lines.append(f"  {ln}")
+            else:
+                lines.append(f"{k}: {v}")
+        return "\n".join(lines)
+    return str(value)
+
+
+# ----------------------------
+# Synthetic corpus
+# ----------------------------
+_WORDS = (
+    "harbor council mayor journalist Fischmarkt Speicherstadt alibi motive "
+    "witness evening dinner Labskaus secret rivalry inheritance ledger"
+).split()
+_NOISE = ["“quoted”", "it’s", "–", "…", " ", "re\nvealed", "https://example.org/" + "x" * 40, "  "]
+
+
+def _sentence(rnd: random.Random, n: int = 14) -> str:
+    words = [rnd.choice(_WORDS) for _ in range(n)]
+    if rnd.random() < 0.5:
+        words.insert(rnd.randrange(len(words)), rnd.choice(_NOISE))
+    return " ".join(words) + "."
+
+
+def _mystery(rnd: random.Random, num_characters: int) -> Dict[str, Any]:
+    names = [f"{rnd.choice(_WORDS).title()} {i}" for i in range(num_characters)]
+    case = {
+        "victim_name": "Lena Hartmann",
+        "location": _sentence(rnd, 6),
+        "summary": " ".join(_sentence(rnd) for _ in range(4)),
+        "timeline": _sentence(rnd) + "\nSource References:\n- doc1\n- doc2\n",
+    }
+    characters = [
+        {
+            "name": name,
+            "appearance": _sentence(rnd),
+            "background": " ".join(_sentence(rnd) for _ in range(3)),
+            "personality_traits": ["stubborn", "kind", "curious"],
+            "hint_about_other": {"target": names[0], "hint": _sentence(rnd)},
+            "murderer_label": i == 0,
+        }
+        for i, name in enumerate(names)
+    ]
+    return {"case_data": case, "characters": characters}
+
+
+def _texts_for_mystery(mystery: Dict[str, Any], pretty) -> List[Any]:
+    """The values the renderer cleans: case section once per character sheet plus each field."""
+    values = []
+    for character in mystery["characters"]:
+        for key, value in mystery["case_data"].items():
+            values.append(key.replace("_", " ").title() + ":")
+            values.append(pretty(value))
+        for key, value in character.items():
+            values.append(key.replace("_", " ").title() + ":")
+            values.append(pretty(value))
+    return values
+
+
+def _run(corpus, clean, pretty) -> (float, List[str]):
+    start = time.perf_counter()
+    out = []
+    for mystery in corpus:
+        for value in _texts_for_mystery(mystery, pretty):
+            out.append(clean(value))
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text cleaning.")
+    parser.add_argument("--mysteries", type=int, default=200)
+    parser.add_argument("--characters", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    corpus = [_mystery(rnd, args.characters) for _ in range(args.mysteries)]
+
+    legacy_s, legacy_out = _run(corpus, _legacy_clean_text, _legacy_pretty_value)
+    pdf_generator._clean_str.cache_clear()
+    new_s, new_out = _run(corpus, pdf_generator._clean_text, pdf_generator._pretty_value)
+
+    mismatches = sum(1 for a, b in zip(legacy_out, new_out) if a != b)
+    print(f"values cleaned: {len(new_out)} ({args.mysteries} mysteries x {args.characters} characters)")
+    print(f"legacy:  {legacy_s * 1000:8.1f} ms")
+    print(f"current: {new_s * 1000:8.1f} ms   ({legacy_s / new_s:.1f}x faster)")
+    print(f"memo cache: {pdf_generator._clean_str.cache_info()}")
+    print(f"output mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
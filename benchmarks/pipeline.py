@@ -0,0 +1,376 @@
+# benchmarks/pipeline.py
+"""
+End-to-end benchmark of the mystery pipeline (the `main.py` flow) against the
+local LM Studio and Automatic1111 stand-ins, at several cast sizes and
+concurrency levels (mysteries generated at the same time, like web users).
+
+    python -m benchmarks.pipeline --cast-sizes 3 7 15 30 --concurrency 1 4
+    python -m benchmarks.pipeline --save-baseline        # after a known-good run
+    python -m benchmarks.pipeline --threshold 0.15       # exit code 1 on a regression
+
+Stages: recipe loading, menu selection, retrieval, each generator, portraits,
+evaluation, PDF rendering and zipping. Stages that call the LLM are split into
+`llm` (waiting on the backend) and `local` (prompt building, JSON parsing and
+normalization), so local regressions stay visible behind backend latency.
+Portrait renders run in pool threads, so that stage's local time includes
+waiting on SD; it is reported but left out of the local total and comparison.
+
+Every run appends one JSON line to the history file (per cast size and
+concurrency: p50/p95 per stage and end to end, plus commit and settings) and is
+compared with the baseline file, if there is one. Only local time is compared:
+stand-in latency is configured, not measured.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+HISTORY_PATH = "outputs/benchmarks/pipeline_history.jsonl"
+BASELINE_PATH = "outputs/benchmarks/pipeline_baseline.json"
+# Ignore regressions smaller than this (timer noise on millisecond stages)
+MIN_REGRESSION_SECONDS = 0.005
+
+STAGES = [
+    "load_recipes", "menu", "retrieval", "case", "characters", "portraits",
+    "last_day", "clues", "solution", "evaluation", "pdf_render", "zip",
+]
+# Local time of these stages includes backend waits that cannot be split off
+BACKEND_BOUND_STAGES = {"portraits"}
+
+_llm_time = threading.local()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _llm_seconds() -> float:
+    return getattr(_llm_time, "seconds", 0.0)
+
+
+def _time_llm_calls(llm_client) -> None:
+    """Accumulate time spent in chat completion requests per thread."""
+    completions = llm_client.client.chat.completions
+    create = completions.create
+
+    def timed_create(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return create(*args, **kwargs)
+        finally:
+            _llm_time.seconds = _llm_seconds() + time.perf_counter() - started
+
+    completions.create = timed_create
+
+
+class _StageTimer:
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        llm_before = _llm_seconds()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - started
+            llm = _llm_seconds() - llm_before
+            self.stages[name] = {"total": total, "llm": llm, "local": max(0.0, total - llm)}
+
+
+def _synthetic_index(num_docs: int) -> str:
+    """Build a small throwaway retrieval index when there is no real one."""
+    from rag.index_builder import build_index
+
+    corpus_dir = tempfile.mkdtemp(prefix="pipeline-bench-corpus-")
+    topics = ["harbor", "town council", "fish market", "shipyard", "newspaper", "lighthouse", "bakery"]
+    for i in range(num_docs):
+        topic = topics[i % len(topics)]
+        with open(os.path.join(corpus_dir, f"doc_{i:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(
+                f"Notes {i} on the {topic} in a northern German port town. "
+                f"People working at the {topic} know every rumor about local politics. "
+                f"Typical occupations include clerks, captains, cooks and reporters ({i % 13})."
+            )
+    index_dir = tempfile.mkdtemp(prefix="pipeline-bench-index-")
+    build_index(corpus_dir, index_dir, workers=1)
+    return index_dir
+
+
+def _run_mystery(num_characters: int, retriever, location: str, pdf_workers: Optional[int]) -> Dict:
+    from evaluation import SimpleEvaluator
+    from image_tool.image_generator import generate_character_images
+    from llm_pipeline.case_generator import generate_case
+    from llm_pipeline.character_generator import generate_characters
+    from llm_pipeline.clue_generator import generate_clues
+    from llm_pipeline.last_day_victim import generate_last_day
+    from llm_pipeline.pdf_generator import iter_rendered_pdfs
+    from llm_pipeline.solution_generator import generate_solution
+    from llm_pipeline.zip_stream import stream_zip
+    from rag.recipes_retriever import get_menu_for_location, load_all_recipes
+
+    timer = _StageTimer()
+    started = time.perf_counter()
+    # Unique theme per mystery, so no stage is served from a cache
+    user_prompt = f"A small coastal town with a controversial political scandal (run {uuid.uuid4().hex[:8]})"
+
+    with timer.stage("load_recipes"):
+        all_recipes = load_all_recipes()
+    with timer.stage("menu"):
+        menu = get_menu_for_location(location, all_recipes)
+    with timer.stage("case"):
+        case_data = generate_case(
+            user_prompt=user_prompt,
+            location=location,
+            menu={course: recipe.name if recipe else None for course, recipe in menu.items()},
+        )
+    with timer.stage("retrieval"):
+        query = f"{case_data.get('location','')} {case_data.get('controversial_theme','')} typical people occupations social environment"
+        retriever.retrieve(query=query, k=5)
+    with timer.stage("characters"):
+        characters = generate_characters(case_data=case_data, num_characters=num_characters, retriever=retriever)
+    with timer.stage("portraits"):
+        for c, img_path in zip(characters, generate_character_images(characters)):
+            c["image_path"] = img_path or "generation_failed.png"
+    with timer.stage("last_day"):
+        last_day_data = generate_last_day(case_data=case_data, characters=characters)
+    with timer.stage("clues"):
+        clues = generate_clues(case_data=case_data, characters=characters, last_day_data=last_day_data)
+    with timer.stage("solution"):
+        solution = generate_solution(
+            case_data=case_data, characters=characters, last_day_data=last_day_data, clues=clues
+        )
+        killer_name = solution.get("killer_name")
+        if killer_name:
+            for c in characters:
+                c["murderer_label"] = c["name"] == killer_name
+    with timer.stage("evaluation"):
+        SimpleEvaluator().evaluate_mystery(
+            menu=menu, case_data=case_data, characters=characters,
+            last_day_data=last_day_data, clues=clues, solution=solution,
+        )
+    with timer.stage("pdf_render"):
+        pdfs = list(iter_rendered_pdfs(
+            menu, case_data, characters, last_day_data, clues, solution,
+            workers=pdf_workers, use_cache=False,
+        ))
+    with timer.stage("zip"):
+        archive = b"".join(stream_zip(pdfs))
+
+    return {
+        "stages": timer.stages,
+        "seconds": time.perf_counter() - started,
+        "documents": len(pdfs),
+        "zip_bytes": len(archive),
+    }
+
+
+def _summarize(runs: List[Dict], wall: float, num_characters: int, concurrency: int) -> Dict:
+    ok = [r for r in runs if "error" not in r]
+    row = {
+        "cast_size": num_characters,
+        "concurrency": concurrency,
+        "mysteries": len(runs),
+        "failed": len(runs) - len(ok),
+        "wall_seconds": round(wall, 3),
+        "mysteries_per_minute": round(60 * len(ok) / wall, 2) if wall else 0.0,
+        "e2e_p50": round(_percentile([r["seconds"] for r in ok], 0.50), 4),
+        "e2e_p95": round(_percentile([r["seconds"] for r in ok], 0.95), 4),
+        "local_p50": round(_percentile([
+            sum(s["local"] for name, s in r["stages"].items() if name not in BACKEND_BOUND_STAGES) for r in ok
+        ], 0.50), 4),
+        "stages": {},
+    }
+    for name in STAGES:
+        samples = [r["stages"][name] for r in ok if name in r["stages"]]
+        row["stages"][name] = {
+            "p50": round(_percentile([s["total"] for s in samples], 0.50), 4),
+            "p95": round(_percentile([s["total"] for s in samples], 0.95), 4),
+            "llm_p50": round(_percentile([s["llm"] for s in samples], 0.50), 4),
+            "local_p50": round(_percentile([s["local"] for s in samples], 0.50), 4),
+        }
+    errors = sorted({r["error"] for r in runs if "error" in r})
+    if errors:
+        row["errors"] = errors[:5]
+    return row
+
+
+def run(args) -> List[Dict]:
+    # Fresh portrait store and PDF cache, so every run renders
+    os.environ["PORTRAIT_STORE_DIR"] = tempfile.mkdtemp(prefix="pipeline-bench-portraits-")
+    os.environ["PDF_CACHE_DIR"] = tempfile.mkdtemp(prefix="pipeline-bench-pdf-")
+    from standins import lm_studio_server, sd_server
+
+    if args.lm_url:
+        os.environ["LM_STUDIO_BASE_URL"] = args.lm_url
+    else:
+        lm, _ = lm_studio_server.start_server(config=lm_studio_server.LmStandinConfig(
+            prefill_tps=args.prefill_tps,
+            decode_tps=args.decode_tps,
+            parallel=args.lm_parallel,
+        ))
+        os.environ["LM_STUDIO_BASE_URL"] = lm_studio_server.server_url(lm)
+    from image_tool import image_generator
+    from llm_pipeline import llm_client
+    from rag.retriever import RagRetriever
+
+    if args.sd_url:
+        image_generator.SD_API_URL = args.sd_url
+    else:
+        sd, _ = sd_server.start_server(config=sd_server.SdStandinConfig(
+            base_seconds=args.sd_base_seconds,
+            step_seconds=args.sd_step_seconds,
+            adetailer_seconds=args.sd_base_seconds,
+            workers=args.sd_workers,
+        ))
+        image_generator.SD_API_URL = sd_server.server_url(sd)
+    _time_llm_calls(llm_client)
+
+    index_path = args.index_path
+    if not os.path.isdir(index_path) or not os.listdir(index_path):
+        print(f"[Benchmark] No index at {index_path}, building a synthetic one ({args.corpus_docs} docs)")
+        with contextlib.redirect_stdout(io.StringIO()):
+            index_path = _synthetic_index(args.corpus_docs)
+    # No query cache: every retrieval is measured
+    retriever = RagRetriever(index_path=index_path, cache_size=0)
+
+    def one(num_characters: int) -> Dict:
+        try:
+            return _run_mystery(num_characters, retriever, args.location, args.pdf_workers)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    results = []
+    for num_characters in args.cast_sizes:
+        for concurrency in args.concurrency:
+            count = concurrency * args.repeats
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    runs = list(pool.map(one, [num_characters] * count))
+            row = _summarize(runs, time.perf_counter() - started, num_characters, concurrency)
+            results.append(row)
+            print(
+                f"[Benchmark] cast={num_characters} concurrency={concurrency}: "
+                f"e2e p50 {row['e2e_p50']:.2f}s, local p50 {row['local_p50']:.3f}s, failed {row['failed']}"
+            )
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """Local-time regressions against the baseline, as readable lines."""
+    by_key = {(r["cast_size"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for row in results:
+        base = by_key.get((row["cast_size"], row["concurrency"]))
+        if not base:
+            continue
+        metrics = [("local total", row["local_p50"], base["local_p50"])]
+        metrics += [
+            (stage, row["stages"][stage]["local_p50"], base["stages"][stage]["local_p50"])
+            for stage in STAGES if stage in base["stages"] and stage not in BACKEND_BOUND_STAGES
+        ]
+        for name, new, old in metrics:
+            if new > old * (1 + threshold) and new - old > MIN_REGRESSION_SECONDS:
+                regressions.append(
+                    f"cast={row['cast_size']} concurrency={row['concurrency']} {name}: "
+                    f"{old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100 if old else float('inf'):.0f}%)"
+                )
+    return regressions
+
+
+def _print_table(results: List[Dict]) -> None:
+    for row in results:
+        print(
+            f"\ncast={row['cast_size']} concurrency={row['concurrency']} mysteries={row['mysteries']} "
+            f"failed={row['failed']} wall={row['wall_seconds']:.2f}s ({row['mysteries_per_minute']:.1f}/min)"
+        )
+        print(f"  {'stage':<13} {'p50 s':>8} {'p95 s':>8} {'llm p50':>8} {'local p50':>10}")
+        for name in STAGES:
+            s = row["stages"][name]
+            print(f"  {name:<13} {s['p50']:>8.3f} {s['p95']:>8.3f} {s['llm_p50']:>8.3f} {s['local_p50']:>10.4f}")
+        print(f"  {'end to end':<13} {row['e2e_p50']:>8.3f} {row['e2e_p95']:>8.3f} {'':>8} {row['local_p50']:>10.4f}")
+        for error in row.get("errors", []):
+            print(f"  [Warning] {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mystery pipeline end to end.")
+    parser.add_argument("--cast-sizes", type=int, nargs="+", default=[3, 7, 15, 30])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeats", type=int, default=2, help="mysteries per concurrent slot and level")
+    parser.add_argument("--location", default="Kiel")
+    parser.add_argument("--index-path", default="data/index")
+    parser.add_argument("--corpus-docs", type=int, default=500, help="size of the synthetic index if there is none")
+    parser.add_argument("--pdf-workers", type=int, default=None, help="default: PDF_RENDER_WORKERS")
+    parser.add_argument("--lm-url", default="", help="use this LM Studio server instead of the stand-in")
+    parser.add_argument("--sd-url", default="", help="use this SD server instead of the stand-in")
+    parser.add_argument("--prefill-tps", type=float, default=20000.0)
+    parser.add_argument("--decode-tps", type=float, default=2000.0)
+    parser.add_argument("--lm-parallel", type=int, default=4)
+    parser.add_argument("--sd-workers", type=int, default=2)
+    parser.add_argument("--sd-base-seconds", type=float, default=0.02)
+    parser.add_argument("--sd-step-seconds", type=float, default=0.002)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown of local time")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("json", "save_baseline", "history", "baseline")},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+
+    regressions: List[str] = []
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        print(f"\nCompared with baseline {baseline.get('commit') or ''} ({baseline.get('timestamp')}), threshold {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  [Regression] {line}")
+        if not regressions:
+            print("  no regressions")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
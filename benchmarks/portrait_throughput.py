@@ -0,0 +1,122 @@
+# benchmarks/portrait_throughput.py
+"""
+Throughput and latency of portrait generation against client-side render
+concurrency, driven through `generate_character_images` (template prompts, no
+LLM) against the local Automatic1111 stand-in.
+
+    python -m benchmarks.portrait_throughput --concurrency 1 2 4 8 --sd-workers 1
+    python -m benchmarks.portrait_throughput --url http://127.0.0.1:7860   # real server
+
+Use it to pick SD_MAX_CONCURRENCY and SD_TIMEOUT_SECONDS for a given server:
+past the server's own parallelism, more client concurrency only adds queueing.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run(args) -> List[Dict]:
+    # Fresh portrait store, so every run renders instead of hitting the cache
+    os.environ["PORTRAIT_STORE_DIR"] = tempfile.mkdtemp(prefix="portrait-bench-")
+    from image_tool import image_generator
+    from standins.sd_server import SdStandinConfig, server_url, start_server
+
+    standin = None
+    if args.url:
+        image_generator.SD_API_URL = args.url
+    else:
+        server, standin = start_server(config=SdStandinConfig(
+            base_seconds=args.base_seconds,
+            step_seconds=args.step_seconds,
+            adetailer_seconds=args.adetailer_seconds,
+            workers=args.sd_workers,
+            error_rate=args.error_rate,
+        ))
+        image_generator.SD_API_URL = server_url(server)
+    image_generator.SD_TIMEOUT_SECONDS = args.timeout
+
+    results = []
+    for concurrency in args.concurrency:
+        image_generator.set_max_concurrency(concurrency)
+        run_tag = uuid.uuid4().hex[:8]
+        characters = [
+            {
+                "name": f"Suspect {i}",
+                "occupation": "harbor pilot",
+                "appearance": f"weathered face, grey coat, variant {run_tag}-{i}",
+                "background": "grew up on the Kiel waterfront",
+            }
+            for i in range(args.portraits)
+        ]
+        timings: List[Dict] = []
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            image_generator.generate_character_images(
+                characters, mode="template", profile=args.profile, timings=timings
+            )
+        wall = time.perf_counter() - started
+
+        totals = [t["total_seconds"] for t in timings if t["ok"]]
+        queues = [t["queue_seconds"] for t in timings if t["queue_seconds"] is not None]
+        row = {
+            "concurrency": concurrency,
+            "portraits": args.portraits,
+            "ok": len(totals),
+            "failed": len(timings) - len(totals),
+            "wall_seconds": round(wall, 3),
+            "portraits_per_second": round(len(totals) / wall, 3) if wall else 0.0,
+            "latency_p50": round(_percentile(totals, 0.50), 3),
+            "latency_p95": round(_percentile(totals, 0.95), 3),
+            "client_queue_p95": round(_percentile(queues, 0.95), 3),
+        }
+        if standin is not None:
+            stats = standin.stats()
+            row["server_max_waiting"] = stats["max_waiting"]
+            standin.max_waiting = 0
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark portrait generation throughput.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--portraits", type=int, default=7)
+    parser.add_argument("--profile", default="full", choices=["full", "preview"])
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per render")
+    parser.add_argument("--url", default="", help="use this SD server instead of the stand-in")
+    parser.add_argument("--sd-workers", type=int, default=1, help="stand-in: jobs rendered at once")
+    parser.add_argument("--base-seconds", type=float, default=0.05)
+    parser.add_argument("--step-seconds", type=float, default=0.01)
+    parser.add_argument("--adetailer-seconds", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'conc':>5} {'ok':>4} {'fail':>5} {'wall s':>8} {'img/s':>7} {'p50 s':>7} {'p95 s':>7} {'queue p95':>10}")
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['ok']:>4} {r['failed']:>5} {r['wall_seconds']:>8.2f} "
+            f"{r['portraits_per_second']:>7.2f} {r['latency_p50']:>7.2f} {r['latency_p95']:>7.2f} "
+            f"{r['client_queue_p95']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
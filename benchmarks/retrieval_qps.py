@@ -0,0 +1,90 @@
+# benchmarks/retrieval_qps.py
+"""
+Queries-per-second of the retrieval engine against corpus size.
+
+    python -m benchmarks.retrieval_qps --sizes 1000 10000 100000 --dim 384
+
+Uses synthetic clustered unit vectors (a Gaussian mixture), which behave more
+like text embeddings than uniform noise; the point is the latency trend.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from rag.embeddings import normalize_rows
+from rag.vector_index import ExactIndex, build_ivf
+
+
+def _qps(index, queries: np.ndarray, k: int) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, k)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def _recall(exact: ExactIndex, approx, queries: np.ndarray, k: int) -> float:
+    hits = 0
+    for q in queries:
+        truth = set(exact.search(q, k)[0].tolist())
+        hits += len(truth & set(approx.search(q, k)[0].tolist()))
+    return hits / (len(queries) * k)
+
+
+def _clustered(rng, n: int, dim: int, num_clusters: int) -> np.ndarray:
+    centers = normalize_rows(rng.standard_normal((num_clusters, dim), dtype=np.float32))
+    labels = rng.integers(0, num_clusters, size=n)
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * 0.04
+    return normalize_rows(centers[labels] + noise)
+
+
+def run(sizes: List[int], dim: int, num_queries: int, k: int, nprobe: int) -> List[Dict]:
+    rng = np.random.default_rng(0)
+    results = []
+    for n in sizes:
+        clusters = max(8, n // 200)
+        vectors = _clustered(rng, n, dim, clusters)
+        queries = vectors[rng.choice(n, size=num_queries, replace=False)]
+
+        exact = ExactIndex(vectors)
+        start = time.perf_counter()
+        ivf = build_ivf(vectors, nprobe=nprobe)
+        build_s = time.perf_counter() - start
+
+        row = {
+            "corpus_size": n,
+            "dim": dim,
+            "exact_qps": round(_qps(exact, queries, k), 1),
+            "ivf_qps": round(_qps(ivf, queries, k), 1),
+            "ivf_recall_at_k": round(_recall(exact, ivf, queries[:50], k), 3),
+            "ivf_build_s": round(build_s, 2),
+            "ivf_nlist": int(ivf.centroids.shape[0]),
+        }
+        results.append(row)
+        print(
+            f"N={n:>8}  exact {row['exact_qps']:>9.1f} q/s   ivf {row['ivf_qps']:>9.1f} q/s"
+            f"   recall@{k} {row['ivf_recall_at_k']:.3f}   build {row['ivf_build_s']:.2f}s"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--json", help="Optional path to write results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dim, args.queries, args.k, args.nprobe)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
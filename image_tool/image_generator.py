@@ -1,67 +1,157 @@
 import os
 import json
+import threading
+import time
 import requests
 import base64
-import io
-from PIL import Image
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
+from requests.adapters import HTTPAdapter
 
 # Import the updated client
-from llm_pipeline.llm_client import chat_with_tools
+from llm_pipeline.cassette import get_cassette
+from llm_pipeline.llm_client import chat_json, chat_with_tools
+from image_tool.portrait_store import get_portrait_store, image_id_from_path, portrait_id
 
 # --- Configuration ---
 SD_API_URL = os.getenv("SD_API_URL", "http://127.0.0.1:7860")
 DEFAULT_OUTPUT_DIR = "image_tool/image_output"
 HAND_LORA_FILENAME = "SDXL-LoRA-slider.nice-hands"
+# Renders in flight at once. A1111 works through its queue one job at a time,
+# so 2 keeps the next job queued without piling up requests that only wait.
+SD_MAX_CONCURRENCY = int(os.getenv("SD_MAX_CONCURRENCY", "2"))
+SD_TIMEOUT_SECONDS = float(os.getenv("SD_TIMEOUT_SECONDS", "300"))
+# How portrait prompts are written:
+#   "batch"    - one structured LLM call for the whole cast (default)
+#   "template" - built locally from the character fields, no LLM call
+#   "agent"    - one tool-calling LLM round trip per character
+IMAGE_PROMPT_MODE = os.getenv("IMAGE_PROMPT_MODE", "batch").strip().lower()
+IMAGE_PROMPT_MODES = ("batch", "template", "agent")
+
+# Render profiles. "preview" is fast and small, "full" the final portrait.
+# Override fields with JSON, e.g. SD_PROFILE_PREVIEW='{"steps": 6}'.
+RENDER_PROFILES = {
+    "full": {"steps": 25, "width": 512, "height": 768, "sampler_name": "DPM++ 2M Karras", "adetailer": True},
+    "preview": {"steps": 8, "width": 256, "height": 384, "sampler_name": "DPM++ 2M Karras", "adetailer": False},
+}
+for _name in RENDER_PROFILES:
+    _override = os.getenv(f"SD_PROFILE_{_name.upper()}")
+    if _override:
+        RENDER_PROFILES[_name] = {**RENDER_PROFILES[_name], **json.loads(_override)}
+# Web UI: show a preview first and swap in the full render when it is done
+PROGRESSIVE_PORTRAITS = os.getenv("PROGRESSIVE_PORTRAITS", "1") == "1"
+
+PORTRAIT_STYLE = "masterpiece, best quality, detailed portrait photo, soft cinematic lighting, sharp focus, 8k"
+DEFAULT_NEGATIVE_PROMPT = (
+    "ugly, blurry, bad anatomy, deformed, extra fingers, mutated hands, "
+    "lowres, watermark, text, cropped"
+)
+
+_sd_slots = threading.BoundedSemaphore(max(1, SD_MAX_CONCURRENCY))
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+# (queue wait, render) seconds of the last render on this thread
+_last_timing = threading.local()
+
+
+def set_max_concurrency(limit: int) -> None:
+    """Change the number of concurrent Stable Diffusion renders (e.g. for benchmarks)."""
+    global SD_MAX_CONCURRENCY, _sd_slots, _http_session
+    with _http_session_lock:
+        SD_MAX_CONCURRENCY = max(1, limit)
+        _sd_slots = threading.BoundedSemaphore(SD_MAX_CONCURRENCY)
+        _http_session = None  # resize the connection pool
+
+
+def _get_http_session() -> requests.Session:
+    """Shared keep-alive session; its pool holds one connection per render slot."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, SD_MAX_CONCURRENCY))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
 
 # --- 1. The "Inner" Function (The Tool Logic) ---
-def _raw_generate_image_api(prompt: str, negative_prompt: str, filename_prefix: str) -> str:
+def _render_settings(profile: str = "full") -> Dict:
+    """txt2img settings (everything but the prompts) for a render profile."""
+    spec = dict(RENDER_PROFILES[profile])
+    use_adetailer = spec.pop("adetailer", False)
+    if use_adetailer:
+        # ADetailer Configuration (Hardcoded logic usually stays here)
+        adetailer_args = [
+            True, False,
+            {
+                "ad_model": "hand_yolov8n.pt",
+                "ad_prompt": f"detailed hands, <lora:{HAND_LORA_FILENAME}:2.5>",
+                "ad_confidence": 0.3,
+                "ad_mask_blur": 35,
+                "ad_denoising_strength": 0.4,
+            }
+        ]
+        spec["alwayson_scripts"] = {"ADetailer": {"args": adetailer_args}}
+    return spec
+
+
+def planned_image_id(plan: Dict[str, str], profile: str = "full") -> str:
+    """Content ID the portrait for `plan` will have, known before it is rendered."""
+    return portrait_id(plan["prompt"], plan["negative_prompt"], _render_settings(profile))
+
+
+def _post_txt2img(payload: Dict) -> Tuple[int, Dict]:
+    """(status code, JSON body) of one txt2img request."""
+    response = _get_http_session().post(
+        url=f"{SD_API_URL}/sdapi/v1/txt2img", json=payload, timeout=SD_TIMEOUT_SECONDS
+    )
+    return response.status_code, (response.json() if response.status_code == 200 else {})
+
+
+def _raw_generate_image_api(
+    prompt: str, negative_prompt: str, filename_prefix: str, profile: str = "full"
+) -> str:
     """
     The actual worker function that hits the Automatic1111 API.
     The LLM does NOT see the code inside here, only the inputs/outputs.
     """
-    print(f"   [Tool Executing] Generating image for: '{filename_prefix}'...")
-    
-    # Ensure directory exists
-    if not os.path.exists(DEFAULT_OUTPUT_DIR):
-        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
-
-    safe_name = filename_prefix.replace(" ", "_")
-    file_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{safe_name}.png")
-
-    # ADetailer Configuration (Hardcoded logic usually stays here)
-    adetailer_args = [
-        True, False,
-        {
-            "ad_model": "hand_yolov8n.pt",
-            "ad_prompt": f"detailed hands, <lora:{HAND_LORA_FILENAME}:2.5>",
-            "ad_confidence": 0.3,
-            "ad_mask_blur": 35,
-            "ad_denoising_strength": 0.4,
-        }
-    ]
+    print(f"   [Tool Executing] Generating {profile} image for: '{filename_prefix}'...")
 
-    payload = {
-        "prompt": prompt,
-        "negative_prompt": negative_prompt,
-        "steps": 25,
-        "width": 512, 
-        "height": 768,
-        "sampler_name": "DPM++ 2M Karras",
-        "alwayson_scripts": {"ADetailer": {"args": adetailer_args}}
-    }
+    settings = _render_settings(profile)
+    payload = {"prompt": prompt, "negative_prompt": negative_prompt, **settings}
 
-    try:
-        response = requests.post(url=f"{SD_API_URL}/sdapi/v1/txt2img", json=payload)
-        if response.status_code == 200:
-            r = response.json()
-            image = Image.open(io.BytesIO(base64.b64decode(r["images"][0])))
-            image.save(file_path)
-            print(f"   [Tool Success] Saved to {file_path}")
-            return file_path
-        else:
-            return f"Error: API Status {response.status_code}"
-    except Exception as e:
-        return f"Error: {str(e)}"
+    # Portraits are stored by content ID, so identical requests reuse one file
+    # and concurrent users with same-named characters never overwrite each other
+    store = get_portrait_store()
+    image_id = portrait_id(prompt, negative_prompt, settings)
+    _last_timing.value = None
+    with store.render_lock(image_id):
+        cached_path = store.lookup(image_id)
+        if cached_path:
+            print(f"   [Tool Success] Reusing stored portrait {cached_path}")
+            return cached_path
+
+        queued = time.perf_counter()
+        try:
+            with _sd_slots:
+                started = time.perf_counter()
+                # Recorded/replayed when CASSETTE_MODE is set
+                status_code, r = get_cassette().call(
+                    "txt2img", payload, lambda: _post_txt2img(payload), encode=list, decode=tuple
+                )
+                finished = time.perf_counter()
+            _last_timing.value = (started - queued, finished - started)
+            if status_code == 200:
+                # A1111 already returns PNG bytes; store them as-is
+                file_path = store.store(image_id, base64.b64decode(r["images"][0]))
+                print(f"   [Tool Success] Saved to {file_path} ({finished - started:.1f}s)")
+                return file_path
+            else:
+                return f"Error: API Status {status_code}"
+        except Exception as e:
+            return f"Error: {str(e)}"
 
 # --- 2. The Tool Definition (Schema) ---
 # This describes the function above to the LLM
@@ -153,6 +243,228 @@ def generate_character_image(character_data: dict) -> str:
     # Fallback if LLM refused to call tool
     return "Error: Agent did not trigger image generation."
 
+# --- 4. Prompt planning for the whole cast ---
+def _compact(value, limit: int = 300) -> str:
+    text = " ".join(str(value or "").split())
+    return text[:limit].rsplit(" ", 1)[0] if len(text) > limit else text
+
+
+def template_prompt(character_data: dict) -> Dict[str, str]:
+    """Deterministic SD prompt from appearance, occupation and background (no LLM)."""
+    parts = [
+        f"portrait of {_compact(character_data.get('occupation'), 80) or 'a person'}",
+        _compact(character_data.get("appearance")),
+        f"setting: {_compact(character_data.get('background'), 160)}" if character_data.get("background") else "",
+        PORTRAIT_STYLE,
+    ]
+    return {
+        "prompt": ", ".join(p for p in parts if p),
+        "negative_prompt": DEFAULT_NEGATIVE_PROMPT,
+        "filename_prefix": str(character_data.get("name") or "Unnamed"),
+    }
+
+
+def plan_prompts_batch(characters: List[Dict]) -> List[Dict[str, str]]:
+    """
+    Prompts for the whole cast from a single structured LLM call. Characters the
+    model skips (or an unusable response) fall back to template_prompt.
+    """
+    system_prompt = (
+        "You are an expert AI Art Director writing Stable Diffusion prompts for "
+        "character portraits of a murder mystery cast.\n"
+        "For EACH character write one 'masterpiece' style prompt with lighting and "
+        "texture keywords, based on their appearance, role and background, and a negative prompt.\n"
+        'Return JSON: {"prompts": [{"name": "...", "prompt": "...", "negative_prompt": "..."}]} '
+        "with one entry per character, in the given order."
+    )
+    user_prompt = "Characters:\n" + "\n".join(
+        f"{i + 1}. Name: {c.get('name')} | Role: {c.get('occupation')} | "
+        f"Appearance: {c.get('appearance')} | Background: {_compact(c.get('background'))}"
+        for i, c in enumerate(characters)
+    )
+
+    try:
+        result = chat_json(system_prompt, user_prompt)
+    except Exception as e:
+        print(f"[Warning] Batched prompt planning failed ({e}), using templates.")
+        result = {}
+    entries = result.get("prompts") if isinstance(result, dict) else result
+    entries = entries if isinstance(entries, list) else []
+    by_name = {
+        str(e.get("name", "")).strip().lower(): e for e in entries if isinstance(e, dict)
+    }
+
+    cast_names = {str(c.get("name", "")).strip().lower() for c in characters}
+
+    plans = []
+    for i, character in enumerate(characters):
+        plan = template_prompt(character)
+        entry = by_name.get(str(character.get("name", "")).strip().lower())
+        # Positional match only for an entry that does not name another character
+        if (
+            entry is None
+            and i < len(entries)
+            and isinstance(entries[i], dict)
+            and str(entries[i].get("name", "")).strip().lower() not in cast_names
+        ):
+            entry = entries[i]
+        if entry and str(entry.get("prompt", "")).strip():
+            plan["prompt"] = str(entry["prompt"]).strip()
+            plan["negative_prompt"] = str(entry.get("negative_prompt") or DEFAULT_NEGATIVE_PROMPT)
+        else:
+            print(f"[Warning] No planned prompt for {character.get('name')}, using template.")
+        plans.append(plan)
+    return plans
+
+
+def plan_image_prompts(characters: List[Dict], mode: Optional[str] = None) -> List[Dict[str, str]]:
+    """SD arguments (prompt, negative_prompt, filename_prefix) per character."""
+    mode = mode or IMAGE_PROMPT_MODE
+    if mode == "template":
+        return [template_prompt(c) for c in characters]
+    return plan_prompts_batch(characters)
+
+
+# --- 5. Whole cast ---
+def _is_image_path(result: Optional[str]) -> bool:
+    return bool(result) and not result.startswith("Error")
+
+
+def _prompt_mode(mode: Optional[str]) -> str:
+    mode = mode or IMAGE_PROMPT_MODE
+    if mode not in IMAGE_PROMPT_MODES:
+        print(f"[Warning] Unknown IMAGE_PROMPT_MODE '{mode}', using 'batch'.")
+        mode = "batch"
+    return mode
+
+
+def generate_character_images(
+    characters: List[Dict],
+    max_workers: Optional[int] = None,
+    mode: Optional[str] = None,
+    profile: str = "full",
+    plans: Optional[List[Dict[str, str]]] = None,
+    timings: Optional[List[Dict]] = None,
+) -> List[Optional[str]]:
+    """
+    Generate portraits for the whole cast concurrently. Prompts are planned up
+    front (IMAGE_PROMPT_MODE: one batched LLM call, local templates, or a tool
+    call per character in "agent" mode) unless `plans` are given; Stable
+    Diffusion calls are limited to SD_MAX_CONCURRENCY. Returns one file path
+    (or None on failure) per character, in order, and prints per-image latency
+    (also appended to `timings`, one dict per character, if given).
+    """
+    if not characters:
+        return []
+    mode = _prompt_mode(mode)
+
+    started = time.perf_counter()
+    if mode == "agent" and plans is None:
+        jobs = [lambda c=c: generate_character_image(c) for c in characters]
+    else:
+        if plans is None:
+            plans = plan_image_prompts(characters, mode)
+            print(f"   [Images] Planned {len(plans)} prompts ({mode}) in {time.perf_counter() - started:.1f}s")
+        jobs = [lambda p=p: _raw_generate_image_api(**p, profile=profile) for p in plans]
+
+    def run(job):
+        job_started = time.perf_counter()
+        try:
+            result = job()
+        except Exception as e:
+            result = f"Error: {e}"
+        timing = getattr(_last_timing, "value", None)
+        return result, time.perf_counter() - job_started, timing
+
+    workers = max_workers or min(len(characters), 8)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="portrait") as pool:
+        outcomes = list(pool.map(run, jobs))
+    wall = time.perf_counter() - started
+
+    print(f"   [Images] {len(characters)} {profile} portraits in {wall:.1f}s "
+          f"(max {SD_MAX_CONCURRENCY} concurrent renders)")
+    paths: List[Optional[str]] = []
+    for character, (result, total, timing) in zip(characters, outcomes):
+        ok = _is_image_path(result)
+        detail = f"queue {timing[0]:.1f}s, render {timing[1]:.1f}s, " if timing else ""
+        status = "ok" if ok else result
+        print(f"     - {character.get('name')}: {detail}total {total:.1f}s [{status}]")
+        paths.append(result if ok else None)
+        if timings is not None:
+            timings.append({
+                "name": character.get("name"),
+                "ok": ok,
+                "queue_seconds": timing[0] if timing else None,
+                "render_seconds": timing[1] if timing else None,
+                "total_seconds": total,
+            })
+    return paths
+
+
+_background_renders: Optional[ThreadPoolExecutor] = None
+_background_renders_lock = threading.Lock()
+_pending_renders: Set[Future] = set()
+
+
+def _get_background_renders() -> ThreadPoolExecutor:
+    global _background_renders
+    with _background_renders_lock:
+        if _background_renders is None:
+            _background_renders = ThreadPoolExecutor(
+                max_workers=max(1, SD_MAX_CONCURRENCY), thread_name_prefix="portrait-full"
+            )
+        return _background_renders
+
+
+def start_progressive_portraits(
+    characters: List[Dict], mode: Optional[str] = None
+) -> List[Dict]:
+    """
+    Two-tier portraits: render "preview" profile images for the cast now and
+    queue the "full" renders in the background. Returns per character
+    {"preview": path or None, "image_id": content ID of the full portrait,
+    "future": Future of the full render's path}. The full portrait's ID is
+    known up front, so callers can reference it before it exists.
+    In "agent" mode prompts are only known after rendering, so everything is
+    rendered at full quality right away instead.
+    """
+    mode = _prompt_mode(mode)
+    if mode == "agent":
+        results = []
+        for path in generate_character_images(characters, mode=mode):
+            future: Future = Future()
+            future.set_result(path)
+            results.append({"preview": path, "image_id": image_id_from_path(path), "future": future})
+        return results
+
+    plans = plan_image_prompts(characters, mode)
+    previews = generate_character_images(characters, mode=mode, profile="preview", plans=plans)
+    pool = _get_background_renders()
+    results = []
+    for plan, preview in zip(plans, previews):
+        future = pool.submit(_raw_generate_image_api, **plan, profile="full")
+        with _background_renders_lock:
+            _pending_renders.add(future)
+        future.add_done_callback(_forget_render)
+        results.append({"preview": preview, "image_id": planned_image_id(plan, "full"), "future": future})
+    return results
+
+
+def _forget_render(future: Future) -> None:
+    with _background_renders_lock:
+        _pending_renders.discard(future)
+
+
+def drain_background_renders(timeout: Optional[float] = None) -> bool:
+    """Wait for queued full-quality renders (graceful shutdown). False if some are still running after `timeout`."""
+    with _background_renders_lock:
+        pending = list(_pending_renders)
+    if pending:
+        print(f"[SD] Waiting for {len(pending)} background portrait render(s)")
+    _, not_done = wait(pending, timeout=timeout)
+    return not not_done
+
+
 # --- Usage Example ---
 if __name__ == "__main__":
     char = {
@@ -0,0 +1,120 @@
+# image_tool/portrait_store.py
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from llm_pipeline.mystery_store import get_mystery_store
+from llm_pipeline.pdf_cache import PdfCache, content_key
+
+PORTRAIT_STORE_DIR = os.getenv("PORTRAIT_STORE_DIR", "image_tool/image_output/portraits")
+PORTRAIT_STORE_MAX_BYTES = int(os.getenv("PORTRAIT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+PORTRAIT_EXT = ".png"
+
+
+def portrait_id(prompt: str, negative_prompt: str, settings: Dict) -> str:
+    """Content ID of a portrait: hash of the final SD prompt, negative prompt and render settings."""
+    return content_key("portrait", prompt, negative_prompt, settings)
+
+
+class PortraitStore(PdfCache):
+    """
+    Content-addressed portrait files (`<image_id>.png`), written atomically and
+    LRU-evicted above `max_bytes`. Lookups return file paths so portraits can be
+    served and embedded without reading them into memory. Portraits whose IDs
+    `referenced()` returns (those of stored mysteries) are never evicted.
+    """
+
+    def __init__(
+        self,
+        directory: str = PORTRAIT_STORE_DIR,
+        max_bytes: int = PORTRAIT_STORE_MAX_BYTES,
+        referenced: Optional[Callable[[], Iterable[str]]] = None,
+    ):
+        super().__init__(directory, max_bytes)
+        self.referenced = referenced
+        # image_id -> [lock, holders and waiters]; dropped when the last one leaves
+        self._key_locks: Dict[str, List] = {}
+
+    def _pinned(self) -> Set[str]:
+        if self.referenced is None:
+            return set()
+        try:
+            return {image_id + PORTRAIT_EXT for image_id in self.referenced()}
+        except Exception as e:
+            # Unknown references: evicting could break stored mysteries, so keep everything
+            print(f"[Warning] Could not read referenced portraits ({e}); skipping eviction")
+            return {name for name in os.listdir(self.directory)}
+
+    def path_for(self, image_id: str) -> str:
+        return self._path(image_id + PORTRAIT_EXT)
+
+    def lookup(self, image_id: str) -> Optional[str]:
+        """Path of a stored portrait (marked as recently used), or None."""
+        path = self.path_for(image_id)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def store(self, image_id: str, data: bytes) -> str:
+        self.put(image_id + PORTRAIT_EXT, data)
+        return self.path_for(image_id)
+
+    @contextmanager
+    def render_lock(self, image_id: str):
+        """Hold the per-ID lock, so concurrent requests for the same portrait render it once."""
+        with self._lock:
+            entry = self._key_locks.setdefault(image_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[image_id]
+
+
+def image_id_from_path(path: Optional[str]) -> Optional[str]:
+    """Content ID of a path inside the portrait store, else None."""
+    if not path:
+        return None
+    directory, filename = os.path.split(os.path.abspath(path))
+    if directory != os.path.abspath(PORTRAIT_STORE_DIR) or not filename.endswith(PORTRAIT_EXT):
+        return None
+    return filename[: -len(PORTRAIT_EXT)]
+
+
+def portrait_path(image_id: Optional[str]) -> Optional[str]:
+    """File path of a stored portrait by content ID (without touching the store's LRU state)."""
+    if not image_id:
+        return None
+    path = os.path.join(PORTRAIT_STORE_DIR, os.path.basename(image_id) + PORTRAIT_EXT)
+    return path if os.path.exists(path) else None
+
+
+_default_store: Optional[PortraitStore] = None
+_default_store_lock = threading.Lock()
+
+
+def _stored_mystery_portraits() -> Set[str]:
+    return get_mystery_store().referenced_portraits()
+
+
+def get_portrait_store() -> PortraitStore:
+    """
+    Process-wide store (PORTRAIT_STORE_DIR, PORTRAIT_STORE_MAX_BYTES) that
+    keeps the portraits of mysteries in the mystery store.
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PortraitStore(referenced=_stored_mystery_portraits)
+        return _default_store
@@ -1,6 +1,6 @@
 # llm_pipeline/case_generator.py
-from typing import Dict
-from .llm_client import chat_json
+from typing import Dict, Tuple
+from .llm_client import chat_json, chat_json_async
 
 
 def generate_case(user_prompt: str, location: str, menu: Dict) -> Dict:
@@ -8,7 +8,17 @@ def generate_case(user_prompt: str, location: str, menu: Dict) -> Dict:
     Uses LM Studio to generate a murder-mystery case with a controversial victim and theme,
     taking into account a concrete location and a dinner menu (starter, main, dessert).
     """
+    system_prompt, user_instruction = _case_prompts(user_prompt, location, menu)
+    return _finish_case(chat_json(system_prompt, user_instruction), location)
 
+
+async def generate_case_async(user_prompt: str, location: str, menu: Dict) -> Dict:
+    """`generate_case` that awaits the LLM call (ASGI server)."""
+    system_prompt, user_instruction = _case_prompts(user_prompt, location, menu)
+    return _finish_case(await chat_json_async(system_prompt, user_instruction), location)
+
+
+def _case_prompts(user_prompt: str, location: str, menu: Dict) -> Tuple[str, str]:
     starter = menu.get("starter")
     main = menu.get("main")
     dessert = menu.get("dessert")
@@ -50,8 +60,10 @@ Return JSON with the following keys:
 - timeline: 1–3 sentences describing the rough timeline of the crime
 """
 
-    result = chat_json(system_prompt, user_instruction)
+    return system_prompt, user_instruction
+
 
+def _finish_case(result: Dict, location: str) -> Dict:
     # Add minimal fallback if something goes wrong
     if "victim_name" not in result:
         result = {
@@ -0,0 +1,203 @@
+# llm_pipeline/cassette.py
+"""
+Record/replay of backend calls (LLM chat completions and Stable Diffusion
+txt2img) to a cassette file, so the non-LLM parts of the pipeline can be
+profiled and benchmarked deterministically without any network.
+
+    CASSETTE_MODE=record CASSETTE_PATH=outputs/cassettes/run.jsonl.gz python main.py
+    CASSETTE_MODE=replay CASSETTE_PATH=outputs/cassettes/run.jsonl.gz python main.py
+
+Each exchange is stored as one JSON line: call kind, request hash, recorded
+latency and the response. Replay matches on the request hash (repeated
+identical requests replay in recorded order) and falls back to the next
+unused exchange of the same kind when a request changed slightly.
+CASSETTE_TIME_SCALE scales the recorded latency on replay: 0 drops it
+(default), 1 keeps the original pace.
+"""
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from .pdf_cache import content_key
+
+CASSETTE_MODES = ("off", "record", "replay")
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").strip().lower() or "off"
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "outputs/cassettes/cassette.jsonl.gz")
+CASSETTE_TIME_SCALE = float(os.getenv("CASSETTE_TIME_SCALE", "0"))
+
+
+class CassetteMiss(RuntimeError):
+    """Replay found no recorded exchange for a call."""
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _summary(request: Any) -> str:
+    """Short human-readable hint of what a request was, for inspecting cassettes."""
+    if isinstance(request, dict):
+        messages = request.get("messages")
+        if messages:
+            return " ".join(str(messages[-1].get("content") or "").split())[:80]
+        if "prompt" in request:
+            return " ".join(str(request["prompt"]).split())[:80]
+    return ""
+
+
+class Cassette:
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE, time_scale: float = CASSETTE_TIME_SCALE):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"CASSETTE_MODE must be one of {CASSETTE_MODES}, got '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._by_kind: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._used: set = set()
+        self.recorded = 0
+        self.replayed = 0
+        self.fallbacks = 0
+
+        if mode == "record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with _open(path, "w") as f:
+                f.write(json.dumps({"cassette": 1, "created": time.time()}) + "\n")
+        elif mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        with _open(self.path, "r") as f:
+            for index, line in enumerate(f):
+                entry = json.loads(line)
+                if "kind" not in entry:
+                    continue  # header
+                entry["_index"] = index
+                self._by_key[entry["key"]].append(entry)
+                self._by_kind[entry["kind"]].append(entry)
+        print(f"[Cassette] Replaying {sum(len(q) for q in self._by_kind.values())} exchanges from {self.path}")
+
+    def _take(self, kind: str, key: str) -> Dict:
+        with self._lock:
+            queue = self._by_key.get(key)
+            while queue and queue[0]["_index"] in self._used:
+                queue.popleft()
+            if queue:
+                entry = queue.popleft()
+            else:
+                fallback = self._by_kind.get(kind)
+                while fallback and fallback[0]["_index"] in self._used:
+                    fallback.popleft()
+                if not fallback:
+                    raise CassetteMiss(f"No recorded '{kind}' exchange left in {self.path}")
+                entry = fallback.popleft()
+                self.fallbacks += 1
+                print(f"[Warning] Cassette: no exact match for '{kind}' request, replaying next recorded one")
+            self._used.add(entry["_index"])
+            self.replayed += 1
+            return entry
+
+    def _append(self, entry: Dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with _open(self.path, "a") as f:
+                f.write(line)
+            self.recorded += 1
+
+    def call(
+        self,
+        kind: str,
+        request: Any,
+        fn: Callable[[], Any],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """
+        Run `fn()` (off), run and record it (record), or return the recorded
+        response for `request` without calling it (replay). `encode`/`decode`
+        convert the response to and from JSON.
+        """
+        if self.mode == "off":
+            return fn()
+        key = content_key(kind, request)
+        if self.mode == "replay":
+            entry = self._take(kind, key)
+            if self.time_scale > 0:
+                time.sleep(entry["seconds"] * self.time_scale)
+            return decode(entry["response"])
+
+        started = time.perf_counter()
+        result = fn()
+        self._record(kind, key, request, time.perf_counter() - started, encode(result))
+        return result
+
+    async def call_async(
+        self,
+        kind: str,
+        request: Any,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """`call` for coroutines; shares recordings with the sync calls of the same kind."""
+        if self.mode == "off":
+            return await fn()
+        key = content_key(kind, request)
+        if self.mode == "replay":
+            entry = self._take(kind, key)
+            if self.time_scale > 0:
+                await asyncio.sleep(entry["seconds"] * self.time_scale)
+            return decode(entry["response"])
+
+        started = time.perf_counter()
+        result = await fn()
+        self._record(kind, key, request, time.perf_counter() - started, encode(result))
+        return result
+
+    def _record(self, kind: str, key: str, request: Any, seconds: float, response: Any) -> None:
+        self._append({
+            "kind": kind,
+            "key": key,
+            "seconds": round(seconds, 4),
+            "summary": _summary(request),
+            "response": response,
+        })
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "fallbacks": self.fallbacks,
+            }
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Process-wide cassette configured by CASSETTE_MODE / CASSETTE_PATH / CASSETTE_TIME_SCALE."""
+    global _active
+    with _active_lock:
+        if _active is None:
+            _active = Cassette()
+        return _active
+
+
+def use_cassette(path: str, mode: str, time_scale: float = CASSETTE_TIME_SCALE) -> Cassette:
+    """Switch the process-wide cassette (e.g. from a benchmark)."""
+    global _active
+    with _active_lock:
+        _active = Cassette(path, mode, time_scale)
+        return _active
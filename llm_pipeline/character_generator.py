@@ -1,9 +1,10 @@
 # llm_pipeline/character_generator.py
+import asyncio
 import json
 import random
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from rag.retriever import RagRetriever
-from .llm_client import chat_json
+from .llm_client import chat_json, chat_json_async
 
 REQUIRED_FIELDS = [
     "name",
@@ -167,6 +168,31 @@ def generate_characters(
     retriever: RagRetriever,
 ) -> List[Dict[str, Any]]:
     """Generate, normalize, and validate a fixed-size character cast."""
+    system_prompt, user_instruction, allowed_doc_ids = _character_prompts(case_data, num_characters, retriever)
+    return _finish_characters(chat_json(system_prompt, user_instruction), num_characters, allowed_doc_ids)
+
+
+async def generate_characters_async(
+    case_data: Dict,
+    num_characters: int,
+    retriever: RagRetriever,
+) -> List[Dict[str, Any]]:
+    """
+    `generate_characters` that awaits the LLM call (ASGI server). Retrieval
+    (NumPy and BM25 work) and the cast validation run in a worker thread.
+    """
+    system_prompt, user_instruction, allowed_doc_ids = await asyncio.to_thread(
+        _character_prompts, case_data, num_characters, retriever
+    )
+    raw_result = await chat_json_async(system_prompt, user_instruction)
+    return await asyncio.to_thread(_finish_characters, raw_result, num_characters, allowed_doc_ids)
+
+
+def _character_prompts(
+    case_data: Dict,
+    num_characters: int,
+    retriever: RagRetriever,
+) -> Tuple[str, str, Set[str]]:
     system_prompt = (
         "You are a writer of interactive murder mysteries. "
         "You MUST output ONLY valid JSON. No markdown, no commentary. "
@@ -209,7 +235,10 @@ SCHEMA (no extra keys):
 ]
 """
 
-    raw_result = chat_json(system_prompt, user_instruction)
+    return system_prompt, user_instruction, allowed_doc_ids
+
+
+def _finish_characters(raw_result: Any, num_characters: int, allowed_doc_ids: Set[str]) -> List[Dict[str, Any]]:
     result = _coerce_character_list(raw_result)
 
     if not isinstance(result, list):
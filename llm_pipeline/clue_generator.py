@@ -1,6 +1,6 @@
 # llm_pipeline/clue_generator.py
-from typing import List, Dict, Any
-from .llm_client import chat_json
+from typing import List, Dict, Any, Tuple
+from .llm_client import chat_json, chat_json_async
 
 def generate_clues(
     case_data: Dict,
@@ -15,7 +15,25 @@ def generate_clues(
     - characters (secrets, relationships, muderer_label)
     - last_day_data (events, suspicious moments)
     """
+    system_prompt, user_instruction = _clue_prompts(case_data, characters, last_day_data)
+    return _finish_clues(chat_json(system_prompt, user_instruction), characters)
 
+
+async def generate_clues_async(
+    case_data: Dict,
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict
+) -> List[Dict[str, Any]]:
+    """`generate_clues` that awaits the LLM call (ASGI server)."""
+    system_prompt, user_instruction = _clue_prompts(case_data, characters, last_day_data)
+    return _finish_clues(await chat_json_async(system_prompt, user_instruction), characters)
+
+
+def _clue_prompts(
+    case_data: Dict,
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict
+) -> Tuple[str, str]:
     system_prompt = (
         "You are an investigator designing advanced deduction puzzles. "
         "All output MUST be valid JSON."
@@ -77,8 +95,10 @@ IMPORTANT:
 - Ensure each clue references concrete details from CASE_DATA or LAST_DAY_DATA.
 """
 
-    result = chat_json(system_prompt, user_instruction)
+    return system_prompt, user_instruction
+
 
+def _finish_clues(result: Any, characters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # basic fallback if model fails:
     if not isinstance(result, list):
         result = [
@@ -0,0 +1,164 @@
+# llm_pipeline/export_jobs.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterable, Optional
+
+from .pdf_cache import get_pdf_cache
+from .pdf_generator import export_cache_key, iter_rendered_pdfs
+from .zip_stream import stream_zip
+
+# Render the ZIP export in the background as soon as a mystery is generated
+PDF_PRERENDER = os.getenv("PDF_PRERENDER", "1") == "1"
+PDF_PRERENDER_WORKERS = int(os.getenv("PDF_PRERENDER_WORKERS", "1"))
+# How long /export_pdf waits for an in-progress pre-render before answering 202
+PDF_PRERENDER_WAIT_SECONDS = float(os.getenv("PDF_PRERENDER_WAIT_SECONDS", "2"))
+# A running-marker older than this is left over from a crashed worker
+PRERENDER_MARKER_MAX_AGE_SECONDS = 3600
+# Number of mystery IDs whose export job is remembered
+MAX_TRACKED_EXPORTS = 256
+
+_EXPORT_KEYS = ("menu", "case_data", "characters", "last_day_data", "clues", "solution")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Jobs started by this process; other server processes are seen through the PDF cache
+_jobs: "OrderedDict[str, Future]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, PDF_PRERENDER_WORKERS), thread_name_prefix="pdf-prerender"
+            )
+        return _executor
+
+
+def _marker_path(mystery_id: str) -> str:
+    """Marker file in the PDF cache directory while any process pre-renders this mystery."""
+    return os.path.join(get_pdf_cache().directory, f".export-{os.path.basename(mystery_id)}.running")
+
+
+def _running_elsewhere(mystery_id: str) -> bool:
+    try:
+        age = time.time() - os.path.getmtime(_marker_path(mystery_id))
+    except OSError:
+        return False
+    return age < PRERENDER_MARKER_MAX_AGE_SECONDS
+
+
+def archive_key(mystery_data: Dict[str, Any]) -> str:
+    """PDF cache key of the ZIP export of a mystery."""
+    return export_cache_key(*(mystery_data[k] for k in _EXPORT_KEYS))
+
+
+def render_archive(mystery_data: Dict[str, Any]) -> str:
+    """Render the ZIP export into the PDF cache (no-op if already cached). Returns its key."""
+    cache = get_pdf_cache()
+    key = archive_key(mystery_data)
+    if cache.get(key) is None:
+        pdf_files = iter_rendered_pdfs(*(mystery_data[k] for k in _EXPORT_KEYS))
+        cache.put(key, b"".join(stream_zip(pdf_files)))
+    return key
+
+
+def _run(mystery_id: str, mystery_data: Dict[str, Any], wait_for: Iterable[Future] = ()) -> str:
+    # e.g. full-quality portraits still rendering in the background
+    failed = 0
+    for future in wait_for:
+        try:
+            path = future.result()
+        except Exception:
+            path = None
+        if not (isinstance(path, str) and os.path.isfile(path)):
+            failed += 1
+    if failed:
+        print(f"[Warning] {failed} full-quality portrait(s) of mystery {mystery_id} failed to render; "
+              f"the export uses their previews")
+    try:
+        key = render_archive(mystery_data)
+        print(f"[PDF] Pre-rendered export for mystery {mystery_id}")
+        return key
+    except Exception as e:
+        print(f"[Warning] Background PDF render for mystery {mystery_id} failed: {e}")
+        raise
+    finally:
+        try:
+            os.remove(_marker_path(mystery_id))
+        except OSError:
+            pass
+
+
+def schedule_export(
+    mystery_id: str, mystery_data: Dict[str, Any], wait_for: Iterable[Future] = ()
+) -> Optional[Future]:
+    """
+    Start rendering the ZIP export of a freshly generated mystery in the
+    background, once the `wait_for` futures are done.
+    """
+    if not PDF_PRERENDER:
+        return None
+    try:
+        with open(_marker_path(mystery_id), "w", encoding="ascii"):
+            pass
+    except OSError:
+        pass
+    future = _get_executor().submit(_run, mystery_id, mystery_data, list(wait_for))
+    with _jobs_lock:
+        _jobs[mystery_id] = future
+        while len(_jobs) > MAX_TRACKED_EXPORTS:
+            _jobs.popitem(last=False)
+    return future
+
+
+def get_export(
+    mystery_id: Optional[str], mystery_data: Dict[str, Any], timeout: float = PDF_PRERENDER_WAIT_SECONDS
+) -> Optional[bytes]:
+    """
+    ZIP bytes of the mystery's export from the PDF cache, whichever process
+    rendered it. A pre-render running in this process is waited for up to
+    `timeout` seconds. None if it is not (yet) cached: check `export_status`
+    to tell a running pre-render from one that never ran or failed.
+    """
+    with _jobs_lock:
+        future = _jobs.get(mystery_id) if mystery_id else None
+    cache = get_pdf_cache()
+    if future is not None:
+        try:
+            data = cache.get(future.result(timeout=timeout))
+            if data is not None:
+                return data
+        except FutureTimeout:
+            return None
+        except Exception:
+            pass
+    return cache.get(archive_key(mystery_data))
+
+
+def export_status(mystery_id: Optional[str], mystery_data: Optional[Dict[str, Any]] = None) -> str:
+    """State of the background export for a mystery: none, running, ready or failed."""
+    with _jobs_lock:
+        future = _jobs.get(mystery_id) if mystery_id else None
+    if future is not None and future.done():
+        return "failed" if future.exception() is not None else "ready"
+    if future is not None or (mystery_id and _running_elsewhere(mystery_id)):
+        return "running"
+    if mystery_data is not None and get_pdf_cache().contains(archive_key(mystery_data)):
+        return "ready"
+    return "none"
+
+
+def drain_exports(timeout: Optional[float] = None) -> bool:
+    """Wait for running export renders (graceful shutdown). False if some are still running after `timeout`."""
+    with _jobs_lock:
+        pending = [future for future in _jobs.values() if not future.done()]
+    if pending:
+        print(f"[PDF] Waiting for {len(pending)} background export(s)")
+    _, not_done = wait(pending, timeout=timeout)
+    return not not_done
@@ -1,13 +1,23 @@
 # llm_pipeline/last_day_victim.py
-from typing import Dict, List, Any
-from .llm_client import chat_json
+from typing import Dict, List, Any, Tuple
+from .llm_client import chat_json, chat_json_async
 
 def generate_last_day(case_data: Dict, characters: List[Dict[str, Any]]) -> Dict:
     """
     Uses the case data and the character list to reconstruct
     the victim's last day as a structured timeline.
     """
+    system_prompt, user_instruction = _last_day_prompts(case_data, characters)
+    return _finish_last_day(chat_json(system_prompt, user_instruction))
 
+
+async def generate_last_day_async(case_data: Dict, characters: List[Dict[str, Any]]) -> Dict:
+    """`generate_last_day` that awaits the LLM call (ASGI server)."""
+    system_prompt, user_instruction = _last_day_prompts(case_data, characters)
+    return _finish_last_day(await chat_json_async(system_prompt, user_instruction))
+
+
+def _last_day_prompts(case_data: Dict, characters: List[Dict[str, Any]]) -> Tuple[str, str]:
     system_prompt = (
         "You are an investigator reconstructing the victim's last day. "
         "Always respond with VALID JSON."
@@ -46,8 +56,10 @@ Return JSON with:
     - "suspicious": boolean indicating whether this event is suspicious
 """
 
-    result = chat_json(system_prompt, user_instruction)
+    return system_prompt, user_instruction
+
 
+def _finish_last_day(result: Dict) -> Dict:
     # Basic fallback if the model doesn't behave
     if not isinstance(result, dict) or "timeline" not in result:
         result = {
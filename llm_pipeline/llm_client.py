@@ -4,7 +4,11 @@ import json
 from typing import List, Dict, Optional
 
 from dotenv import load_dotenv
-from openai import OpenAI, BadRequestError
+from openai import AsyncOpenAI, BadRequestError, OpenAI
+from openai.types.chat import ChatCompletionMessage
+
+from .cassette import get_cassette
+from .scheduler import get_scheduler
 
 load_dotenv()
 
@@ -27,6 +31,11 @@ client = OpenAI(
     base_url=LM_STUDIO_BASE_URL,
     api_key=LM_STUDIO_API_KEY,
 )
+# Same endpoint for the async pipeline variants (ASGI server, see asgi.py)
+async_client = AsyncOpenAI(
+    base_url=LM_STUDIO_BASE_URL,
+    api_key=LM_STUDIO_API_KEY,
+)
 
 
 def _safe_print(text: str) -> None:
@@ -48,30 +57,54 @@ def chat(
     Low-level wrapper for LM Studio chat completion.
     messages: list of dicts like {"role": "user"/"system"/"assistant", "content": "..."}
     """
+    request = {
+        "model": LM_STUDIO_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
     try:
-        response = client.chat.completions.create(
-            model=LM_STUDIO_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-        return response.choices[0].message.content
+        # Queued by the LLM scheduler, recorded/replayed when CASSETTE_MODE is
+        # set (chat_json goes through here too)
+        with get_scheduler().slot():
+            return get_cassette().call(
+                "chat",
+                request,
+                lambda: client.chat.completions.create(**request).choices[0].message.content,
+            )
     except BadRequestError as e:
         _safe_print(f"[ERROR] LLM request failed: {e}")
         # Fallback so the web app does not crash
         return "LLM error: model crashed or request invalid."
 
 
-def chat_json(
-    system_prompt: str,
-    user_prompt: str,
-    temperature: float = 0.6,
-) -> Dict:
-    """
-    Helper that asks the model to return STRICT JSON and parses it.
-    Tries to be robust against extra markdown (``````).
-    """
-    messages = [
+async def chat_async(
+    messages: List[Dict[str, str]],
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """`chat` that awaits the completion instead of blocking the thread."""
+    request = {
+        "model": LM_STUDIO_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+
+    async def complete() -> str:
+        response = await async_client.chat.completions.create(**request)
+        return response.choices[0].message.content
+
+    try:
+        async with get_scheduler().slot_async():
+            return await get_cassette().call_async("chat", request, complete)
+    except BadRequestError as e:
+        _safe_print(f"[ERROR] LLM request failed: {e}")
+        return "LLM error: model crashed or request invalid."
+
+
+def _json_messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+    return [
         {"role": "system", "content": system_prompt},
         {
             "role": "user",
@@ -82,8 +115,31 @@ def chat_json(
         },
     ]
 
-    raw = chat(messages, temperature=temperature)
 
+def chat_json(
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.6,
+) -> Dict:
+    """
+    Helper that asks the model to return STRICT JSON and parses it.
+    Tries to be robust against extra markdown (``````).
+    """
+    raw = chat(_json_messages(system_prompt, user_prompt), temperature=temperature)
+    return _parse_json_reply(raw)
+
+
+async def chat_json_async(
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.6,
+) -> Dict:
+    """`chat_json` that awaits the completion instead of blocking the thread."""
+    raw = await chat_async(_json_messages(system_prompt, user_prompt), temperature=temperature)
+    return _parse_json_reply(raw)
+
+
+def _parse_json_reply(raw: str) -> Dict:
     # Try to find JSON if the model wrapped it in backticks
     raw_stripped = raw.strip()
     if raw_stripped.startswith("```"):
@@ -109,16 +165,23 @@ def chat_with_tools(
     Capable of handling function calling. Returns the full message object
     (which contains .tool_calls) instead of just the content string.
     """
+    request = {
+        "model": LM_STUDIO_MODEL,
+        "messages": messages,
+        "tools": tools,
+        "tool_choice": tool_choice,
+        "temperature": temperature,
+    }
     try:
-        response = client.chat.completions.create(
-            model=LM_STUDIO_MODEL,
-            messages=messages,
-            tools=tools,
-            tool_choice=tool_choice,
-            temperature=temperature,
-        )
         # Return the actual message object so we can check for tool_calls
-        return response.choices[0].message
+        with get_scheduler().slot():
+            return get_cassette().call(
+                "chat_with_tools",
+                request,
+                lambda: client.chat.completions.create(**request).choices[0].message,
+                encode=lambda message: message.model_dump(exclude_none=True),
+                decode=ChatCompletionMessage.model_validate,
+            )
     except BadRequestError as e:
         _safe_print(f"[ERROR] LLM tool request failed: {e}")
         return None
\ No newline at end of file
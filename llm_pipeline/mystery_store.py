@@ -0,0 +1,169 @@
+# llm_pipeline/mystery_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set
+
+MYSTERY_STORE_PATH = os.getenv("MYSTERY_STORE_PATH", "outputs/mysteries.sqlite3")
+# Mysteries not opened for this long are deleted (default 30 days)
+MYSTERY_TTL_SECONDS = int(os.getenv("MYSTERY_TTL_SECONDS", str(30 * 24 * 3600)))
+MYSTERY_CLEANUP_INTERVAL_SECONDS = int(os.getenv("MYSTERY_CLEANUP_INTERVAL_SECONDS", "3600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mysteries (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mysteries_accessed ON mysteries (accessed);
+CREATE TABLE IF NOT EXISTS mystery_portraits (
+    mystery_id TEXT NOT NULL,
+    image_id TEXT NOT NULL,
+    PRIMARY KEY (mystery_id, image_id)
+);
+CREATE INDEX IF NOT EXISTS mystery_portraits_image ON mystery_portraits (image_id);
+"""
+# PRAGMA user_version once mystery_portraits has been filled for older rows
+_SCHEMA_VERSION = 1
+
+# Character keys holding portrait-store IDs (full render and its preview)
+_PORTRAIT_ID_KEYS = ("image_id", "preview_image_id")
+
+
+def portrait_ids(data: Dict[str, Any]) -> List[str]:
+    """Portrait-store IDs a mystery's characters reference."""
+    ids = []
+    for character in data.get("characters") or []:
+        for key in _PORTRAIT_ID_KEYS:
+            image_id = character.get(key)
+            if image_id and image_id not in ids:
+                ids.append(image_id)
+    return ids
+
+
+class MysteryStore:
+    """
+    Generated mysteries keyed by mystery ID, as zlib-compressed JSON in SQLite
+    (WAL mode, so reads never wait for writes). Entries that have not been
+    read for `ttl_seconds` are deleted; cleanup runs on writes, at most once
+    per `cleanup_interval` seconds. The portraits a stored mystery references
+    are recorded, so the portrait store keeps them as long as the mystery.
+    """
+
+    def __init__(
+        self,
+        path: str = MYSTERY_STORE_PATH,
+        ttl_seconds: int = MYSTERY_TTL_SECONDS,
+        cleanup_interval: int = MYSTERY_CLEANUP_INTERVAL_SECONDS,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            self._record_existing_portraits(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, mystery_id: str, data: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT OR REPLACE INTO mysteries (id, created, accessed, data) VALUES (?, ?, ?, ?)",
+                (mystery_id, now, now, blob),
+            )
+            conn.execute("DELETE FROM mystery_portraits WHERE mystery_id = ?", (mystery_id,))
+            conn.executemany(
+                "INSERT INTO mystery_portraits (mystery_id, image_id) VALUES (?, ?)",
+                [(mystery_id, image_id) for image_id in portrait_ids(data)],
+            )
+        self._maybe_cleanup(now)
+
+    def _record_existing_portraits(self, conn: sqlite3.Connection) -> None:
+        """Fill mystery_portraits for mysteries stored before it existed (runs once)."""
+        with conn:
+            conn.execute("BEGIN")
+            for mystery_id, blob in conn.execute("SELECT id, data FROM mysteries").fetchall():
+                data = json.loads(zlib.decompress(blob).decode("utf-8"))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO mystery_portraits (mystery_id, image_id) VALUES (?, ?)",
+                    [(mystery_id, image_id) for image_id in portrait_ids(data)],
+                )
+            conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def referenced_portraits(self) -> Set[str]:
+        """Portrait IDs used by any stored mystery (kept by the portrait store's eviction)."""
+        return {row[0] for row in self._conn().execute("SELECT DISTINCT image_id FROM mystery_portraits")}
+
+    def get(self, mystery_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The stored mystery (and mark it as recently opened), or None."""
+        if not mystery_id:
+            return None
+        conn = self._conn()
+        row = conn.execute("SELECT data FROM mysteries WHERE id = ?", (mystery_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE mysteries SET accessed = ? WHERE id = ?", (time.time(), mystery_id))
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Delete entries not opened within the TTL; returns how many were deleted."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            deleted = conn.execute("DELETE FROM mysteries WHERE accessed < ?", (cutoff,)).rowcount
+            # Their portraits become ordinary LRU entries of the portrait store
+            conn.execute("DELETE FROM mystery_portraits WHERE mystery_id NOT IN (SELECT id FROM mysteries)")
+        if deleted:
+            print(f"[Mystery store] Deleted {deleted} expired mysteries")
+        return deleted
+
+    def _maybe_cleanup(self, now: float) -> None:
+        with self._lock:
+            if now - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = now
+        try:
+            self.cleanup(now)
+        except sqlite3.Error as e:
+            print(f"[Warning] Mystery store cleanup failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM mysteries"
+        ).fetchone()
+        return {"path": self.path, "mysteries": count, "bytes": size, "ttl_seconds": self.ttl_seconds}
+
+
+_default_store: Optional[MysteryStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_mystery_store() -> MysteryStore:
+    """Process-wide store (MYSTERY_STORE_PATH, MYSTERY_TTL_SECONDS)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MysteryStore()
+        return _default_store
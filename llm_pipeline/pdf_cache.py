@@ -0,0 +1,166 @@
+# llm_pipeline/pdf_cache.py
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Iterable, Iterator, Optional, Set
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "outputs/pdf_cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def _json_default(obj: Any):
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def content_key(*parts: Any) -> str:
+    """Stable SHA-256 over JSON-serializable parts (dict key order does not matter)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_file_digests: dict = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """SHA-256 of a file's bytes, memoized per (path, size, mtime)."""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _file_digests_lock:
+        digest = _file_digests.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with _file_digests_lock:
+            _file_digests[memo_key] = digest
+    return digest
+
+
+class PdfCache:
+    """
+    Size-bounded on-disk cache of rendered documents and export archives,
+    keyed by content hash. Hits refresh the file's mtime; when the total size
+    exceeds `max_bytes` the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    st = entry.stat()
+                    yield entry.path, st.st_size, st.st_mtime_ns
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def contains(self, key: str) -> bool:
+        """Whether `key` is cached, without reading it or counting a hit."""
+        return os.path.isfile(self._path(key))
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        tmp = f"{self.directory}/.{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _pinned(self) -> Set[str]:
+        """File names that eviction must keep (none here; see PortraitStore)."""
+        return set()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits (lock held)."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        pinned = self._pinned() if total > self.max_bytes else set()
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) in pinned:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def tee_into_cache(
+    chunks: Iterable[bytes], cache: PdfCache, key: str
+) -> Iterator[bytes]:
+    """Pass chunks through and store their concatenation once the stream completes."""
+    collected = []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    cache.put(key, b"".join(collected))
+
+
+_default_cache: Optional[PdfCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PdfCache:
+    """Process-wide cache instance (PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PdfCache()
+        return _default_cache
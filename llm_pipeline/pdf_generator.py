@@ -1,10 +1,22 @@
+import atexit
+import copy
+import io
 import json
+import multiprocessing
 import os
 import re
-from typing import Dict, List, Any, Optional
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 
+from fontTools import ttLib
 from fpdf import FPDF
 
+from image_tool.portrait_store import portrait_path
+from .pdf_cache import PdfCache, content_key, file_digest, get_pdf_cache
+from .pdf_images import PORTRAIT_WIDTH_MM, image_settings, prepare_image
+
 
 # ----------------------------
 # Font handling (Unicode)
@@ -12,14 +24,20 @@ from fpdf import FPDF
 DEFAULT_FONT_FAMILY = "DejaVu"
 
 
-def _find_font_file() -> Optional[str]:
+# TTF file per style used by the documents (regular text and bold headings/labels)
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}
+
+
+@lru_cache(maxsize=None)
+def _find_font_file(style: str = "") -> Optional[str]:
+    filename = FONT_FILES[style]
     candidates = [
-        os.path.join(os.getcwd(), "assets", "fonts", "DejaVuSans.ttf"),
-        os.path.join(os.getcwd(), "DejaVuSans.ttf"),
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/local/share/fonts/dejavu/DejaVuSans.ttf",
-        "/Library/Fonts/DejaVuSans.ttf",
-        "/System/Library/Fonts/Supplemental/DejaVuSans.ttf",
+        os.path.join(os.getcwd(), "assets", "fonts", filename),
+        os.path.join(os.getcwd(), filename),
+        f"/usr/share/fonts/truetype/dejavu/{filename}",
+        f"/usr/local/share/fonts/dejavu/{filename}",
+        f"/Library/Fonts/{filename}",
+        f"/System/Library/Fonts/Supplemental/{filename}",
     ]
     for p in candidates:
         if os.path.exists(p):
@@ -27,21 +45,54 @@ def _find_font_file() -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=None)
+def _parsed_font(style: str = ""):
+    """The TTF of `style` parsed once per process (cmap, widths, metrics), copied into every document."""
+    font_path = _find_font_file(style)
+    if not font_path:
+        return None
+    pdf = FPDF()
+    pdf.add_font(DEFAULT_FONT_FAMILY, style, font_path)
+    return pdf.fonts[DEFAULT_FONT_FAMILY.lower() + style]
+
+
 def _register_fonts(pdf: FPDF) -> None:
-    font_path = _find_font_file()
-    if font_path:
-        pdf.add_font(DEFAULT_FONT_FAMILY, "", font_path, uni=True)
-        pdf.add_font(DEFAULT_FONT_FAMILY, "B", font_path, uni=True)
-    # else: fallback to core fonts; PDF still works but may show '?' for unsupported chars
+    # Without the regular TTF: core fonts; PDF still works but may show '?' for unsupported chars
+    if _parsed_font("") is None:
+        return
+    for style in FONT_FILES:
+        template = _parsed_font(style)
+        if template is None:
+            continue
+        # fpdf2's own copy shares the parsed tables and gives the document its own glyph subset.
+        # Subsetting in output() rewrites the fontTools font in place, so each document also
+        # gets a fresh (lazily loaded) handle on the file.
+        font = copy.deepcopy(template)
+        font.i = len(pdf.fonts) + 1
+        font.ttfont = ttLib.TTFont(font.ttffile, recalcTimestamp=False, fontNumber=0, lazy=True)
+        pdf.fonts[font.fontkey] = font
 
 
 def _set_font(pdf: FPDF, style: str, size: int) -> None:
-    try:
+    family = DEFAULT_FONT_FAMILY.lower()
+    if family + style in pdf.fonts:
         pdf.set_font(DEFAULT_FONT_FAMILY, style, size)
-    except Exception:
+    elif family in pdf.fonts:
+        # No TTF for this style was found: regular weight rather than a core font without Unicode
+        pdf.set_font(DEFAULT_FONT_FAMILY, "", size)
+    else:
         pdf.set_font("Helvetica", style, size)
 
 
+# ----------------------------
+# Output file names
+# ----------------------------
+MENU_PDF = "dinner_menu_and_recipes.pdf"
+LAST_DAY_PDF = "victims_last_day.pdf"
+CLUES_PDF = "character_clues.pdf"
+SOLUTION_PDF = "final_solution.pdf"
+
+
 # ----------------------------
 # Content filters (remove unwanted fields)
 # ----------------------------
@@ -57,7 +108,15 @@ DROP_KEYS_CASE = {
     "source references",
 }
 
-DROP_KEYS_CHARACTER_DETAILS = {
+# Portrait bookkeeping set by the web app and the CLI, not player-facing
+PORTRAIT_KEYS = {
+    "image_id",
+    "image_path",
+    "preview_image_id",
+    "full_image_path",
+}
+
+DROP_KEYS_CHARACTER_DETAILS = PORTRAIT_KEYS | {
     "controversial_theme",
     "controversial theme",
     "secret",
@@ -73,6 +132,34 @@ DROP_KEYS_CHARACTER_DETAILS = {
 # ----------------------------
 # Text cleaning / normalization
 # ----------------------------
+_SOURCE_REFERENCES_RE = re.compile(r"\n?Source References:\s*\n(?:-.*\n?)*", re.IGNORECASE)
+_HARD_WRAP_RE = re.compile(r"([A-Za-zÀ-ÖØ-öø-ÿ])\n([A-Za-zÀ-ÖØ-öø-ÿ])")
+_LINE_BREAK_RE = re.compile(r"\s*\n\s*")
+_MULTI_SPACE_RE = re.compile(r"[ \t]{2,}")
+_LONG_TOKEN_RE = re.compile(r"[^ ]{31,}")
+
+_PUNCTUATION_TABLE = str.maketrans(
+    {
+        "“": '"',
+        "”": '"',
+        "„": '"',
+        "’": "'",
+        "‘": "'",
+        "–": "-",
+        "—": "-",
+        "…": "...",
+        "\u00a0": " ",  # NBSP
+        "\u200b": "",   # zero-width space
+        "\ufeff": "",   # BOM
+    }
+)
+
+# Anything the cleaning pipeline would change; text without a match is returned as is.
+_NEEDS_CLEANING_RE = re.compile(
+    r"[\n“”„’‘–—…\u00a0\u200b\ufeff]|[ \t]{2}|^\s|\s$|[^ ]{31,}"
+)
+
+
 def _strip_source_references_block(text: str) -> str:
     """
     Remove blocks like:
@@ -80,41 +167,22 @@ def _strip_source_references_block(text: str) -> str:
     - doc1
     - doc2
     """
-    return re.sub(
-        r"\n?Source References:\s*\n(?:-.*\n?)*",
-        "",
-        text,
-        flags=re.IGNORECASE,
-    )
+    return _SOURCE_REFERENCES_RE.sub("", text)
 
 
 def _fix_hard_wraps_inside_words(text: str) -> str:
     """
     Fix cases like 're\\nvealed' or 'wit\\nh' caused by hard line breaks inside words.
     """
-    text = re.sub(r"([A-Za-zÀ-ÖØ-öø-ÿ])\n([A-Za-zÀ-ÖØ-öø-ÿ])", r"\1\2", text)
-    text = re.sub(r"\s*\n\s*", " ", text)
-    text = re.sub(r"[ \t]{2,}", " ", text).strip()
+    if "\n" in text:
+        text = _HARD_WRAP_RE.sub(r"\1\2", text)
+        text = _LINE_BREAK_RE.sub(" ", text)
+    text = _MULTI_SPACE_RE.sub(" ", text).strip()
     return text
 
 
 def _normalize_punctuation(text: str) -> str:
-    replacements = {
-        "“": '"',
-        "”": '"',
-        "„": '"',
-        "’": "'",
-        "‘": "'",
-        "–": "-",
-        "—": "-",
-        "…": "...",
-        "\u00a0": " ",  # NBSP
-        "\u200b": "",   # zero-width space
-        "\ufeff": "",   # BOM
-    }
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-    return text
+    return text.translate(_PUNCTUATION_TABLE)
 
 
 def _break_long_tokens(text: str, chunk: int = 30) -> str:
@@ -123,22 +191,23 @@ def _break_long_tokens(text: str, chunk: int = 30) -> str:
     into extremely long tokens (e.g., URLs, hashes, long AI strings without spaces).
     This allows wrapmode="WORD" without crashes or ugly mid-word splits.
     """
-    def split_token(tok: str) -> str:
-        if len(tok) <= chunk:
-            return tok
+    def split_token(match: "re.Match") -> str:
+        tok = match.group(0)
         return " ".join(tok[i:i + chunk] for i in range(0, len(tok), chunk))
 
-    parts = text.split(" ")
-    parts = [split_token(p) for p in parts]
-    return " ".join(parts)
+    if chunk == 30:
+        return _LONG_TOKEN_RE.sub(split_token, text)
+    return re.sub(rf"[^ ]{{{chunk + 1},}}", split_token, text)
 
 
-def _clean_text(value: Any) -> str:
-    if value is None:
-        return ""
-    text = str(value)
+@lru_cache(maxsize=8192)
+def _clean_str(text: str) -> str:
+    """Memoized cleaning: the same case text is cleaned once, not once per sheet."""
+    if not _NEEDS_CLEANING_RE.search(text):
+        return text
 
-    text = _strip_source_references_block(text)
+    if "\n" in text:
+        text = _strip_source_references_block(text)
     text = _fix_hard_wraps_inside_words(text)
     text = _normalize_punctuation(text)
     text = _break_long_tokens(text, chunk=30)
@@ -146,6 +215,12 @@ def _clean_text(value: Any) -> str:
     return text
 
 
+def _clean_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return _clean_str(value if type(value) is str else str(value))
+
+
 def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
@@ -159,6 +234,42 @@ def _new_pdf() -> FPDF:
     return pdf
 
 
+class _BookletPDF(FPDF):
+    """One FPDF shared by every section of the booklet export."""
+
+
+def _begin_document(pdf: Optional[FPDF], bookmark: str, level: int = 0) -> FPDF:
+    """
+    Start a document: a fresh PDF for the per-file export, or a new page with an
+    outline entry when drawing into the shared booklet.
+    """
+    if pdf is None:
+        return _new_pdf()
+    pdf.add_page()
+    _bookmark(pdf, bookmark, level)
+    return pdf
+
+
+def _bookmark(pdf: FPDF, text: str, level: int = 0) -> None:
+    if isinstance(pdf, _BookletPDF):
+        pdf.start_section(_clean_text(text), level=level)
+
+
+def _cut_line(pdf: FPDF) -> None:
+    """Dashed cut-out guide above the top margin of a handout page (booklet only)."""
+    if not isinstance(pdf, _BookletPDF):
+        return
+    y = pdf.t_margin - 6
+    with pdf.local_context():
+        pdf.set_draw_color(150, 150, 150)
+        pdf.set_dash_pattern(dash=2, gap=2)
+        pdf.line(5, y, pdf.w - 5, y)
+        pdf.set_dash_pattern()
+        _set_font(pdf, "", 7)
+        pdf.set_text_color(150, 150, 150)
+        pdf.text(pdf.w - 30, y - 1, "cut along the line")
+
+
 def _title(pdf: FPDF, text: str) -> None:
     _set_font(pdf, "B", 18)
     pdf.cell(0, 10, _clean_text(text), ln=True)
@@ -182,35 +293,36 @@ def _paragraph(pdf: FPDF, text: str) -> None:
 
 
 def _kv(pdf: FPDF, key: str, value: Any) -> None:
+    _kv_cleaned(pdf, _clean_text(f"{key}:"), _clean_text(value))
+
+
+def _kv_cleaned(pdf: FPDF, key_text: str, value_text: str) -> None:
+    """Draw a key/value pair whose texts already went through _clean_text."""
     _set_font(pdf, "B", 11)
     pdf.set_x(pdf.l_margin)
-    pdf.cell(0, 6, _clean_text(f"{key}:"), ln=True)
+    pdf.cell(0, 6, key_text, ln=True)
 
     _set_font(pdf, "", 11)
     pdf.set_x(pdf.l_margin)
     w = pdf.w - pdf.l_margin - pdf.r_margin
-    pdf.multi_cell(w, 6, _clean_text(value), wrapmode="WORD")
+    pdf.multi_cell(w, 6, value_text, wrapmode="WORD")
 
 
 def _pretty_value(value: Any) -> str:
+    if isinstance(value, str):
+        return value
     if value is None:
         return ""
     if isinstance(value, bool):
         return "Yes" if value else "No"
     if isinstance(value, (int, float)):
         return str(value)
-    if isinstance(value, str):
-        return value
 
     if isinstance(value, list):
-        parts: List[str] = []
-        for item in value:
-            if isinstance(item, dict):
-                # compact dict summary
-                parts.append("; ".join(f"{k}: {v}" for k, v in item.items()))
-            else:
-                parts.append(str(item))
-        return "\n".join(f"- {p}" for p in parts) if parts else ""
+        return "\n".join(
+            "- " + ("; ".join(f"{k}: {v}" for k, v in item.items()) if isinstance(item, dict) else str(item))
+            for item in value
+        )
 
     if isinstance(value, dict):
         lines: List[str] = []
@@ -219,8 +331,7 @@ def _pretty_value(value: Any) -> str:
                 lines.append(f"{k}:")
                 nested = _pretty_value(v)
                 if nested:
-                    for ln in nested.splitlines():
-                        lines.append(f"  {ln}")
+                    lines.extend("  " + ln for ln in nested.splitlines())
             else:
                 lines.append(f"{k}: {v}")
         return "\n".join(lines)
@@ -228,9 +339,10 @@ def _pretty_value(value: Any) -> str:
     return str(value)
 
 
-def _render_case_section(pdf: FPDF, case_data: Dict[str, Any]) -> None:
+def _case_section_items(case_data: Dict[str, Any]) -> List[Tuple[str, str]]:
     """
-    Render case data in a readable way, excluding unwanted keys.
+    Cleaned (label, value) pairs of the case section, excluding unwanted keys.
+    Computed once per mystery and replayed on every character sheet.
     """
     preferred = [
         "title",
@@ -250,13 +362,14 @@ def _render_case_section(pdf: FPDF, case_data: Dict[str, Any]) -> None:
     ]
 
     rendered_keys = set()
+    keys: List[str] = []
 
     def allowed(k: str) -> bool:
         return k.strip().lower() not in DROP_KEYS_CASE
 
     for key in preferred:
         if key in case_data and allowed(key) and case_data[key] not in (None, "", [], {}):
-            _kv(pdf, key.replace("_", " ").title(), _pretty_value(case_data[key]))
+            keys.append(key)
             rendered_keys.add(key)
 
     for key in sorted(case_data.keys()):
@@ -264,38 +377,62 @@ def _render_case_section(pdf: FPDF, case_data: Dict[str, Any]) -> None:
             continue
         if not allowed(key):
             continue
-        value = case_data[key]
-        if value in (None, "", [], {}):
+        if case_data[key] in (None, "", [], {}):
             continue
-        _kv(pdf, key.replace("_", " ").title(), _pretty_value(value))
+        keys.append(key)
 
+    return [
+        (_clean_text(f"{key.replace('_', ' ').title()}:"), _clean_text(_pretty_value(case_data[key])))
+        for key in keys
+    ]
 
-def create_menu_pdf(menu: Dict[str, Any], output_dir: str) -> str:
-    _ensure_dir(output_dir)
-    pdf = _new_pdf()
+
+def _render_case_section(
+    pdf: FPDF,
+    case_data: Dict[str, Any],
+    items: Optional[List[Tuple[str, str]]] = None,
+) -> None:
+    """
+    Render case data in a readable way, excluding unwanted keys.
+    Pass precomputed `items` to skip re-cleaning the same case for every sheet.
+    """
+    if items is None:
+        items = _case_section_items(case_data)
+    for key_text, value_text in items:
+        _kv_cleaned(pdf, key_text, value_text)
+
+
+def _build_menu_pdf(menu: Dict[str, Any], pdf: Optional[FPDF] = None) -> FPDF:
+    pdf = _begin_document(pdf, "Dinner Menu and Recipes")
     _title(pdf, "Dinner Menu and Recipes")
 
     for label, key in [("Starter", "starter"), ("Main Course", "main"), ("Dessert", "dessert")]:
         recipe = menu.get(key)
         _heading(pdf, label)
         if recipe:
-            _paragraph(pdf, f"{recipe.name} ({recipe.city})")
-            _kv(pdf, "Ingredients", recipe.ingredients)
-            _kv(pdf, "Preparation", recipe.preparation)
-            if getattr(recipe, "source", ""):
-                _kv(pdf, "Source", recipe.source)
+            # Recipe objects or their dict form as stored in the session
+            field = recipe.get if isinstance(recipe, dict) else lambda name: getattr(recipe, name, "")
+            _paragraph(pdf, f"{field('name')} ({field('city')})")
+            _kv(pdf, "Ingredients", field("ingredients"))
+            _kv(pdf, "Preparation", field("preparation"))
+            if field("source"):
+                _kv(pdf, "Source", field("source"))
         else:
             _paragraph(pdf, "None found for this location.")
         pdf.ln(2)
 
-    path = os.path.join(output_dir, "dinner_menu_and_recipes.pdf")
-    pdf.output(path)
-    return path
+    return pdf
 
 
-def create_last_day_pdf(last_day_data: Dict[str, Any], output_dir: str) -> str:
+def create_menu_pdf(menu: Dict[str, Any], output_dir: str) -> str:
     _ensure_dir(output_dir)
-    pdf = _new_pdf()
+    path = os.path.join(output_dir, MENU_PDF)
+    _build_menu_pdf(menu).output(path)
+    return path
+
+
+def _build_last_day_pdf(last_day_data: Dict[str, Any], pdf: Optional[FPDF] = None) -> FPDF:
+    pdf = _begin_document(pdf, "Victim's Last Day")
     _title(pdf, "Victim's Last Day")
 
     _heading(pdf, "Overview")
@@ -319,19 +456,25 @@ def create_last_day_pdf(last_day_data: Dict[str, Any], output_dir: str) -> str:
             _paragraph(pdf, f"Suspicious: {suspicious}")
             pdf.ln(2)
 
-    path = os.path.join(output_dir, "victims_last_day.pdf")
-    pdf.output(path)
-    return path
+    return pdf
 
 
-def create_clues_pdf(clues: List[Dict[str, Any]], output_dir: str) -> str:
+def create_last_day_pdf(last_day_data: Dict[str, Any], output_dir: str) -> str:
     _ensure_dir(output_dir)
-    pdf = _new_pdf()
+    path = os.path.join(output_dir, LAST_DAY_PDF)
+    _build_last_day_pdf(last_day_data).output(path)
+    return path
+
+
+def _build_clues_pdf(clues: List[Dict[str, Any]], pdf: Optional[FPDF] = None) -> FPDF:
+    pdf = _begin_document(pdf, "Character Clues")
     _title(pdf, "Character Clues (Cutout Pages)")
 
     for idx, entry in enumerate(clues):
         if idx > 0:
             pdf.add_page()
+        _cut_line(pdf)
+        _bookmark(pdf, entry.get("character", "Unknown Character"), level=1)
         _heading(pdf, entry.get("character", "Unknown Character"))
         clue_list = entry.get("clues", [])
         if not clue_list:
@@ -344,14 +487,18 @@ def create_clues_pdf(clues: List[Dict[str, Any]], output_dir: str) -> str:
                 _paragraph(pdf, text)
                 pdf.ln(1)
 
-    path = os.path.join(output_dir, "character_clues.pdf")
-    pdf.output(path)
-    return path
+    return pdf
 
 
-def create_solution_pdf(solution: Dict[str, Any], output_dir: str) -> str:
+def create_clues_pdf(clues: List[Dict[str, Any]], output_dir: str) -> str:
     _ensure_dir(output_dir)
-    pdf = _new_pdf()
+    path = os.path.join(output_dir, CLUES_PDF)
+    _build_clues_pdf(clues).output(path)
+    return path
+
+
+def _build_solution_pdf(solution: Dict[str, Any], pdf: Optional[FPDF] = None) -> FPDF:
+    pdf = _begin_document(pdf, "Final Solution")
     _title(pdf, "Final Solution")
 
     _kv(pdf, "Killer", solution.get("killer_name", ""))
@@ -389,12 +536,22 @@ def create_solution_pdf(solution: Dict[str, Any], output_dir: str) -> str:
     _heading(pdf, "Final Reveal Monologue")
     _paragraph(pdf, solution.get("final_reveal_monologue", ""))
 
-    path = os.path.join(output_dir, "final_solution.pdf")
-    pdf.output(path)
+    return pdf
+
+
+def create_solution_pdf(solution: Dict[str, Any], output_dir: str) -> str:
+    _ensure_dir(output_dir)
+    path = os.path.join(output_dir, SOLUTION_PDF)
+    _build_solution_pdf(solution).output(path)
     return path
 
 
 def _character_image_path(character: Dict[str, Any], image_dir: str) -> Optional[str]:
+    # Full portrait if rendered, else its preview (progressive rendering)
+    stored = portrait_path(character.get("image_id")) or portrait_path(character.get("preview_image_id"))
+    if stored:
+        return stored
+
     image_path = character.get("image_path")
     if image_path and os.path.exists(image_path):
         return image_path
@@ -406,6 +563,58 @@ def _character_image_path(character: Dict[str, Any], image_dir: str) -> Optional
     return None
 
 
+def _is_preview_only(character: Dict[str, Any]) -> bool:
+    """True if a progressive portrait's full render never arrived and its preview stands in."""
+    return not portrait_path(character.get("image_id")) and bool(portrait_path(character.get("preview_image_id")))
+
+
+def _character_pdf_name(character: Dict[str, Any]) -> str:
+    safe_name = str(character.get("name", "Unnamed")).replace(" ", "_")
+    return f"character_{safe_name}.pdf"
+
+
+def _build_character_pdf(
+    character: Dict[str, Any],
+    case_data: Dict[str, Any],
+    image_dir: str = "image_tool/image_output",
+    pdf: Optional[FPDF] = None,
+    case_items: Optional[List[Tuple[str, str]]] = None,
+) -> FPDF:
+    def allowed_character_key(k: str) -> bool:
+        return k.strip().lower() not in DROP_KEYS_CHARACTER_DETAILS
+
+    pdf = _begin_document(pdf, f"Character Sheet: {character.get('name', 'Unnamed')}")
+    _cut_line(pdf)
+    _title(pdf, f"Character Sheet: {character.get('name', 'Unnamed')}")
+
+    img_path = _character_image_path(character, image_dir)
+    if img_path:
+        try:
+            # Prepared JPEG at print size; fall back to the original file
+            image = prepare_image(img_path)
+            pdf.image(io.BytesIO(image) if image else img_path, w=PORTRAIT_WIDTH_MM)
+            pdf.ln(2)
+            if _is_preview_only(character):
+                _paragraph(pdf, "Preview portrait: the full-quality portrait could not be rendered.")
+        except Exception:
+            _paragraph(pdf, "Image present but could not be embedded.")
+    else:
+        _paragraph(pdf, "Image not available.")
+        pdf.ln(2)
+
+    _heading(pdf, "Case")
+    _render_case_section(pdf, case_data, case_items)
+    pdf.ln(2)
+
+    _heading(pdf, "Character Details")
+    for key, value in character.items():
+        if not allowed_character_key(key):
+            continue
+        _kv(pdf, key.replace("_", " ").title(), _pretty_value(value))
+
+    return pdf
+
+
 def create_character_pdfs(
     characters: List[Dict[str, Any]],
     case_data: Dict[str, Any],
@@ -415,40 +624,255 @@ def create_character_pdfs(
     _ensure_dir(output_dir)
     outputs: List[str] = []
 
-    def allowed_character_key(k: str) -> bool:
-        return k.strip().lower() not in DROP_KEYS_CHARACTER_DETAILS
+    for character in characters:
+        path = os.path.join(output_dir, _character_pdf_name(character))
+        _build_character_pdf(character, case_data, image_dir).output(path)
+        outputs.append(path)
+
+    return outputs
+
+
+# ----------------------------
+# Document list + (parallel) rendering
+# ----------------------------
+# Builders by name, so render jobs stay picklable for the process pool.
+_BUILDERS = {
+    "menu": _build_menu_pdf,
+    "last_day": _build_last_day_pdf,
+    "clues": _build_clues_pdf,
+    "solution": _build_solution_pdf,
+    "character": _build_character_pdf,
+}
+
+# Bump whenever layout or cleaning changes, so cached PDFs are not reused.
+RENDER_VERSION = 2
 
+# 0 = render serially in the calling thread
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+_render_pool_lock = threading.Lock()
+
+
+def _document_jobs(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    image_dir: str = "image_tool/image_output",
+) -> List[Tuple[str, str, tuple]]:
+    """All documents of a mystery as (filename, builder name, builder args), in output order."""
+    jobs: List[Tuple[str, str, tuple]] = [
+        (MENU_PDF, "menu", (menu,)),
+        (LAST_DAY_PDF, "last_day", (last_day_data,)),
+        (CLUES_PDF, "clues", (clues,)),
+        (SOLUTION_PDF, "solution", (solution,)),
+    ]
     for character in characters:
-        safe_name = str(character.get("name", "Unnamed")).replace(" ", "_")
-        pdf = _new_pdf()
-        _title(pdf, f"Character Sheet: {character.get('name', 'Unnamed')}")
-
-        img_path = _character_image_path(character, image_dir)
-        if img_path:
-            try:
-                pdf.image(img_path, w=60)
-                pdf.ln(2)
-            except Exception:
-                _paragraph(pdf, "Image present but could not be embedded.")
-        else:
-            _paragraph(pdf, "Image not available.")
-            pdf.ln(2)
+        jobs.append((_character_pdf_name(character), "character", (character, case_data, image_dir)))
+    return jobs
 
-        _heading(pdf, "Case")
-        _render_case_section(pdf, case_data)
-        pdf.ln(2)
 
-        _heading(pdf, "Character Details")
-        for key, value in character.items():
-            if not allowed_character_key(key):
-                continue
-            _kv(pdf, key.replace("_", " ").title(), _pretty_value(value))
+def render_document(kind: str, args: tuple) -> bytes:
+    """Render one document to PDF bytes."""
+    return bytes(_BUILDERS[kind](*args).output())
 
-        path = os.path.join(output_dir, f"character_{safe_name}.pdf")
-        pdf.output(path)
-        outputs.append(path)
 
-    return outputs
+def _job_key(kind: str, args: tuple) -> str:
+    """
+    Content hash of everything a document depends on: the menu PDF only on the
+    menu, a character sheet only on that character, the case and its image bytes.
+    """
+    if kind == "character":
+        character, case_data, image_dir = args
+        image_digest = file_digest(_character_image_path(character, image_dir))
+        return content_key(
+            RENDER_VERSION, kind, character, case_data, image_digest, image_settings()
+        )
+    return content_key(RENDER_VERSION, kind, args)
+
+
+def _warm_render_worker() -> None:
+    """Pool initializer: parse the fonts and load fontTools once per worker."""
+    for style in FONT_FILES:
+        _parsed_font(style)
+    _new_pdf().output()
+
+
+def _get_render_pool(workers: int) -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # "spawn": forking a multi-threaded web server process is not safe. Spawned
+            # workers import the main script as __mp_main__, so under `python app.py`
+            # they run app.py's module level too (see the guard there).
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_render_worker,
+            )
+        return _render_pool
+
+
+def close_render_pool(wait: bool = True) -> None:
+    """Stop the render workers (at interpreter exit, and from the ASGI shutdown)."""
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+atexit.register(close_render_pool)
+
+
+def render_documents(
+    jobs: List[Tuple[str, str, tuple]],
+    workers: Optional[int] = None,
+    cache: Optional[PdfCache] = None,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (filename, pdf bytes) in job order. With workers > 1 all documents are
+    submitted to a shared, bounded process pool up front and rendered concurrently;
+    results are still yielded in order, each as soon as it (and its predecessors) is done.
+    With a `cache`, documents whose inputs did not change are not rendered again.
+    """
+    workers = PDF_RENDER_WORKERS if workers is None else workers
+    keys = [_job_key(kind, args) if cache else None for _, kind, args in jobs]
+    cached = [cache.get(key) if cache else None for key in keys]
+    misses = sum(1 for data in cached if data is None)
+
+    def finish(key: Optional[str], data: bytes) -> bytes:
+        if cache:
+            cache.put(key, data)
+        return data
+
+    if workers <= 1 or misses <= 1:
+        for (filename, kind, args), key, data in zip(jobs, keys, cached):
+            yield filename, data if data is not None else finish(key, render_document(kind, args))
+        return
+
+    pool = _get_render_pool(workers)
+    futures = [
+        None if data is not None else pool.submit(render_document, kind, args)
+        for (_, kind, args), data in zip(jobs, cached)
+    ]
+    for (filename, _, _), key, data, future in zip(jobs, keys, cached, futures):
+        yield filename, data if future is None else finish(key, future.result())
+
+
+def iter_rendered_pdfs(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (filename, pdf bytes) for every document of the mystery, in output
+    order, each as soon as it is rendered (or read from the PDF cache).
+    """
+    jobs = _document_jobs(menu, case_data, characters, last_day_data, clues, solution)
+    cache = get_pdf_cache() if use_cache else None
+    return render_documents(jobs, workers=workers, cache=cache)
+
+
+def export_cache_key(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    export_format: str = "zip",
+) -> str:
+    """Cache key of a whole export (ZIP archive or booklet) for these inputs."""
+    jobs = _document_jobs(menu, case_data, characters, last_day_data, clues, solution)
+    doc_keys = [(filename, _job_key(kind, args)) for filename, kind, args in jobs]
+    return content_key(RENDER_VERSION, export_format, doc_keys)
+
+
+BOOKLET_PDF = "mystery_booklet.pdf"
+
+
+def _build_booklet_pdf(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    image_dir: str = "image_tool/image_output",
+) -> FPDF:
+    """
+    Everything in one document: fonts are registered (and subset-embedded)
+    once, images shared between sheets are stored once, the case section is
+    laid out once and replayed on each character sheet, and the outline has a
+    bookmark per section. Character sheets and clue pages carry cut lines.
+    """
+    pdf = _BookletPDF(format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_margins(15, 15, 15)
+    _register_fonts(pdf)
+
+    _build_menu_pdf(menu, pdf)
+    _build_last_day_pdf(last_day_data, pdf)
+
+    case_items = _case_section_items(case_data)
+    for character in characters:
+        _build_character_pdf(character, case_data, image_dir, pdf, case_items)
+
+    _build_clues_pdf(clues, pdf)
+    _build_solution_pdf(solution, pdf)
+    return pdf
+
+
+def render_booklet(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    use_cache: bool = True,
+) -> bytes:
+    """Render the single-file booklet to PDF bytes (served from the PDF cache if unchanged)."""
+    cache = get_pdf_cache() if use_cache else None
+    key = None
+    if cache:
+        key = export_cache_key(
+            menu, case_data, characters, last_day_data, clues, solution, "booklet"
+        )
+        data = cache.get(key)
+        if data is not None:
+            return data
+    data = bytes(
+        _build_booklet_pdf(menu, case_data, characters, last_day_data, clues, solution).output()
+    )
+    if cache:
+        cache.put(key, data)
+    return data
+
+
+def create_booklet_pdf(
+    menu: Dict[str, Any],
+    case_data: Dict[str, Any],
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict[str, Any],
+    clues: List[Dict[str, Any]],
+    solution: Dict[str, Any],
+    output_dir: str = "outputs/pdfs",
+) -> str:
+    _ensure_dir(output_dir)
+    path = os.path.join(output_dir, BOOKLET_PDF)
+    with open(path, "wb") as f:
+        f.write(render_booklet(menu, case_data, characters, last_day_data, clues, solution))
+    return path
 
 
 def generate_all_pdfs(
@@ -459,11 +883,21 @@ def generate_all_pdfs(
     clues: List[Dict[str, Any]],
     solution: Dict[str, Any],
     output_dir: str = "outputs/pdfs",
+    workers: Optional[int] = None,
 ) -> List[str]:
+    """
+    Render every PDF of the mystery into `output_dir` and return the paths in
+    a stable order (menu, last day, clues, solution, one per character).
+    `workers` > 1 renders in the shared process pool (default: PDF_RENDER_WORKERS).
+    """
+    _ensure_dir(output_dir)
     outputs: List[str] = []
-    outputs.append(create_menu_pdf(menu, output_dir))
-    outputs.append(create_last_day_pdf(last_day_data, output_dir))
-    outputs.append(create_clues_pdf(clues, output_dir))
-    outputs.append(create_solution_pdf(solution, output_dir))
-    outputs.extend(create_character_pdfs(characters, case_data, output_dir))
+    rendered = iter_rendered_pdfs(
+        menu, case_data, characters, last_day_data, clues, solution, workers=workers
+    )
+    for filename, data in rendered:
+        path = os.path.join(output_dir, filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        outputs.append(path)
     return outputs
@@ -0,0 +1,76 @@
+# llm_pipeline/pdf_images.py
+import io
+import os
+import threading
+from typing import Optional
+
+from PIL import Image
+
+from .pdf_cache import PdfCache, content_key, file_digest
+
+# Portraits are printed this wide on the character sheets
+PORTRAIT_WIDTH_MM = 60
+
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "150"))
+PDF_IMAGE_JPEG_QUALITY = int(os.getenv("PDF_IMAGE_JPEG_QUALITY", "85"))
+# Next to (not inside) the PDF cache: each cache evicts within its own byte budget
+PDF_IMAGE_CACHE_DIR = os.getenv("PDF_IMAGE_CACHE_DIR", "outputs/pdf_image_cache")
+PDF_IMAGE_CACHE_MAX_BYTES = int(os.getenv("PDF_IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_image_cache: Optional[PdfCache] = None
+_image_cache_lock = threading.Lock()
+
+
+def image_settings(width_mm: float = PORTRAIT_WIDTH_MM) -> tuple:
+    """Everything besides the source bytes that changes a prepared image."""
+    return (width_mm, PDF_IMAGE_DPI, PDF_IMAGE_JPEG_QUALITY)
+
+
+def _get_image_cache() -> PdfCache:
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = PdfCache(PDF_IMAGE_CACHE_DIR, PDF_IMAGE_CACHE_MAX_BYTES)
+        return _image_cache
+
+
+def _encode_for_print(path: str, width_mm: float) -> bytes:
+    """Downsample to the print DPI (never upscale) and re-encode as baseline JPEG."""
+    target_px = max(1, round(width_mm / 25.4 * PDF_IMAGE_DPI))
+    with Image.open(path) as img:
+        if img.width > target_px:
+            height = max(1, round(img.height * target_px / img.width))
+            img = img.resize((target_px, height), Image.LANCZOS)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=PDF_IMAGE_JPEG_QUALITY, optimize=True)
+        return out.getvalue()
+
+
+def prepare_image(path: Optional[str], width_mm: float = PORTRAIT_WIDTH_MM) -> Optional[bytes]:
+    """
+    JPEG bytes of `path` sized for `width_mm` at PDF_IMAGE_DPI, cached on disk by
+    content hash of the source image and the settings. Identical portraits give
+    identical bytes, so fpdf embeds them only once per document.
+    Returns None if the image cannot be read.
+    """
+    digest = file_digest(path)
+    if digest is None:
+        return None
+    cache = _get_image_cache()
+    key = content_key("pdf-image", digest, image_settings(width_mm))
+    data = cache.get(key)
+    if data is None:
+        try:
+            data = _encode_for_print(path, width_mm)
+        except Exception as e:
+            print(f"[Warning] Could not prepare image {path} for PDF: {e}")
+            return None
+        cache.put(key, data)
+    return data
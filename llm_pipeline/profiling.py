@@ -0,0 +1,381 @@
+# llm_pipeline/profiling.py
+"""
+Opt-in per-stage profiling of a pipeline run (one CLI run or one web request).
+
+CPU: each stage is profiled with cProfile and written as a pstats file,
+`outputs/profiles/<run>/<NN>_<stage>.prof`:
+
+    python -m pstats outputs/profiles/<run>/04_characters.prof
+    snakeviz outputs/profiles/<run>/04_characters.prof
+
+Memory: tracemalloc snapshots are taken at stage boundaries and RSS is sampled
+while the stage runs; `memory.json` holds, per stage, peak and growth of RSS
+and of Python allocations plus the top allocation diffs by source line.
+Stage peaks are also aggregated for the `/metrics` endpoint.
+
+Both modes add a `summary.txt` per run. cProfile only sees the thread that
+runs the stage (work handed to pools shows up as waiting); tracemalloc sees
+the whole process, so diffs of overlapping requests mix, and RSS includes
+tracemalloc's own overhead (compare runs made in the same mode). Tracing is
+switched off again once no memory-profiled stage is running. A disabled
+profiler's stages are no-op contexts, so leaving the hooks in costs nothing.
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# "0" = off; "1" or "cpu", "memory", "cpu,memory" = profile every run/request;
+# "header" = only web requests that send `X-Mystery-Profile: <modes>`
+MYSTERY_PROFILE = os.getenv("MYSTERY_PROFILE", "0").strip().lower()
+MYSTERY_PROFILE_DIR = os.getenv("MYSTERY_PROFILE_DIR", "outputs/profiles")
+TRACEMALLOC_FRAMES = int(os.getenv("MYSTERY_TRACEMALLOC_FRAMES", "1"))
+PROFILE_HEADER = "X-Mystery-Profile"
+SUMMARY_TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+RSS_SAMPLE_SECONDS = 0.02
+
+
+def _parse_modes(value: str) -> Set[str]:
+    modes = set()
+    for part in value.replace(" ", "").split(","):
+        if part in ("1", "cpu", "all"):
+            modes.add("cpu")
+        if part in ("memory", "all"):
+            modes.add("memory")
+    return modes
+
+
+def requested_profiles(header_value: Optional[str] = None) -> Set[str]:
+    """Profile modes ("cpu", "memory") for a run, or for a web request with this header value."""
+    if MYSTERY_PROFILE == "header":
+        return _parse_modes((header_value or "").strip().lower())
+    return _parse_modes(MYSTERY_PROFILE)
+
+
+# ----------------------------
+# Process memory
+# ----------------------------
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """Highest RSS this process has reached, in bytes."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class _RssSampler:
+    """Highest RSS seen while a stage runs, sampled on a background thread."""
+
+    def __init__(self):
+        self.peak = current_rss() or 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        return max(self.peak, current_rss() or 0)
+
+
+_stage_metrics: Dict[str, Dict[str, float]] = {}
+_stage_metrics_lock = threading.Lock()
+
+
+def _record_stage_metrics(name: str, record: Dict) -> None:
+    with _stage_metrics_lock:
+        m = _stage_metrics.setdefault(name, {
+            "runs": 0, "seconds": 0.0, "peak_rss": 0, "rss_growth": 0, "python_peak": 0,
+        })
+        m["runs"] += 1
+        m["seconds"] += record["seconds"]
+        m["peak_rss"] = max(m["peak_rss"], record["rss_peak"] or 0)
+        m["rss_growth"] += record["rss_delta"] or 0
+        m["python_peak"] = max(m["python_peak"], record["python_peak"])
+
+
+# Memory-profiled stages running right now (across requests). tracemalloc is
+# started by the first and stopped after the last, unless it was already on.
+_tracing_stages = 0
+_tracing_started_here = False
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing() -> None:
+    global _tracing_stages, _tracing_started_here
+    with _tracing_lock:
+        if _tracing_stages == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _tracing_started_here = True
+        _tracing_stages += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_stages, _tracing_started_here
+    with _tracing_lock:
+        _tracing_stages -= 1
+        if _tracing_stages == 0 and _tracing_started_here:
+            # Tracing slows every allocation in the process down; don't leave it on
+            tracemalloc.stop()
+            _tracing_started_here = False
+
+
+def metrics_text(extra_gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+    """
+    Prometheus text exposition: process RSS (current and peak), tracemalloc
+    totals while tracing, and per-stage aggregates from memory-profiled runs.
+    `extra_gauges` maps metric name to (help text, value).
+    """
+    pid = os.getpid()
+    lines: List[str] = []
+
+    def metric(name: str, help_text: str, values: List[Tuple[str, float]], kind: str = "gauge") -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in values:
+            lines.append(f"{name}{{{labels}}} {value}")
+
+    proc = f'pid="{pid}"'
+    metric("mystery_process_rss_bytes", "Resident set size of this worker.", [(proc, current_rss() or 0)])
+    metric("mystery_process_peak_rss_bytes", "Highest RSS of this worker so far.", [(proc, peak_rss() or 0)])
+    if tracemalloc.is_tracing():
+        metric("mystery_python_traced_bytes", "Python allocations traced by tracemalloc.", [(proc, tracemalloc.get_traced_memory()[0])])
+    for name, (help_text, value) in (extra_gauges or {}).items():
+        metric(name, help_text, [(proc, value)])
+
+    with _stage_metrics_lock:
+        stages = {name: dict(m) for name, m in _stage_metrics.items()}
+    if stages:
+        def per_stage(key: str) -> List[Tuple[str, float]]:
+            return [(f'{proc},stage="{name}"', m[key]) for name, m in sorted(stages.items())]
+
+        metric("mystery_stage_runs_total", "Memory-profiled runs of a stage.", per_stage("runs"), "counter")
+        metric("mystery_stage_seconds_total", "Wall time of memory-profiled runs of a stage.", per_stage("seconds"), "counter")
+        metric("mystery_stage_peak_rss_bytes", "Highest RSS seen during a stage.", per_stage("peak_rss"))
+        metric("mystery_stage_rss_growth_bytes_total", "RSS growth summed over runs of a stage.", per_stage("rss_growth"), "counter")
+        metric("mystery_stage_python_peak_bytes", "Highest traced Python allocations during a stage.", per_stage("python_peak"))
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# Stage profiler
+# ----------------------------
+class StageProfiler:
+    def __init__(
+        self,
+        cpu: bool = True,
+        memory: bool = False,
+        run_id: Optional[str] = None,
+        directory: str = MYSTERY_PROFILE_DIR,
+    ):
+        self.cpu = cpu
+        self.memory = memory
+        self.enabled = cpu or memory
+        self.run_id = run_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.directory = os.path.join(directory, self.run_id)
+        self._stages: List[Tuple[str, float, str]] = []
+        self._memory_stages: List[Dict] = []
+        self._lock = threading.Lock()
+        self._summarized = False
+
+    @classmethod
+    def for_modes(cls, modes: Set[str], run_id: Optional[str] = None) -> "StageProfiler":
+        return cls(cpu="cpu" in modes, memory="memory" in modes, run_id=run_id)
+
+    def _path(self, name: str) -> str:
+        with self._lock:
+            index = len(self._stages) + 1
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        return os.path.join(self.directory, f"{index:02d}_{safe}.prof")
+
+    def _finish_stage(self, name: str, profile: cProfile.Profile, seconds: float) -> None:
+        path = self._path(name)
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(path)
+        with self._lock:
+            self._stages.append((name, seconds, path))
+        if self._summarized:
+            # A streamed response can finish after the request was torn down
+            self.write_summary()
+
+    def _enable(self, profile: cProfile.Profile) -> bool:
+        try:
+            profile.enable()
+            return True
+        except ValueError:
+            # Python 3.12+: only one profiler can be active at a time
+            print("[Warning] Profiling skipped for a stage: another profiler is active")
+            return False
+
+    def stage(self, name: str):
+        """Context manager that profiles the enclosed block as stage `name`."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        stack = contextlib.ExitStack()
+        # Memory outside CPU, so snapshot costs stay out of the CPU profile
+        if self.memory:
+            stack.enter_context(self._memory_profiled(name))
+        if self.cpu:
+            stack.enter_context(self._profiled(name))
+        return stack
+
+    @contextlib.contextmanager
+    def _profiled(self, name: str):
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        active = self._enable(profile)
+        try:
+            yield
+        finally:
+            if active:
+                profile.disable()
+                self._finish_stage(name, profile, time.perf_counter() - started)
+
+    @contextlib.contextmanager
+    def _memory_profiled(self, name: str):
+        _start_tracing()
+        try:
+            with self._memory_stage(name):
+                yield
+        finally:
+            _stop_tracing()
+
+    @contextlib.contextmanager
+    def _memory_stage(self, name: str):
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        py_before = tracemalloc.get_traced_memory()[0]
+        rss_before = current_rss()
+        sampler = _RssSampler()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            rss_peak = sampler.stop()
+            rss_after = current_rss()
+            py_after, py_peak = tracemalloc.get_traced_memory()
+            ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+            diff = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+                before.filter_traces(ignore), "lineno"
+            )
+            record = {
+                "stage": name,
+                "seconds": round(seconds, 4),
+                "rss_before": rss_before,
+                "rss_after": rss_after,
+                "rss_peak": rss_peak,
+                "rss_delta": (rss_after - rss_before) if rss_before and rss_after else None,
+                "python_delta": py_after - py_before,
+                "python_peak": py_peak,
+                "top_allocations": [
+                    {
+                        "where": str(stat.traceback[0]),
+                        "size_diff": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                        "size": stat.size,
+                    }
+                    for stat in diff[:TOP_ALLOCATIONS]
+                ],
+            }
+            with self._lock:
+                self._memory_stages.append(record)
+            _record_stage_metrics(name, record)
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Pass `iterable` through, CPU-profiling only the time spent producing
+        each item (e.g. a streamed response, without the time spent sending it).
+        """
+        if not self.cpu:
+            yield from iterable
+            return
+        profile = cProfile.Profile()
+        iterator = iter(iterable)
+        seconds = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                active = self._enable(profile)
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    if active:
+                        profile.disable()
+                    seconds += time.perf_counter() - started
+                yield item
+        finally:
+            if profile.getstats():
+                self._finish_stage(name, profile, seconds)
+
+    def _memory_summary(self, out: io.StringIO, records: List[Dict]) -> None:
+        mb = lambda value: f"{value / 1e6:8.1f}" if value is not None else "     n/a"
+        out.write(f"\n{'memory (MB)':<20} {'rss peak':>8} {'rss +/-':>8} {'py peak':>8} {'py +/-':>8}\n")
+        for r in records:
+            out.write(
+                f"{r['stage']:<20} {mb(r['rss_peak'])} {mb(r['rss_delta'])} "
+                f"{mb(r['python_peak'])} {mb(r['python_delta'])}\n"
+            )
+        for r in records:
+            out.write(f"\n=== {r['stage']}: top allocations ===\n")
+            for a in r["top_allocations"]:
+                out.write(f"{a['size_diff'] / 1e3:+10.1f} kB {a['count_diff']:+7d}  {a['where']}\n")
+
+    def write_summary(self) -> Optional[str]:
+        """Write summary.txt (and memory.json); returns the run directory."""
+        with self._lock:
+            stages = list(self._stages)
+            memory_records = list(self._memory_stages)
+        if not self.enabled or not (stages or memory_records):
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        out = io.StringIO()
+        out.write(f"Profile {self.run_id}\n\n")
+        for name, seconds, _ in stages:
+            out.write(f"{name:<20} {seconds:8.3f} s\n")
+        if memory_records:
+            self._memory_summary(out, memory_records)
+            with open(os.path.join(self.directory, "memory.json"), "w", encoding="utf-8") as f:
+                json.dump({"run": self.run_id, "peak_rss": peak_rss(), "stages": memory_records}, f, indent=2)
+        for name, seconds, path in stages:
+            out.write(f"\n=== {name} ({seconds:.3f} s) ===\n")
+            pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(SUMMARY_TOP_FUNCTIONS)
+        with open(os.path.join(self.directory, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        self._summarized = True
+        print(f"[Profile] Wrote {len(stages) or len(memory_records)} stage profiles to {self.directory}")
+        return self.directory
+
+
+NULL_PROFILER = StageProfiler(cpu=False, run_id="disabled")
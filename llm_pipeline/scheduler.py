@@ -0,0 +1,265 @@
+# llm_pipeline/scheduler.py
+"""
+Admission control and scheduling of LLM calls, between the pipeline and the
+backend (llm_client routes every call through `get_scheduler().slot()`).
+
+- At most LLM_MAX_CONCURRENCY calls are sent to the backend at once; the
+  rest wait here instead of piling up on the GPU.
+- A generation runs as a job of one tenant (client cookie or address). Its
+  calls find the job through the `current_job` context variable, which is
+  also carried into asyncio tasks and `asyncio.to_thread`. Waiting calls are
+  served by priority (interactive, then batch, then warm), then each
+  tenant's oldest job before anyone's second one, then in admission order.
+  The oldest jobs finishing first keeps latency predictable; serving every
+  job round-robin would make them all finish late together.
+- `admit` raises QueueFull (HTTP 429) once LLM_MAX_JOBS jobs are active or
+  the tenant already has LLM_MAX_JOBS_PER_TENANT; `status` reports a
+  tenant's queue position.
+Calls outside a job (CLI, benchmarks) run as LLM_DEFAULT_PRIORITY.
+"""
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+PRIORITIES = ("interactive", "batch", "warm")
+
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "1") == "1"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_JOBS = int(os.getenv("LLM_MAX_JOBS", "32"))
+LLM_MAX_JOBS_PER_TENANT = int(os.getenv("LLM_MAX_JOBS_PER_TENANT", "2"))
+LLM_DEFAULT_PRIORITY = os.getenv("LLM_DEFAULT_PRIORITY", "batch")
+
+
+class QueueFull(RuntimeError):
+    """A job was refused; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, tenant: str, priority: str, seq: int):
+        self.tenant = tenant
+        self.priority = priority
+        self.rank = PRIORITIES.index(priority)
+        self.seq = seq
+        self.started = time.monotonic()
+
+
+# The job whose LLM calls run in this context (None: not part of a job)
+current_job: ContextVar[Optional[Job]] = ContextVar("current_llm_job", default=None)
+
+
+def tenant_key(client_id: Optional[str], remote_addr: Optional[str]) -> str:
+    """Tenant of a web client: its client cookie, or its address without one."""
+    return hashlib.sha256((client_id or f"addr:{remote_addr}").encode("utf-8")).hexdigest()[:16]
+
+
+class _Waiter:
+    def __init__(self, job: Optional[Job], seq: int, wake: Callable[[], None]):
+        self.job = job
+        self.seq = seq
+        self.wake = wake
+        self.queued = time.monotonic()
+        self.granted = False
+
+
+def _resolve(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LlmScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_jobs: int = LLM_MAX_JOBS,
+        max_jobs_per_tenant: int = LLM_MAX_JOBS_PER_TENANT,
+        default_priority: str = LLM_DEFAULT_PRIORITY,
+        enabled: bool = LLM_SCHEDULER,
+    ):
+        if default_priority not in PRIORITIES:
+            raise ValueError(f"LLM_DEFAULT_PRIORITY must be one of {PRIORITIES}, got '{default_priority}'")
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_jobs = max(1, max_jobs)
+        self.max_jobs_per_tenant = max(1, max_jobs_per_tenant)
+        self.default_priority = default_priority
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._jobs: List[Job] = []  # active, in admission order
+        self._waiting: List[_Waiter] = []
+        self._running = 0
+        self._avg_job_seconds = 60.0
+        self.rejected = 0
+        self._waits: Dict[str, Dict[str, float]] = {
+            p: {"calls": 0, "seconds": 0.0, "max_seconds": 0.0} for p in PRIORITIES
+        }
+
+    # ----------------------------
+    # Jobs
+    # ----------------------------
+    def admit(self, tenant: str, priority: str = "interactive") -> Job:
+        """Register a new job, or raise QueueFull when the queue or the tenant's share is full."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}, got '{priority}'")
+        with self._lock:
+            own = sum(1 for job in self._jobs if job.tenant == tenant)
+            if own >= self.max_jobs_per_tenant:
+                reason = f"You already have {own} mysteries in progress."
+            elif len(self._jobs) >= self.max_jobs:
+                reason = f"The queue is full ({len(self._jobs)} mysteries in progress)."
+            else:
+                job = Job(tenant, priority, next(self._seq))
+                self._jobs.append(job)
+                return job
+            self.rejected += 1
+            # Expected time until one of the active jobs finishes
+            retry_after = max(1, round(self._avg_job_seconds / max(1, len(self._jobs))))
+        raise QueueFull(reason, retry_after)
+
+    def finish(self, job: Job) -> None:
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * (time.monotonic() - job.started)
+
+    @contextmanager
+    def job(self, tenant: str, priority: str = "interactive"):
+        """Run the enclosed LLM calls as one job (raises QueueFull when refused)."""
+        job = self.admit(tenant, priority)
+        token = current_job.set(job)
+        try:
+            yield job
+        finally:
+            current_job.reset(token)
+            self.finish(job)
+
+    def _job_order(self, job: Job):
+        earlier_own = sum(1 for other in self._jobs if other.tenant == job.tenant and other.seq < job.seq)
+        return (job.rank, earlier_own, job.seq)
+
+    def _call_order(self, waiter: _Waiter):
+        if waiter.job is None:
+            return (PRIORITIES.index(self.default_priority), 0, waiter.seq, waiter.seq)
+        return (*self._job_order(waiter.job), waiter.seq)
+
+    def status(self, tenant: str) -> Dict[str, Any]:
+        """Queue position of the tenant's oldest job (0 if it has none) and whether its calls are waiting."""
+        with self._lock:
+            own = [job for job in self._jobs if job.tenant == tenant]
+            if not own:
+                return {"position": 0, "waiting": False, "jobs": len(self._jobs)}
+            key = self._job_order(own[0])
+            position = 1 + sum(1 for job in self._jobs if self._job_order(job) < key)
+            waiting = any(w.job is not None and w.job.tenant == tenant for w in self._waiting)
+            return {"position": position, "waiting": waiting, "jobs": len(self._jobs)}
+
+    # ----------------------------
+    # Call slots
+    # ----------------------------
+    def _enqueue(self, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or queue a waiter that `wake` is called for."""
+        with self._lock:
+            if self._running < self.max_concurrency and not self._waiting:
+                self._running += 1
+                self._record_wait(current_job.get(), 0.0)
+                return None
+            waiter = _Waiter(current_job.get(), next(self._seq), wake)
+            self._waiting.append(waiter)
+            return waiter
+
+    def _release(self) -> None:
+        with self._lock:
+            self._running -= 1
+            while self._waiting and self._running < self.max_concurrency:
+                waiter = min(self._waiting, key=self._call_order)
+                self._waiting.remove(waiter)
+                waiter.granted = True
+                self._running += 1
+                self._record_wait(waiter.job, time.monotonic() - waiter.queued)
+                waiter.wake()
+
+    def _record_wait(self, job: Optional[Job], seconds: float) -> None:
+        waits = self._waits[job.priority if job else self.default_priority]
+        waits["calls"] += 1
+        waits["seconds"] += seconds
+        waits["max_seconds"] = max(waits["max_seconds"], seconds)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the backend slots for the enclosed call, waiting for one if needed."""
+        if not self.enabled:
+            yield
+            return
+        granted = threading.Event()
+        if self._enqueue(granted.set) is not None:
+            granted.wait()
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def slot_async(self):
+        """`slot` for coroutines: waits without blocking the event loop."""
+        if not self.enabled:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        waiter = self._enqueue(lambda: loop.call_soon_threadsafe(_resolve, granted))
+        if waiter is not None:
+            try:
+                await granted
+            except asyncio.CancelledError:
+                with self._lock:
+                    if not waiter.granted:
+                        self._waiting.remove(waiter)
+                        raise
+                self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_concurrency": self.max_concurrency,
+                "running_calls": self._running,
+                "waiting_calls": len(self._waiting),
+                "active_jobs": len(self._jobs),
+                "max_jobs": self.max_jobs,
+                "rejected_jobs": self.rejected,
+                "wait": {
+                    p: {
+                        "calls": int(w["calls"]),
+                        "mean_seconds": round(w["seconds"] / w["calls"], 3) if w["calls"] else 0.0,
+                        "max_seconds": round(w["max_seconds"], 3),
+                    }
+                    for p, w in self._waits.items()
+                },
+            }
+
+
+_default_scheduler: Optional[LlmScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LlmScheduler:
+    """Process-wide scheduler (LLM_SCHEDULER, LLM_MAX_CONCURRENCY, LLM_MAX_JOBS, ...)."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LlmScheduler()
+        return _default_scheduler
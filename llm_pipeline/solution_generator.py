@@ -1,6 +1,6 @@
 # llm_pipeline/solution_generator.py
-from typing import Dict, List, Any
-from .llm_client import chat_json
+from typing import Dict, List, Any, Optional, Tuple
+from .llm_client import chat_json, chat_json_async
 
 def generate_solution(
     case_data: Dict,
@@ -15,10 +15,34 @@ def generate_solution(
     - last_day_data (timeline)
     - clues (who suspects whom and why)
     """
+    system_prompt, user_instruction = _solution_prompts(case_data, characters, last_day_data, clues)
+    return _finish_solution(chat_json(system_prompt, user_instruction), characters)
 
-    # See if you already have a labeled murderer
+
+async def generate_solution_async(
+    case_data: Dict,
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict,
+    clues: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """`generate_solution` that awaits the LLM call (ASGI server)."""
+    system_prompt, user_instruction = _solution_prompts(case_data, characters, last_day_data, clues)
+    return _finish_solution(await chat_json_async(system_prompt, user_instruction), characters)
+
+
+def _labeled_killer(characters: List[Dict[str, Any]]) -> Optional[str]:
+    """See if you already have a labeled murderer."""
     labeled_killers = [c["name"] for c in characters if c.get("murderer_label") is True]
-    killer_hint = labeled_killers[0] if labeled_killers else None
+    return labeled_killers[0] if labeled_killers else None
+
+
+def _solution_prompts(
+    case_data: Dict,
+    characters: List[Dict[str, Any]],
+    last_day_data: Dict,
+    clues: List[Dict[str, Any]],
+) -> Tuple[str, str]:
+    killer_hint = _labeled_killer(characters)
 
     system_prompt = (
         "You are a detective summarizing and solving an interactive murder mystery. "
@@ -90,7 +114,11 @@ RETURN STRICT JSON with the following structure:
 }}
 """
 
-    result = chat_json(system_prompt, user_instruction)
+    return system_prompt, user_instruction
+
+
+def _finish_solution(result: Any, characters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    killer_hint = _labeled_killer(characters)
 
     # Simple fallback if parsing fails
     if not isinstance(result, dict) or "killer_name" not in result:
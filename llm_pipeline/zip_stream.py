@@ -0,0 +1,66 @@
+# llm_pipeline/zip_stream.py
+import io
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable sink that collects what zipfile writes so it can
+    be handed out chunk by chunk. Being non-seekable makes zipfile use data
+    descriptors instead of seeking back to patch local headers.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(
+    files: Iterable[Tuple[str, bytes]],
+    compression: int = zipfile.ZIP_DEFLATED,
+    copy_to: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Build a ZIP archive on the fly from (name, data) pairs and yield its bytes
+    as soon as each member is added, so a response can start before the last
+    member exists. With `copy_to`, the archive is also written to that path.
+    """
+    sink = _ChunkSink()
+    copy = open(copy_to, "wb") if copy_to else None
+    try:
+        date_time = time.localtime()[:6]
+        with zipfile.ZipFile(sink, "w", compression=compression) as archive:
+            for name, data in files:
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = compression
+                archive.writestr(info, data)
+                chunk = sink.drain()
+                if copy:
+                    copy.write(chunk)
+                yield chunk
+        chunk = sink.drain()  # central directory
+        if copy:
+            copy.write(chunk)
+        yield chunk
+    finally:
+        if copy:
+            copy.close()
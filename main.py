@@ -1,11 +1,15 @@
 # main.py
-from image_tool.image_generator import generate_character_image
+import argparse
+
+from image_tool.image_generator import generate_character_images
+from image_tool.portrait_store import image_id_from_path
 from llm_pipeline.case_generator import generate_case
 from llm_pipeline.character_generator import generate_characters
 from llm_pipeline.last_day_victim import generate_last_day
 from llm_pipeline.clue_generator import generate_clues
 from llm_pipeline.solution_generator import generate_solution
 from llm_pipeline.pdf_generator import generate_all_pdfs
+from llm_pipeline.profiling import NULL_PROFILER, StageProfiler, requested_profiles
 from evaluation import SimpleEvaluator
 from rag.retriever import RagRetriever
 
@@ -19,7 +23,15 @@ from rag.recipes_retriever import (
 NUM_CHARACTERS = 7
 
 
-def main():
+def main(profile: bool = False, memory_profile: bool = False):
+    # Opt-in per-stage CPU / memory profiles (--profile, --memory-profile or MYSTERY_PROFILE)
+    modes = requested_profiles()
+    if profile:
+        modes.add("cpu")
+    if memory_profile:
+        modes.add("memory")
+    profiler = StageProfiler.for_modes(modes) if modes else NULL_PROFILER
+
     # 0. Ask for location of the murder mystery
     location = input(
         "Where should the murder mystery take place? (e.g. Kiel, Hamburg, Lübeck): "
@@ -28,7 +40,8 @@ def main():
         location = "Hamburg"
 
     # 0b. Load all recipes
-    all_recipes = load_all_recipes()
+    with profiler.stage("load_recipes"):
+        all_recipes = load_all_recipes()
 
     # NEW: Ask user for ingredient preferences
     print("\n=== CUSTOMIZE YOUR DINNER MENU ===")
@@ -47,22 +60,25 @@ def main():
     # Get menu based on ingredients
     if starter_ingredient or main_ingredient or dessert_ingredient:
         print("\n=== SEARCHING FOR RECIPES WITH YOUR INGREDIENTS ===")
-        menu = get_menu_by_ingredients(
-            starter_ingredient if starter_ingredient else "",
-            main_ingredient if main_ingredient else "",
-            dessert_ingredient if dessert_ingredient else "",
-            all_recipes,
-        )
+        with profiler.stage("menu"):
+            menu = get_menu_by_ingredients(
+                starter_ingredient if starter_ingredient else "",
+                main_ingredient if main_ingredient else "",
+                dessert_ingredient if dessert_ingredient else "",
+                all_recipes,
+            )
 
         # Fallback to location-based if no matches found
         if not menu["starter"] and not menu["main"] and not menu["dessert"]:
             print(
                 f"No recipes found with those ingredients. Using {location}-based menu instead."
             )
-            menu = get_menu_for_location(location, all_recipes)
+            with profiler.stage("menu_fallback"):
+                menu = get_menu_for_location(location, all_recipes)
     else:
         # Use location-based menu if no ingredients specified
-        menu = get_menu_for_location(location, all_recipes)
+        with profiler.stage("menu"):
+            menu = get_menu_for_location(location, all_recipes)
 
     print("\n=== DINNER MENU FOR THIS MYSTERY ===")
     if menu["starter"]:
@@ -84,36 +100,41 @@ def main():
     if not user_prompt:
         user_prompt = "A small coastal town with a controversial political scandal"
 
-    # 2. Initialize RAG retriever (stub for now)
-    retriever = RagRetriever(index_path="data/index")  # adapt later
+    # 2. Initialize RAG retriever
+    with profiler.stage("retriever_load"):
+        retriever = RagRetriever(index_path="data/index")
 
     # 3. Generate the case (victim + theme), now also using location + menu
-    case_data = generate_case(
-        user_prompt=user_prompt,
-        location=location,
-        menu={
-            "starter": menu["starter"].name if menu["starter"] else None,
-            "main": menu["main"].name if menu["main"] else None,
-            "dessert": menu["dessert"].name if menu["dessert"] else None,
-        },
-    )
+    with profiler.stage("case"):
+        case_data = generate_case(
+            user_prompt=user_prompt,
+            location=location,
+            menu={
+                "starter": menu["starter"].name if menu["starter"] else None,
+                "main": menu["main"].name if menu["main"] else None,
+                "dessert": menu["dessert"].name if menu["dessert"] else None,
+            },
+        )
     print("\n=== CASE ===")
     print(case_data)
 
     # 4. Generate characters (with RAG context)
-    characters = generate_characters(
-        case_data=case_data,
-        num_characters=NUM_CHARACTERS,
-        retriever=retriever,
-    )
+    with profiler.stage("characters"):
+        characters = generate_characters(
+            case_data=case_data,
+            num_characters=NUM_CHARACTERS,
+            retriever=retriever,
+        )
 
     # 5. Generate Images (first image loop)
     print("\n=== GENERATING IMAGES ===")
-    for c in characters:
-        # We pass the whole character dict so the LLM can use background/occupation
-        img_path = generate_character_image(c)
+    # We pass the whole character dicts so the LLM can use background/occupation
+    with profiler.stage("portraits"):
+        image_paths = generate_character_images(characters)
+    for c, img_path in zip(characters, image_paths):
         if img_path:
             c["image_path"] = img_path
+            c["image_id"] = image_id_from_path(img_path)
         else:
             c["image_path"] = "generation_failed.png"
 
@@ -127,7 +148,8 @@ def main():
         print()
 
     # 6. Reconstruct the victim's last day
-    last_day_data = generate_last_day(case_data=case_data, characters=characters)
+    with profiler.stage("last_day"):
+        last_day_data = generate_last_day(case_data=case_data, characters=characters)
     print("\n=== VICTIM'S LAST DAY ===")
     print("Overview:", last_day_data.get("overview", ""))
     print("Timeline:")
@@ -137,11 +159,12 @@ def main():
         print(f"  Suspicious: {event['suspicious']}")
 
     # 7. Generate clues
-    clues = generate_clues(
-        case_data=case_data,
-        characters=characters,
-        last_day_data=last_day_data,
-    )
+    with profiler.stage("clues"):
+        clues = generate_clues(
+            case_data=case_data,
+            characters=characters,
+            last_day_data=last_day_data,
+        )
     print("\n=== CHARACTER CLUES ===")
     for entry in clues:
         print(f"\n{entry['character']} has clues:")
@@ -149,12 +172,13 @@ def main():
             print(f"  -> About {c['target']}: {c['clue']}")
 
     # 8. Generate solution
-    solution = generate_solution(
-        case_data=case_data,
-        characters=characters,
-        last_day_data=last_day_data,
-        clues=clues,
-    )
+    with profiler.stage("solution"):
+        solution = generate_solution(
+            case_data=case_data,
+            characters=characters,
+            last_day_data=last_day_data,
+            clues=clues,
+        )
 
     # keep murderer_label consistent with solution
     killer_name = solution.get("killer_name")
@@ -189,29 +213,47 @@ def main():
     print("=" * 70)
 
     evaluator = SimpleEvaluator()
-    eval_results = evaluator.evaluate_mystery(
-        menu=menu,
-        case_data=case_data,
-        characters=characters,
-        last_day_data=last_day_data,
-        clues=clues,
-        solution=solution,
-    )
-    evaluator.save_report(eval_results)
+    with profiler.stage("evaluation"):
+        eval_results = evaluator.evaluate_mystery(
+            menu=menu,
+            case_data=case_data,
+            characters=characters,
+            last_day_data=last_day_data,
+            clues=clues,
+            solution=solution,
+        )
+        evaluator.save_report(eval_results)
 
     print("\n=== WRITING PDF OUTPUTS ===")
-    pdf_paths = generate_all_pdfs(
-        menu=menu,
-        case_data=case_data,
-        characters=characters,
-        last_day_data=last_day_data,
-        clues=clues,
-        solution=solution,
-    )
+    with profiler.stage("pdf"):
+        pdf_paths = generate_all_pdfs(
+            menu=menu,
+            case_data=case_data,
+            characters=characters,
+            last_day_data=last_day_data,
+            clues=clues,
+            solution=solution,
+            # Profiled runs lay out in this process, so the profile covers it
+            workers=0 if profiler.enabled else None,
+        )
     print("PDFs written:")
     for path in pdf_paths:
         print(f" - {path}")
 
+    profiler.write_summary()
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate a murder mystery dinner.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="write a CPU profile per pipeline stage to outputs/profiles (also MYSTERY_PROFILE=1)",
+    )
+    parser.add_argument(
+        "--memory-profile",
+        action="store_true",
+        help="record RSS and tracemalloc diffs per pipeline stage (also MYSTERY_PROFILE=memory)",
+    )
+    args = parser.parse_args()
+    main(profile=args.profile, memory_profile=args.memory_profile)
@@ -0,0 +1,125 @@
+# rag/bm25.py
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from .embeddings import tokenize
+
+BM25_TERMS_FILE = "bm25_terms.json"
+BM25_OFFSETS_FILE = "bm25_term_offsets.npy"
+BM25_ROWS_FILE = "bm25_rows.npy"
+BM25_TFS_FILE = "bm25_tfs.npy"
+BM25_LENGTHS_FILE = "bm25_doc_lengths.npy"
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index. Postings are stored as flat arrays
+    (row ids and term frequencies, sliced per term by `term_offsets`), so an
+    index saved next to the vectors is memory-mapped on load instead of being
+    rebuilt from every metadata row. Exact place names like "Fischmarkt" or
+    "Kiel" score highly here even when an embedding model does not know them.
+    """
+
+    def __init__(self, texts: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths: List[int] = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((row, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        rows = np.fromiter((r for t in terms for r, _ in postings[t]), dtype=np.int32, count=int(offsets[-1]))
+        tfs = np.fromiter((f for t in terms for _, f in postings[t]), dtype=np.float32, count=int(offsets[-1]))
+        self._init(terms, offsets, rows, tfs, np.asarray(lengths, dtype=np.float32), k1, b)
+
+    def _init(self, terms, term_offsets, rows, tfs, doc_lengths, k1, b) -> None:
+        self.k1 = k1
+        self.b = b
+        self.terms: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.term_offsets = term_offsets
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.num_docs = len(doc_lengths)
+        self.avg_length = float(np.mean(doc_lengths)) if self.num_docs else 0.0
+        self.avg_length = self.avg_length or 1.0
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        with (directory / BM25_TERMS_FILE).open("w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "terms": sorted(self.terms, key=self.terms.get)}, f,
+                      ensure_ascii=False)
+        np.save(directory / BM25_OFFSETS_FILE, self.term_offsets)
+        np.save(directory / BM25_ROWS_FILE, self.rows)
+        np.save(directory / BM25_TFS_FILE, self.tfs)
+        np.save(directory / BM25_LENGTHS_FILE, self.doc_lengths)
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        """Load a saved index; the postings and document lengths stay memory-mapped."""
+        directory = Path(directory)
+        with (directory / BM25_TERMS_FILE).open("r", encoding="utf-8") as f:
+            saved = json.load(f)
+        index = cls.__new__(cls)
+        index._init(
+            saved["terms"],
+            np.load(directory / BM25_OFFSETS_FILE),
+            np.load(directory / BM25_ROWS_FILE, mmap_mode="r"),
+            np.load(directory / BM25_TFS_FILE, mmap_mode="r"),
+            np.load(directory / BM25_LENGTHS_FILE, mmap_mode="r"),
+            saved["k1"],
+            saved["b"],
+        )
+        return index
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = Path(directory)
+        return all(
+            (directory / f).is_file()
+            for f in (BM25_TERMS_FILE, BM25_OFFSETS_FILE, BM25_ROWS_FILE, BM25_TFS_FILE, BM25_LENGTHS_FILE)
+        )
+
+    def nbytes(self) -> Tuple[int, int]:
+        """(memory-mapped bytes, heap bytes) held by the index; the term dict is the heap part."""
+        mapped = heap = 0
+        for arr in (self.term_offsets, self.rows, self.tfs, self.doc_lengths):
+            if isinstance(arr, np.memmap):
+                mapped += arr.nbytes
+            else:
+                heap += arr.nbytes
+        heap += sum(len(term) + 100 for term in self.terms)  # str + dict entry overhead, roughly
+        return mapped, heap
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, scores) of the top-k documents, best first."""
+        if self.num_docs == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        acc = np.zeros(self.num_docs, dtype=np.float32)
+        touched = []
+        for term in set(tokenize(query)):
+            index = self.terms.get(term)
+            if index is None:
+                continue
+            start, end = int(self.term_offsets[index]), int(self.term_offsets[index + 1])
+            rows = np.asarray(self.rows[start:end], dtype=np.int64)
+            tfs = np.asarray(self.tfs[start:end])
+            df = end - start
+            idf = float(np.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5)))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[rows] / self.avg_length)
+            acc[rows] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+            touched.append(rows)
+        if not touched:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates = np.unique(np.concatenate(touched))
+        order = np.argsort(-acc[candidates], kind="stable")[:k]
+        rows = candidates[order]
+        return rows, acc[rows]
@@ -0,0 +1,94 @@
+# rag/embeddings.py
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+# Name of the embedder used when an index does not record one.
+# "hashing" is fully local and dependency-free; any other value is treated as a
+# sentence-transformers model name (e.g. "sentence-transformers/all-MiniLM-L6-v2").
+DEFAULT_EMBEDDER = os.getenv("RAG_EMBEDDER", "hashing").strip() or "hashing"
+HASHING_DIM = 1024
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Recorded in index manifests; bump when `tokenize` changes so incremental
+# builds re-embed instead of reusing vectors of the old tokenization
+TOKENIZER_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (any Unicode letters and digits, so umlauts and ß too)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder (feature hashing of words and word bigrams).
+    No model download, identical vectors in every process, good enough for small
+    local corpora and as a fallback when sentence-transformers is not installed.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+            # Sublinear term frequency keeps long chunks from drowning short matches
+            for feature, count in Counter(features).items():
+                idx, sign = self._bucket(feature)
+                out[row, idx] += sign * (1.0 + math.log(count))
+        return normalize_rows(out)
+
+
+class SentenceTransformerEmbedder:
+    """Thin wrapper around a sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name)
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(
+            list(texts), convert_to_numpy=True, normalize_embeddings=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so inner product == cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+@lru_cache(maxsize=4)
+def get_embedder(name: str = DEFAULT_EMBEDDER):
+    """
+    Return a (cached) embedder by name. Falls back to the hashing embedder if the
+    requested sentence-transformers model cannot be loaded.
+    """
+    if name == HashingEmbedder.name:
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(name)
+    except Exception as e:
+        print(f"[Warning] Could not load embedder '{name}' ({e}), using hashing embedder.")
+        return HashingEmbedder()
@@ -0,0 +1,338 @@
+# rag/index_builder.py
+"""
+Build the character-context retrieval index from a directory of local texts.
+
+    python -m rag.index_builder corpus/ --index data/index
+
+Every .txt / .md file below the corpus directory (cities, occupations, social
+settings, ...) is split into chunks, embedded, and written as a new index
+generation. Builds are incremental: files whose content hash did not change
+reuse their vectors from the previous generation, only new or edited files
+are re-embedded, and embedding runs in a process pool across all cores.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .bm25 import BM25Index
+from .embeddings import DEFAULT_EMBEDDER, TOKENIZER_VERSION, get_embedder
+from .retriever import (
+    EXACT_SEARCH_MAX_DOCS,
+    IDS_FILE,
+    MANIFEST_FILE,
+    METADATA_FILE,
+    METADATA_OFFSETS_FILE,
+    VECTORS_FILE,
+    resolve_index_dir,
+    CURRENT_FILE,
+)
+from .vector_index import build_ivf
+
+FILES_STATE_FILE = "files.json"
+CORPUS_EXTENSIONS = {".txt", ".md"}
+DEFAULT_CHUNK_CHARS = 800
+KEEP_GENERATIONS = 2
+EMBED_BATCH_SIZE = 256
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+# ----------------------------
+# Chunking
+# ----------------------------
+def chunk_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """
+    Pack paragraphs into chunks of at most `max_chars`. Paragraphs that are too
+    long on their own are split on sentence boundaries (and hard-cut as a last resort).
+    """
+    pieces: List[str] = []
+    for para in re.split(r"\n\s*\n", text):
+        para = " ".join(para.split())
+        if not para:
+            continue
+        if len(para) <= max_chars:
+            pieces.append(para)
+            continue
+        for sentence in _SENTENCE_SPLIT_RE.split(para):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _scan_corpus(corpus_dir: Path) -> Dict[str, Path]:
+    files = {}
+    for path in sorted(corpus_dir.rglob("*")):
+        if path.is_file() and path.suffix.lower() in CORPUS_EXTENSIONS:
+            files[path.relative_to(corpus_dir).as_posix()] = path
+    return files
+
+
+# ----------------------------
+# Embedding (multi-process)
+# ----------------------------
+_worker_embedder = None
+
+
+def _init_embed_worker(embedder_name: str) -> None:
+    global _worker_embedder
+    _worker_embedder = get_embedder(embedder_name)
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.embed(texts)
+
+
+def embed_chunks(texts: List[str], embedder_name: str, workers: int) -> np.ndarray:
+    """Embed texts in batches, fanned out over `workers` processes."""
+    embedder = get_embedder(embedder_name)
+    if not texts:
+        return np.zeros((0, embedder.dim), dtype=np.float32)
+    batches = [texts[i : i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    if workers <= 1 or len(batches) == 1:
+        return np.vstack([embedder.embed(b) for b in batches])
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(batches)),
+        initializer=_init_embed_worker,
+        initargs=(embedder_name,),
+    ) as pool:
+        return np.vstack(list(pool.map(_embed_batch, batches)))
+
+
+# ----------------------------
+# Previous generation (for incremental builds)
+# ----------------------------
+def _load_previous(index_dir: Path, embedder_name: str, chunk_chars: int):
+    """
+    Return (files_state, vectors, metadata rows) of the current generation, or
+    None when there is nothing reusable (no index, other embedder, tokenizer or chunking).
+    """
+    gen_dir = resolve_index_dir(index_dir)
+    manifest_path = gen_dir / MANIFEST_FILE
+    state_path = gen_dir / FILES_STATE_FILE
+    if not (manifest_path.is_file() and state_path.is_file()):
+        return None
+    with manifest_path.open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if (
+        manifest.get("embedder") != embedder_name
+        or manifest.get("dim") != get_embedder(embedder_name).dim
+        or manifest.get("chunk_chars") != chunk_chars
+        or manifest.get("tokenizer") != TOKENIZER_VERSION
+    ):
+        return None
+    with state_path.open("r", encoding="utf-8") as f:
+        files_state = json.load(f)
+    vectors = np.load(gen_dir / VECTORS_FILE, mmap_mode="r")
+    with (gen_dir / METADATA_FILE).open("r", encoding="utf-8") as f:
+        metadata = [json.loads(line) for line in f if line.strip()]
+    return files_state, vectors, metadata
+
+
+# ----------------------------
+# Writing a generation
+# ----------------------------
+def _write_generation(
+    index_dir: Path,
+    ids: List[str],
+    vectors: np.ndarray,
+    metadata: List[Dict],
+    files_state: Dict,
+    manifest: Dict,
+) -> Path:
+    gen_name = "gen-" + datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp_dir = index_dir / f".{gen_name}.tmp"
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / VECTORS_FILE, vectors.astype(np.float32, copy=False))
+    with (tmp_dir / IDS_FILE).open("w", encoding="utf-8") as f:
+        json.dump(ids, f, ensure_ascii=False)
+
+    offsets = []
+    pos = 0
+    with (tmp_dir / METADATA_FILE).open("wb") as f:
+        for row in metadata:
+            line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+            offsets.append(pos)
+            pos += len(line)
+            f.write(line)
+    np.save(tmp_dir / METADATA_OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+
+    with (tmp_dir / FILES_STATE_FILE).open("w", encoding="utf-8") as f:
+        json.dump(files_state, f, indent=2, ensure_ascii=False)
+
+    if len(ids) > EXACT_SEARCH_MAX_DOCS:
+        build_ivf(vectors).save(tmp_dir)
+    BM25Index(row.get("text", "") for row in metadata).save(tmp_dir)
+
+    with (tmp_dir / MANIFEST_FILE).open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    gen_dir = index_dir / gen_name
+    tmp_dir.rename(gen_dir)
+
+    # Flip the CURRENT pointer atomically; readers see either the old or the new generation.
+    pointer_tmp = index_dir / f".{CURRENT_FILE}.tmp"
+    pointer_tmp.write_text(gen_name + "\n", encoding="utf-8")
+    os.replace(pointer_tmp, index_dir / CURRENT_FILE)
+    return gen_dir
+
+
+def _prune_generations(index_dir: Path, keep: int = KEEP_GENERATIONS) -> None:
+    generations = sorted(p for p in index_dir.glob("gen-*") if p.is_dir())
+    for old in generations[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+# ----------------------------
+# Build
+# ----------------------------
+def build_index(
+    corpus_dir: str,
+    index_dir: str = "data/index",
+    embedder_name: str = DEFAULT_EMBEDDER,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    workers: Optional[int] = None,
+    full: bool = False,
+) -> Dict:
+    """Build (or incrementally update) the index and return build statistics."""
+    started = time.perf_counter()
+    corpus_path = Path(corpus_dir)
+    index_path = Path(index_dir)
+    index_path.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    # Record the embedder that is actually used (model loading may fall back)
+    embedder_name = get_embedder(embedder_name).name
+
+    previous = None if full else _load_previous(index_path, embedder_name, chunk_chars)
+    prev_state, prev_vectors, prev_metadata = previous or ({}, None, [])
+
+    files = _scan_corpus(corpus_path)
+    files_state: Dict[str, Dict] = {}
+    # (relpath, reused rows or None, chunks to embed)
+    plan: List[Tuple[str, Optional[List[int]], List[str]]] = []
+    reused_files = 0
+
+    prev_rows_by_file: Dict[str, List[int]] = {}
+    for row, meta in enumerate(prev_metadata):
+        prev_rows_by_file.setdefault(meta.get("source", ""), []).append(row)
+
+    for relpath, path in files.items():
+        digest = _file_hash(path)
+        old = prev_state.get(relpath)
+        if old and old.get("sha256") == digest and relpath in prev_rows_by_file:
+            plan.append((relpath, prev_rows_by_file[relpath], []))
+            reused_files += 1
+        else:
+            text = path.read_text(encoding="utf-8", errors="replace")
+            plan.append((relpath, None, chunk_text(text, chunk_chars)))
+        files_state[relpath] = {"sha256": digest}
+
+    new_texts = [chunk for _, rows, chunks in plan if rows is None for chunk in chunks]
+    new_vectors = embed_chunks(new_texts, embedder_name, workers)
+    dim = new_vectors.shape[1] if new_vectors.size else get_embedder(embedder_name).dim
+
+    ids: List[str] = []
+    metadata: List[Dict] = []
+    blocks: List[np.ndarray] = []
+    new_pos = 0
+    for relpath, rows, chunks in plan:
+        # The full relative path (with extension) keeps IDs unique: "foo.txt"
+        # and "foo.md" must not both become "foo#1"
+        if rows is not None:
+            blocks.append(np.asarray(prev_vectors[rows], dtype=np.float32))
+            for row in rows:
+                row_meta = dict(prev_metadata[row], id=f"{relpath}#{prev_metadata[row]['chunk']}")
+                metadata.append(row_meta)
+                ids.append(row_meta["id"])
+        else:
+            blocks.append(new_vectors[new_pos : new_pos + len(chunks)])
+            new_pos += len(chunks)
+            for i, chunk in enumerate(chunks):
+                doc_id = f"{relpath}#{i + 1}"
+                metadata.append({"id": doc_id, "text": chunk, "source": relpath, "chunk": i + 1})
+                ids.append(doc_id)
+        files_state[relpath]["chunks"] = len(rows) if rows is not None else len(chunks)
+
+    vectors = np.vstack(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+    manifest = {
+        "embedder": embedder_name,
+        "dim": int(dim),
+        "count": len(ids),
+        "chunk_chars": chunk_chars,
+        "tokenizer": TOKENIZER_VERSION,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    gen_dir = _write_generation(index_path, ids, vectors, metadata, files_state, manifest)
+    _prune_generations(index_path)
+
+    return {
+        "generation": gen_dir.name,
+        "files": len(files),
+        "files_reused": reused_files,
+        "files_embedded": len(files) - reused_files,
+        "chunks": len(ids),
+        "chunks_embedded": len(new_texts),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the character-context retrieval index from local texts."
+    )
+    parser.add_argument("corpus_dir", help="Directory with .txt/.md files (cities, occupations, ...)")
+    parser.add_argument("--index", default="data/index", help="Index directory (default: data/index)")
+    parser.add_argument("--embedder", default=DEFAULT_EMBEDDER, help="Embedder name (default: %(default)s)")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--workers", type=int, default=None, help="Embedding processes (default: all cores)")
+    parser.add_argument("--full", action="store_true", help="Ignore the previous build and re-embed everything")
+    args = parser.parse_args()
+
+    stats = build_index(
+        args.corpus_dir,
+        index_dir=args.index,
+        embedder_name=args.embedder,
+        chunk_chars=args.chunk_chars,
+        workers=args.workers,
+        full=args.full,
+    )
+    print(
+        f"Index {stats['generation']}: {stats['chunks']} chunks from {stats['files']} files "
+        f"({stats['files_embedded']} embedded, {stats['files_reused']} reused) in {stats['seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# rag/registry.py
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .retriever import CURRENT_FILE, RagRetriever, resolve_index_dir
+
+INDEX_POLL_SECONDS = float(os.getenv("RAG_INDEX_POLL_SECONDS", "5"))
+
+
+def _process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _index_signature(index_path: str) -> Tuple:
+    """
+    Cheap fingerprint of the on-disk index: the CURRENT pointer plus size/mtime
+    of the files the retriever reads. Changes whenever a rebuild is activated.
+    """
+    root = Path(index_path)
+    pointer = root / CURRENT_FILE
+    parts = [pointer.read_text(encoding="utf-8").strip() if pointer.is_file() else None]
+    directory = resolve_index_dir(index_path)
+    candidates = [directory] if directory.is_file() else [
+        directory / name for name in ("manifest.json", "vectors.npy", "index.json")
+    ]
+    for p in candidates:
+        try:
+            st = p.stat()
+            parts.append((p.name, st.st_size, st.st_mtime_ns))
+        except OSError:
+            parts.append((p.name, None, None))
+    return tuple(parts)
+
+
+class RetrieverRegistry:
+    """
+    Process-wide holder of one RagRetriever per index path.
+
+    The index is loaded once in a background thread, shared by all request
+    threads, and hot-swapped when the index directory changes: a rebuilt index
+    is loaded off to the side and then published with a single reference
+    assignment, so in-flight queries keep using the instance they started with.
+    If no index could be loaded yet, requests get one shared empty retriever
+    (no RAG context) until the watcher finds a loadable generation.
+    """
+
+    def __init__(self, index_path: str, poll_seconds: float = INDEX_POLL_SECONDS):
+        self.index_path = index_path
+        self.poll_seconds = poll_seconds
+        self._retriever: Optional[RagRetriever] = None
+        self._signature: Optional[Tuple] = None
+        self._degraded: Optional[RagRetriever] = None
+        self._failed_signature: Optional[Tuple] = None
+        self.load_error: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+
+    def start(self) -> "RetrieverRegistry":
+        """Load the index and watch it for changes, both in a daemon thread."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(
+                target=self._watch, name=f"rag-index-watch:{self.index_path}", daemon=True
+            )
+            self._watcher.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def get(self, timeout: Optional[float] = None) -> RagRetriever:
+        """
+        Return the current retriever. Only a request arriving before the very
+        first load has finished waits for it; afterwards this is a plain read.
+        """
+        retriever = self._retriever
+        if retriever is not None:
+            return retriever
+        if self._watcher is None:
+            try:
+                self.reload()
+            except Exception as e:
+                self._load_failed(e)
+        else:
+            self._loaded.wait(timeout)
+        return self._retriever or self._degraded_retriever()
+
+    def _degraded_retriever(self) -> RagRetriever:
+        """The empty retriever served while no index could be loaded (built once)."""
+        with self._reload_lock:
+            if self._degraded is None:
+                self._degraded = RagRetriever(index_path=self.index_path, load=False)
+            return self._degraded
+
+    def _load_failed(self, error: Exception) -> None:
+        # Logged once per broken index state: reload() skips it until it changes
+        self.load_error = f"{type(error).__name__}: {error}"
+        if self._retriever is None:
+            print(f"[Warning] Could not load retrieval index {self.index_path} ({self.load_error}); "
+                  f"RAG context will be empty until a valid index appears.")
+        else:
+            # Keep serving the previous index if a rebuild is half-written or broken
+            print(f"[Warning] Could not reload retrieval index {self.index_path} ({self.load_error}); "
+                  f"keeping the loaded one.")
+        self._loaded.set()
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the index if it changed since the last load. Returns True if swapped."""
+        with self._reload_lock:
+            signature = _index_signature(self.index_path)
+            if not force and self._retriever is not None and signature == self._signature:
+                return False
+            if not force and signature == self._failed_signature:
+                return False  # same broken index as last time
+            started = time.perf_counter()
+            try:
+                retriever = RagRetriever(index_path=self.index_path)
+            except Exception:
+                self._failed_signature = signature
+                raise
+            self.load_seconds = time.perf_counter() - started
+            self.loaded_at = time.time()
+            if self._retriever is not None:
+                self.reloads += 1
+            self._signature = signature
+            self._failed_signature = None
+            self.load_error = None
+            self._retriever = retriever  # atomic publish
+            self._loaded.set()
+            print(
+                f"[RAG] Loaded index {retriever.index_dir} ({len(retriever)} docs) "
+                f"in {self.load_seconds * 1000:.1f} ms"
+            )
+            return True
+
+    def _watch(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.reload()
+            except Exception as e:
+                self._load_failed(e)
+            self._stop.wait(self.poll_seconds)
+
+    def stats(self) -> Dict:
+        """Index load time and memory footprint, for logs and the stats endpoint."""
+        retriever = self._retriever
+        stats = {
+            "index_path": self.index_path,
+            "loaded": retriever is not None,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "load_error": self.load_error,
+            "process_rss_bytes": _process_rss_bytes(),
+        }
+        if retriever is not None:
+            stats["index_dir"] = str(retriever.index_dir)
+            stats["documents"] = len(retriever)
+            stats.update(retriever.memory_footprint())
+            stats["retrieval"] = retriever.latency_stats()
+        return stats
+
+
+_registries: Dict[str, RetrieverRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(index_path: str = "data/index") -> RetrieverRegistry:
+    """Return the process-wide registry for `index_path`, starting it on first use."""
+    key = os.path.abspath(index_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = RetrieverRegistry(index_path).start()
+            _registries[key] = registry
+        return registry
+
+
+def get_retriever(index_path: str = "data/index") -> RagRetriever:
+    """Shared, already-loaded retriever for `index_path`."""
+    return get_registry(index_path).get()
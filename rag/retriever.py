@@ -1,35 +1,348 @@
 # rag/retriever.py
 import json
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from .bm25 import BM25Index
+from .embeddings import DEFAULT_EMBEDDER, TOKENIZER_VERSION, get_embedder, tokenize
+from .vector_index import ExactIndex, IVFIndex, build_ivf
+
+# Index directory layout (see README "Retrieval index"). The builder writes
+# each build into its own generation directory and points CURRENT at it:
+#   CURRENT                name of the active generation directory
+#   manifest.json          embedder name, dimension, document count
+#   vectors.npy            float32 matrix (N x dim), L2-normalized, memory-mapped
+#   ids.json               row -> document id
+#   metadata.jsonl         one JSON object per row ({"id", "text", "source", ...})
+#   metadata_offsets.npy   optional byte offsets of each metadata line
+#   ivf_*.npy              optional prebuilt approximate index
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.json"
+METADATA_FILE = "metadata.jsonl"
+METADATA_OFFSETS_FILE = "metadata_offsets.npy"
+LEGACY_INDEX_FILE = "index.json"
+
+# Corpora up to this size are searched exactly; larger ones use the IVF index.
+EXACT_SEARCH_MAX_DOCS = int(os.getenv("RAG_EXACT_MAX_DOCS", "20000"))
+IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+
+# "hybrid" (BM25 + vector, fused with reciprocal rank fusion), "vector" or "bm25"
+RETRIEVAL_MODES = ("hybrid", "vector", "bm25")
+DEFAULT_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").strip().lower()
+RRF_K = 60
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "256"))
+
+# Shared by all retrievers: runs the BM25 and vector sub-queries side by side.
+_subquery_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-subquery")
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked row lists: score(d) = sum over lists of 1 / (k + rank)."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def resolve_index_dir(index_path) -> Path:
+    """Follow the CURRENT pointer of a generational index, if there is one."""
+    path = Path(index_path)
+    pointer = path / CURRENT_FILE
+    if pointer.is_file():
+        generation = pointer.read_text(encoding="utf-8").strip()
+        if generation and (path / generation).is_dir():
+            return path / generation
+    return path
+
+
+class _MetadataStore:
+    """
+    Row metadata kept apart from the vectors. Backed either by an in-memory list
+    (small / legacy indexes) or by a memory-mapped JSONL file that is only
+    decoded for the rows a query actually returns.
+    """
+
+    def __init__(self, rows: Optional[List[Dict]] = None, path: Optional[Path] = None):
+        self._rows = rows
+        self._mmap = None
+        self._offsets = None
+        if path is not None and path.stat().st_size > 0:
+            with path.open("rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets_path = path.parent / METADATA_OFFSETS_FILE
+            if offsets_path.is_file():
+                self._offsets = np.load(offsets_path)
+            else:
+                self._offsets = self._scan_offsets()
+
+    def _scan_offsets(self) -> np.ndarray:
+        offsets = [0]
+        pos = self._mmap.find(b"\n")
+        while pos != -1:
+            offsets.append(pos + 1)
+            pos = self._mmap.find(b"\n", pos + 1)
+        if offsets[-1] >= len(self._mmap):
+            offsets.pop()
+        return np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        if self._rows is not None:
+            return len(self._rows)
+        return 0 if self._offsets is None else len(self._offsets)
+
+    def get(self, row: int) -> Dict:
+        if self._rows is not None:
+            return self._rows[row]
+        start = int(self._offsets[row])
+        end = self._mmap.find(b"\n", start)
+        raw = self._mmap[start : end if end != -1 else len(self._mmap)]
+        return json.loads(raw)
 
 
 class RagRetriever:
     """
-    Placeholder RAG retriever.
-    Later: connect to a real vector store (e.g. Chroma / FAISS).
+    Vector retriever over a local index directory (default: data/index).
+
+    Vectors are memory-mapped, metadata is stored separately, and search runs
+    an exact NumPy top-k for small corpora and an IVF approximate index for
+    large ones. A missing index yields an empty result instead of an error.
     """
 
-    def __init__(self, index_path: str):
-        """Store the index path for later retrieval setup."""
+    def __init__(
+        self,
+        index_path: str,
+        exact_max_docs: int = EXACT_SEARCH_MAX_DOCS,
+        nprobe: int = IVF_NPROBE,
+        mode: str = DEFAULT_RETRIEVAL_MODE,
+        cache_size: int = QUERY_CACHE_SIZE,
+        load: bool = True,
+    ):
+        """Load (memory-map) the index at `index_path`, if one exists (`load=False`: stay empty)."""
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {RETRIEVAL_MODES}")
         self.index_path = index_path
-        path = Path(index_path)
-        index_file = path / "index.json" if path.is_dir() else path
-        if index_file.is_file():
-            with index_file.open("r", encoding="utf-8") as f:
-                self.index = json.load(f)
+        self.mode = mode
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._timing_totals: Dict[str, float] = {}
+        self._timing_counts: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bm25: Optional[BM25Index] = None
+        self.embedder_name = DEFAULT_EMBEDDER
+        self.ids: List[str] = []
+        self.metadata = _MetadataStore(rows=[])
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._search_index = None
+        self._tokenizer_version: Optional[int] = None
+
+        path = resolve_index_dir(index_path)
+        self.index_dir = path
+        if not load:
+            return
+        if path.is_dir() and (path / VECTORS_FILE).is_file():
+            self._load_directory(path)
+        else:
+            legacy = path / LEGACY_INDEX_FILE if path.is_dir() else path
+            if legacy.is_file():
+                self._load_legacy(legacy)
+
+        if len(self.ids) == 0:
+            print(f"[Warning] No retrieval index found at {index_path}; RAG context will be empty.")
+            return
+
+        if self.mode in ("hybrid", "bm25"):
+            if path.is_dir() and BM25Index.exists(path) and self._tokenizer_version == TOKENIZER_VERSION:
+                self.bm25 = BM25Index.load(path)
+            else:
+                # Legacy index or a generation from before postings were saved:
+                # tokenizes every metadata row, O(total text) time and heap
+                self.bm25 = BM25Index(
+                    self.metadata.get(row).get("text", "") for row in range(len(self.ids))
+                )
+
+        self.embedder = get_embedder(self.embedder_name)
+        if self.embedder.dim != self.vectors.shape[1]:
+            print(
+                f"[Warning] Embedder '{self.embedder.name}' ({self.embedder.dim}d) does not match "
+                f"index dimension {self.vectors.shape[1]}; retrieval disabled."
+            )
+            return
+
+        if len(self.ids) <= exact_max_docs:
+            self._search_index = ExactIndex(self.vectors)
+        elif path.is_dir() and IVFIndex.exists(path):
+            self._search_index = IVFIndex.load(path, self.vectors, nprobe=nprobe)
         else:
-            self.index = []
+            self._search_index = build_ivf(self.vectors, nprobe=nprobe)
+
+    def _load_directory(self, path: Path) -> None:
+        manifest_file = path / MANIFEST_FILE
+        if manifest_file.is_file():
+            with manifest_file.open("r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.embedder_name = manifest.get("embedder", self.embedder_name)
+            self._tokenizer_version = manifest.get("tokenizer")
+        with (path / IDS_FILE).open("r", encoding="utf-8") as f:
+            self.ids = json.load(f)
+        self.vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        self.metadata = _MetadataStore(path=path / METADATA_FILE)
+
+    def _load_legacy(self, index_file: Path) -> None:
+        """Support the old `index.json` list of {"id", "text"} docs (embedded on load)."""
+        with index_file.open("r", encoding="utf-8") as f:
+            docs = json.load(f)
+        docs = [d for d in docs if isinstance(d, dict) and d.get("text")]
+        if not docs:
+            return
+        self.ids = [str(d.get("id", f"doc{i + 1}")) for i, d in enumerate(docs)]
+        self.metadata = _MetadataStore(rows=docs)
+        self.vectors = get_embedder(self.embedder_name).embed([d["text"] for d in docs])
+
+    def __len__(self) -> int:
+        return len(self.ids)
 
-    def retrieve(self, query: str, k: int = 3) -> List[Dict]:
+    def memory_footprint(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by this retriever. Memory-mapped files are
+        reported separately: they are paged in on demand and shared between processes.
+        """
+        mapped = 0
+        heap = 0
+        if isinstance(self.vectors, np.memmap):
+            mapped += self.vectors.nbytes
+        else:
+            heap += self.vectors.nbytes
+        if self.metadata._mmap is not None:
+            mapped += len(self.metadata._mmap)
+        if self.metadata._offsets is not None:
+            heap += self.metadata._offsets.nbytes
+        for attr in ("centroids", "list_offsets", "list_ids"):
+            arr = getattr(self._search_index, attr, None)
+            if isinstance(arr, np.memmap):
+                mapped += arr.nbytes
+            elif arr is not None:
+                heap += arr.nbytes
+        heap += sum(len(i) for i in self.ids) + 56 * len(self.ids)
+        if self.bm25 is not None:
+            bm25_mapped, bm25_heap = self.bm25.nbytes()
+            mapped += bm25_mapped
+            heap += bm25_heap
+        return {"mapped_bytes": int(mapped), "heap_bytes": int(heap)}
+
+    def retrieve(self, query: str, k: int = 3, mode: Optional[str] = None) -> List[Dict]:
         """
         Returns a list of document dicts like:
-        [{"id": "doc1", "text": "..."}]
+        [{"id": "doc1", "text": "...", "score": 0.42, ...}]
+        """
+        return self.retrieve_with_timings(query, k=k, mode=mode)[0]
+
+    def retrieve_with_timings(
+        self, query: str, k: int = 3, mode: Optional[str] = None
+    ) -> Tuple[List[Dict], Dict[str, float]]:
+        """
+        Like `retrieve`, plus a latency breakdown in milliseconds per
+        sub-retriever (vector, bm25, fusion, total) and whether the cache hit.
         """
+        started = time.perf_counter()
+        mode = mode or self.mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {RETRIEVAL_MODES}")
+        normalized = " ".join(tokenize(query))
+        if not normalized or (self._search_index is None and self.bm25 is None):
+            return [], {"total_ms": 0.0, "cache_hit": False}
+
+        key = (normalized, k, mode)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is not None:
+            timings = {"total_ms": (time.perf_counter() - started) * 1000, "cache_hit": True}
+            return [dict(d) for d in cached], timings
+
+        timings: Dict[str, float] = {"cache_hit": False}
+        depth = max(k * 4, 20)  # candidates per sub-retriever before fusion
+        vector_future = bm25_future = None
+        if mode in ("hybrid", "vector") and self._search_index is not None:
+            vector_future = _subquery_pool.submit(self._timed, self._vector_search, query, depth)
+        if mode in ("hybrid", "bm25") and self.bm25 is not None:
+            bm25_future = _subquery_pool.submit(self._timed, self.bm25.search, normalized, depth)
+
+        rankings = []
+        scores: Dict[str, Dict[int, float]] = {}
+        for name, future in (("vector", vector_future), ("bm25", bm25_future)):
+            if future is None:
+                continue
+            (rows, row_scores), elapsed = future.result()
+            timings[f"{name}_ms"] = elapsed
+            rankings.append([int(r) for r in rows])
+            scores[name] = {int(r): float(s) for r, s in zip(rows, row_scores)}
+
+        fuse_started = time.perf_counter()
+        if len(rankings) > 1:
+            ranked = reciprocal_rank_fusion(rankings)[:k]
+        else:
+            only = next(iter(scores.values()), {})
+            ranked = [(row, only[row]) for row in (rankings[0] if rankings else [])][:k]
+
+        results = []
+        for row, score in ranked:
+            doc = dict(self.metadata.get(row))
+            doc["id"] = self.ids[row]
+            doc["score"] = score
+            for name, by_row in scores.items():
+                if row in by_row:
+                    doc[f"{name}_score"] = by_row[row]
+            results.append(doc)
+        timings["fusion_ms"] = (time.perf_counter() - fuse_started) * 1000
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+
+        with self._cache_lock:
+            self.cache_misses += 1
+            self._cache[key] = results
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            for name, value in timings.items():
+                if name.endswith("_ms"):
+                    self._timing_totals[name] = self._timing_totals.get(name, 0.0) + value
+                    self._timing_counts[name] = self._timing_counts.get(name, 0) + 1
+        return [dict(d) for d in results], timings
+
+    def _vector_search(self, query: str, depth: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self._search_index.search(self.embedder.embed([query])[0], depth)
+
+    @staticmethod
+    def _timed(fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, (time.perf_counter() - started) * 1000
 
-        # TODO: implement real retrieval logic.
-        # For now we just return dummy docs.
-        return [
-            {"id": "doc1", "text": f"Dummy context for query: {query}"},
-            {"id": "doc2", "text": "Another dummy document about harbor life."}
-        ][:k]
+    def latency_stats(self) -> Dict:
+        """Mean latency per sub-retriever over uncached queries, plus cache hit counts."""
+        with self._cache_lock:
+            means = {
+                f"mean_{name}": round(total / self._timing_counts[name], 3)
+                for name, total in self._timing_totals.items()
+            }
+            return {
+                "mode": self.mode,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_entries": len(self._cache),
+                **means,
+            }
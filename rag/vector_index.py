@@ -0,0 +1,143 @@
+# rag/vector_index.py
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_OFFSETS_FILE = "ivf_list_offsets.npy"
+IVF_IDS_FILE = "ivf_list_ids.npy"
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first (argpartition + small sort)."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ExactIndex:
+    """
+    Brute-force inner-product search over L2-normalized vectors.
+    One matrix-vector product per query; fastest option for small corpora.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.vectors.shape[0] == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.vectors @ query
+        rows = _top_k(scores, k)
+        return rows, scores[rows]
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index: vectors are bucketed by their nearest
+    k-means centroid, and a query only scores the `nprobe` closest buckets.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_ids: np.ndarray,
+        nprobe: int = 8,
+    ):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = max(1, min(nprobe, centroids.shape[0]))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probe = _top_k(self.centroids @ query, self.nprobe)
+        rows = np.concatenate(
+            [self.list_ids[self.list_offsets[c] : self.list_offsets[c + 1]] for c in probe]
+        )
+        if rows.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows.sort()  # sequential access pattern on the memory-mapped matrix
+        scores = self.vectors[rows] @ query
+        best = _top_k(scores, k)
+        return rows[best], scores[best]
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        np.save(directory / IVF_CENTROIDS_FILE, self.centroids)
+        np.save(directory / IVF_OFFSETS_FILE, self.list_offsets)
+        np.save(directory / IVF_IDS_FILE, self.list_ids)
+
+    @classmethod
+    def load(cls, directory: Path, vectors: np.ndarray, nprobe: int = 8) -> "IVFIndex":
+        directory = Path(directory)
+        return cls(
+            vectors,
+            np.load(directory / IVF_CENTROIDS_FILE),
+            np.load(directory / IVF_OFFSETS_FILE),
+            np.load(directory / IVF_IDS_FILE, mmap_mode="r"),
+            nprobe=nprobe,
+        )
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        directory = Path(directory)
+        return all(
+            (directory / f).is_file()
+            for f in (IVF_CENTROIDS_FILE, IVF_OFFSETS_FILE, IVF_IDS_FILE)
+        )
+
+
+def build_ivf(
+    vectors: np.ndarray,
+    nlist: int = 0,
+    iterations: int = 10,
+    sample_size: int = 50_000,
+    nprobe: int = 8,
+    seed: int = 0,
+    block: int = 65_536,
+) -> IVFIndex:
+    """
+    Train spherical k-means centroids on a sample and assign every vector to its
+    closest centroid. `nlist` defaults to ~sqrt(N), the usual IVF rule of thumb.
+    """
+    n = vectors.shape[0]
+    if nlist <= 0:
+        nlist = max(1, int(np.sqrt(n)))
+    nlist = min(nlist, n)
+    rng = np.random.default_rng(seed)
+
+    sample_rows = np.sort(rng.choice(n, size=min(sample_size, n), replace=False))
+    sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        # Re-seed empty clusters with random sample points
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    assignments = np.empty(n, dtype=np.int64)
+    for start in range(0, n, block):
+        chunk = np.asarray(vectors[start : start + block], dtype=np.float32)
+        assignments[start : start + block] = np.argmax(chunk @ centroids.T, axis=1)
+
+    list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+    counts = np.bincount(assignments, minlength=nlist)
+    list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return IVFIndex(vectors, centroids, list_offsets, list_ids, nprobe=nprobe)
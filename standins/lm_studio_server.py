@@ -0,0 +1,551 @@
+# standins/lm_studio_server.py
+"""
+Local stand-in for LM Studio's OpenAI-compatible API (`POST /v1/chat/completions`,
+`GET /v1/models`), for reproducible pipeline tests and benchmarks on a CPU.
+
+    python -m standins.lm_studio_server --port 1234 --prefill-tps 2000 --decode-tps 40
+    # then LM_STUDIO_BASE_URL=http://127.0.0.1:1234/v1
+
+The pipeline stage is recognized from the prompt (case, characters, last day,
+clues, solution, judge score, portrait prompts, image tool call) and answered
+with canned, schema-valid JSON that reuses the names found in the prompt, so
+later stages stay consistent with earlier ones. Answers are deterministic per
+request. Latency is simulated as prompt tokens / prefill_tps plus completion
+tokens / decode_tps (tokens ~ characters / 4); with `stream` the content is
+sent in chunks at the decode rate. Only `parallel` requests are processed at
+once, at most `max_queue` wait (429 beyond that), and `error_rate` /
+`malformed_rate` inject 500s and non-JSON answers.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MODEL = "qwen/qwen3-vl-4b"
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_TOKENS = 8
+
+
+@dataclass
+class LmStandinConfig:
+    prefill_tps: float = 2000.0
+    decode_tps: float = 40.0
+    parallel: int = 1
+    max_queue: int = 64
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    model: str = DEFAULT_MODEL
+    seed: int = 0
+
+
+# ----------------------------
+# Canned content
+# ----------------------------
+_FIRST_NAMES = [
+    "Hans", "Lena", "Julia", "Erik", "Alicia", "Thomas", "Greta", "Jonas",
+    "Maren", "Felix", "Ingrid", "Lukas", "Frieda", "Paul", "Svenja", "Ole",
+]
+_LAST_NAMES = [
+    "Schmidt", "Jensen", "Richter", "von Hagen", "Weber", "Petersen", "Krüger",
+    "Hansen", "Becker", "Lorenz", "Brandt", "Wolff", "Nielsen", "Vogt",
+]
+_OCCUPATIONS = [
+    "harbor master", "town councillor", "fish merchant", "journalist", "chef",
+    "pastor", "shipyard engineer", "pharmacist", "art dealer", "police officer",
+    "hotel owner", "marine biologist", "lawyer", "baker",
+]
+_TRAITS = ["secretive", "ambitious", "charming", "nervous", "stubborn", "loyal", "jealous", "meticulous"]
+_TIMES = ["07:30", "09:00", "11:15", "13:00", "15:30", "17:45", "19:30", "21:00", "22:40"]
+_PLACES = ["the harbor", "the town hall", "the fish market", "the newspaper office", "the restaurant", "the lighthouse"]
+
+_NAME_RE = re.compile(r"""['"]name['"]:\s*(['"])(.*?)\1""")
+_CLUE_PAIR_RE = re.compile(
+    r"""['"]character['"]:\s*(['"])(.*?)\1.*?['"]target['"]:\s*(['"])(.*?)\3""", re.DOTALL
+)
+
+
+def _section(text: str, header: str) -> str:
+    """Text after `HEADER:` up to the next blank-line-separated ALL-CAPS header."""
+    match = re.search(rf"{re.escape(header)}:\s*\n(.*?)(?:\n\s*\n[A-Z_ ()]+:|\Z)", text, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def _unique(items: List[str]) -> List[str]:
+    seen, out = set(), []
+    for item in items:
+        if item and item not in seen:
+            seen.add(item)
+            out.append(item)
+    return out
+
+
+def _literal(text: str) -> Any:
+    """Prompt sections are Python reprs of the pipeline's dicts and lists."""
+    try:
+        return ast.literal_eval(text.strip())
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _names_in(text: str) -> List[str]:
+    value = _literal(text)
+    if isinstance(value, list):
+        return _unique([str(c.get("name", "")) for c in value if isinstance(c, dict)])
+    return _unique([m.group(2) for m in _NAME_RE.finditer(text)])
+
+
+def _clue_pairs(text: str) -> List[Tuple[str, str]]:
+    value = _literal(text)
+    if isinstance(value, list):
+        return [
+            (str(entry.get("character", "")), str(clue.get("target", "")))
+            for entry in value if isinstance(entry, dict)
+            for clue in entry.get("clues") or [] if isinstance(clue, dict)
+        ]
+    return [(m.group(2), m.group(4)) for m in _CLUE_PAIR_RE.finditer(text)]
+
+
+def _case(rng: random.Random, prompt: str) -> Dict:
+    location = (re.search(r'location_of_event:\s*"([^"]*)"', prompt) or [None, "Hamburg"])[1]
+    dishes = [
+        d.strip() for d in re.findall(r"- (?:starter|main_course|dessert):\s*(.+)", prompt)
+        if d.strip() and d.strip() != "none"
+    ]
+    victim = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+    menu_text = ", ".join(dishes) if dishes else "a local dinner"
+    return {
+        "victim_name": victim,
+        "victim_description": f"A {rng.randint(30, 65)}-year-old {rng.choice(_OCCUPATIONS)} known for stubborn honesty.",
+        "controversial_theme": "Corruption around a harbor redevelopment contract",
+        "location": f"A private dining room overlooking the water in {location}",
+        "summary": (
+            f"{victim} was about to expose who profited from a secret harbor contract. "
+            f"At a dinner of {menu_text}, the guests argued about the project. "
+            f"Shortly after dessert, {victim} was found dead in the cellar. "
+            "Every guest had something to lose if the documents became public."
+        ),
+        "timeline": "The dinner began at 19:30; the victim left the table at 21:00 and was found at 22:40.",
+    }
+
+
+def _characters(rng: random.Random, prompt: str) -> List[Dict]:
+    count = int((re.search(r"Create EXACTLY (\d+) characters", prompt) or [None, "7"])[1])
+    ids_match = re.search(r"may ONLY contain these ids:\s*(\[.*?\])", prompt)
+    try:
+        doc_ids = list(ast.literal_eval(ids_match.group(1))) if ids_match else []
+    except (ValueError, SyntaxError):
+        doc_ids = []
+    names: List[str] = []
+    while len(names) < count:
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+        if name in names:
+            name = f"{name} {len(names) + 1}"
+        names.append(name)
+    killer = rng.randrange(count)
+    return [
+        {
+            "name": name,
+            "appearance": f"{rng.choice(['Tall', 'Short', 'Wiry', 'Broad-shouldered'])}, with a {rng.choice(['grey', 'navy', 'red', 'green'])} coat.",
+            "occupation": rng.choice(_OCCUPATIONS),
+            "relation_to_victim": rng.choice(["old friend", "business partner", "rival", "neighbor", "former lover"]),
+            "personality_traits": rng.sample(_TRAITS, 2),
+            "background": f"{name} grew up in town and has been involved in the harbor project for years.",
+            "secret": f"{name} met the victim in private the night before the dinner.",
+            "hint_about_other": {
+                "target": names[(i + 1) % count],
+                "hint": f"Saw {names[(i + 1) % count]} leave the table shortly before the victim.",
+            },
+            "source_references": doc_ids[:2],
+            "murderer_label": i == killer,
+        }
+        for i, name in enumerate(names)
+    ]
+
+
+def _last_day(rng: random.Random, prompt: str) -> Dict:
+    names = _names_in(_section(prompt, "CHARACTERS (summary)")) or ["the victim"]
+    return {
+        "overview": "The victim spent the day gathering final evidence and confronting several guests before the dinner.",
+        "timeline": [
+            {
+                "time": time_label,
+                "location": rng.choice(_PLACES),
+                "participants": _unique([names[i % len(names)], names[(i + 2) % len(names)]]),
+                "description": f"The victim met {names[i % len(names)]} and the conversation became tense.",
+                "suspicious": i % 2 == 1,
+            }
+            for i, time_label in enumerate(_TIMES[: max(5, min(len(names), len(_TIMES)))])
+        ],
+    }
+
+
+def _clues(rng: random.Random, prompt: str) -> List[Dict]:
+    names = _names_in(_section(prompt, "CHARACTERS")) or ["Unknown"]
+    out = []
+    for i, name in enumerate(names):
+        targets = [names[(i + k) % len(names)] for k in (1, 2)] if len(names) > 1 else [name]
+        out.append({
+            "character": name,
+            "clues": [
+                {"target": target, "clue": f"{name} noticed {target} near {rng.choice(_PLACES)} at {rng.choice(_TIMES)}, contradicting their story."}
+                for target in targets[: rng.randint(1, 2)]
+            ],
+        })
+    return out
+
+
+def _solution(rng: random.Random, prompt: str) -> Dict:
+    names = _names_in(_section(prompt, "CHARACTERS")) or ["Unknown"]
+    hint = _section(prompt, "KILLER_HINT").strip()
+    killer = hint if hint and hint != "None" else rng.choice(names)
+    pairs = _clue_pairs(_section(prompt, "CHARACTER_CLUES"))
+    return {
+        "killer_name": killer,
+        "motive": f"{killer} stood to lose everything if the harbor contract became public.",
+        "method": f"{killer} followed the victim into the cellar during dessert and struck them.",
+        "opportunity": f"{killer} left the table at 21:00, the same time the victim did.",
+        "clue_alignment": [
+            {
+                "character": holder,
+                "about": target,
+                "clue_role": "supports_guilt" if target == killer else rng.choice(["red_herring", "partial_truth"]),
+                "explanation": f"The clue about {target} {'places them at the scene' if target == killer else 'is explained by an unrelated secret'}.",
+            }
+            for holder, target in pairs
+        ],
+        "alternative_suspects": [
+            {"name": n, "why_they_looked_suspicious": f"{n} also argued with the victim."}
+            for n in names if n != killer
+        ][:3],
+        "final_reveal_monologue": f"Everyone had a secret, but only {killer} had motive, means and opportunity.",
+    }
+
+
+def _portrait_prompts(rng: random.Random, prompt: str) -> Dict:
+    rows = re.findall(r"^\d+\. Name: (.*?) \| Role: (.*?) \| Appearance: (.*?) \|", prompt, re.MULTILINE)
+    return {
+        "prompts": [
+            {
+                "name": name,
+                "prompt": f"masterpiece portrait of a {role}, {appearance}, moody harbor lighting, 8k",
+                "negative_prompt": "ugly, blurry, bad anatomy",
+            }
+            for name, role, appearance in rows
+        ]
+    }
+
+
+def _image_tool_arguments(prompt: str) -> Dict:
+    name = (re.search(r"Name: (.*)", prompt) or [None, "Unnamed"])[1].strip()
+    appearance = (re.search(r"Appearance: (.*)", prompt) or [None, ""])[1].strip()
+    return {
+        "prompt": f"masterpiece portrait, {appearance}, cinematic lighting, 8k",
+        "negative_prompt": "ugly, blurry, bad anatomy",
+        "filename_prefix": name.replace(" ", "_"),
+    }
+
+
+# Stage name -> (marker in the prompt, answer builder). First match wins.
+_STAGES = [
+    ("judge", "Rate this murder mystery", lambda rng, p: f"{rng.choice([6.5, 7, 7.5, 8, 8.5])}"),
+    ("portrait_prompts", "Stable Diffusion prompts for", _portrait_prompts),
+    ("characters", "JSON array of character objects", _characters),
+    ("last_day", "reconstructing the victim's last day", _last_day),
+    ("clues", "advanced deduction puzzles", _clues),
+    ("solution", "solving an interactive murder mystery", _solution),
+    ("case", "murder-mystery cases", _case),
+]
+
+
+def detect_stage(messages: List[Dict]) -> str:
+    text = "\n".join(str(m.get("content") or "") for m in messages)
+    for stage, marker, _ in _STAGES:
+        if marker in text:
+            return stage
+    return "chat"
+
+
+def canned_answer(stage: str, messages: List[Dict], rng: random.Random) -> str:
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+    for name, _, build in _STAGES:
+        if name == stage:
+            answer = build(rng, prompt)
+            return answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+    return "OK."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+# ----------------------------
+# Server
+# ----------------------------
+class LmStandin:
+    """Admission control, simulated timing and statistics shared by request threads."""
+
+    def __init__(self, config: LmStandinConfig):
+        self.config = config
+        self._slots = threading.BoundedSemaphore(max(1, config.parallel))
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.requests_by_stage: Dict[str, int] = {}
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _rng(self, body: Dict) -> random.Random:
+        digest = hashlib.sha256(
+            json.dumps([self.config.seed, body.get("messages"), body.get("tools")], sort_keys=True, default=str).encode("utf-8")
+        ).digest()
+        return random.Random(int.from_bytes(digest[:8], "little"))
+
+    def admit(self) -> bool:
+        with self._lock:
+            if self.waiting >= self.config.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            return True
+
+    def prepare(self, body: Dict) -> Dict:
+        """Decide what to answer (stage, content or tool call, injected faults)."""
+        messages = body.get("messages") or []
+        rng = self._rng(body)
+        stage = detect_stage(messages)
+        tool_names = [t.get("function", {}).get("name") for t in body.get("tools") or []]
+        answer: Dict[str, Any] = {"stage": stage, "content": None, "tool_call": None}
+        if "generate_image_via_api" in tool_names and body.get("tool_choice", "auto") != "none":
+            prompt = "\n".join(str(m.get("content") or "") for m in messages)
+            answer["stage"] = "image_tool"
+            answer["tool_call"] = {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": "generate_image_via_api", "arguments": json.dumps(_image_tool_arguments(prompt))},
+            }
+            completion_text = answer["tool_call"]["function"]["arguments"]
+        else:
+            answer["content"] = canned_answer(stage, messages, rng)
+            if rng.random() < self.config.malformed_rate:
+                answer["content"] = "Sure! Here is the result you asked for: " + answer["content"][: len(answer["content"]) // 2]
+            completion_text = answer["content"]
+        answer["error"] = rng.random() < self.config.error_rate
+        answer["prompt_tokens"] = _tokens(json.dumps(messages, ensure_ascii=False))
+        answer["completion_tokens"] = _tokens(completion_text)
+        return answer
+
+    def record(self, answer: Dict) -> None:
+        with self._lock:
+            stage = answer["stage"]
+            self.requests_by_stage[stage] = self.requests_by_stage.get(stage, 0) + 1
+            if answer["error"]:
+                self.failed += 1
+            else:
+                self.completed += 1
+                self.prompt_tokens += answer["prompt_tokens"]
+                self.completion_tokens += answer["completion_tokens"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "config": asdict(self.config),
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "requests_by_stage": dict(self.requests_by_stage),
+            }
+
+
+def _make_handler(standin: LmStandin):
+    config = standin.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, message: str, error_type: str) -> None:
+            self._send_json(status, {"error": {"message": message, "type": error_type, "code": status}})
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/v1/models":
+                self._send_json(200, {"object": "list", "data": [{"id": config.model, "object": "model", "owned_by": "standin"}]})
+            elif self.path == "/stats":
+                self._send_json(200, standin.stats())
+            else:
+                self._send_error(404, "not found", "invalid_request_error")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_error(400, "invalid JSON body", "invalid_request_error")
+                return
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                self._send_error(404, "not found", "invalid_request_error")
+                return
+            if not isinstance(body.get("messages"), list) or not body["messages"]:
+                self._send_error(400, "'messages' must be a non-empty list", "invalid_request_error")
+                return
+            if not standin.admit():
+                self._send_error(429, "too many queued requests", "rate_limit_error")
+                return
+
+            answer = standin.prepare(body)
+            try:
+                with standin._slots:
+                    with standin._lock:
+                        standin.waiting -= 1
+                    time.sleep(answer["prompt_tokens"] / config.prefill_tps)  # prefill
+                    if answer["error"]:
+                        standin.record(answer)
+                        self._send_error(500, "injected model failure", "server_error")
+                        return
+                    if body.get("stream"):
+                        self._stream(body, answer)
+                    else:
+                        time.sleep(answer["completion_tokens"] / config.decode_tps)
+                        self._send_json(200, self._completion(body, answer))
+                standin.record(answer)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def _completion(self, body: Dict, answer: Dict) -> Dict:
+            message: Dict[str, Any] = {"role": "assistant", "content": answer["content"]}
+            if answer["tool_call"]:
+                message["tool_calls"] = [answer["tool_call"]]
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:16]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model") or config.model,
+                "choices": [{
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if answer["tool_call"] else "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": answer["prompt_tokens"],
+                    "completion_tokens": answer["completion_tokens"],
+                    "total_tokens": answer["prompt_tokens"] + answer["completion_tokens"],
+                },
+            }
+
+        def _stream(self, body: Dict, answer: Dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            base = {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:16]}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model") or config.model,
+            }
+
+            def event(delta: Dict, finish_reason: Optional[str] = None) -> None:
+                chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+                self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+            event({"role": "assistant", "content": ""})
+            if answer["tool_call"]:
+                time.sleep(answer["completion_tokens"] / config.decode_tps)
+                event({"tool_calls": [dict(answer["tool_call"], index=0)]})
+                event({}, "tool_calls")
+            else:
+                text = answer["content"]
+                step = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+                for start in range(0, len(text), step):
+                    piece = text[start:start + step]
+                    time.sleep(_tokens(piece) / config.decode_tps)
+                    event({"content": piece})
+                event({}, "stop")
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+    return Handler
+
+
+def start_server(
+    host: str = "127.0.0.1", port: int = 0, config: Optional[LmStandinConfig] = None
+) -> Tuple[ThreadingHTTPServer, LmStandin]:
+    """Start the stand-in in a daemon thread (port 0 = pick a free port)."""
+    standin = LmStandin(config or LmStandinConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(standin))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="lm-studio-standin", daemon=True).start()
+    return server, standin
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    """Base URL for LM_STUDIO_BASE_URL (including /v1)."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+def main():
+    defaults = LmStandinConfig()
+    parser = argparse.ArgumentParser(description="LM Studio (OpenAI-compatible) stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--prefill-tps", type=float, default=defaults.prefill_tps, help="prompt tokens per second")
+    parser.add_argument("--decode-tps", type=float, default=defaults.decode_tps, help="generated tokens per second")
+    parser.add_argument("--parallel", type=int, default=defaults.parallel, help="requests processed at once")
+    parser.add_argument("--max-queue", type=int, default=defaults.max_queue)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate)
+    parser.add_argument("--model", default=defaults.model)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = LmStandinConfig(
+        prefill_tps=args.prefill_tps,
+        decode_tps=args.decode_tps,
+        parallel=args.parallel,
+        max_queue=args.max_queue,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        model=args.model,
+        seed=args.seed,
+    )
+    server, _ = start_server(args.host, args.port, config)
+    print(f"[LM Studio stand-in] Listening on {server_url(server)} ({config})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
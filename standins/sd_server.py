@@ -0,0 +1,208 @@
+# standins/sd_server.py
+"""
+Local stand-in for the Automatic1111 API (`POST /sdapi/v1/txt2img`), for
+testing and benchmarking portrait generation without a GPU.
+
+    python -m standins.sd_server --port 7860 --step-seconds 0.05 --workers 1
+
+Images are deterministic PNGs of the requested size (seeded by prompt and
+seed). Render time is `base + steps * step_seconds` scaled by pixel count
+relative to 512x768, plus `adetailer_seconds` when ADetailer is requested.
+Like A1111, only `workers` jobs render at once; the rest wait in a queue of
+at most `max_queue` requests (503 beyond that). `error_rate` injects 500s.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+REFERENCE_PIXELS = 512 * 768
+
+
+@dataclass
+class SdStandinConfig:
+    base_seconds: float = 0.2
+    step_seconds: float = 0.04
+    adetailer_seconds: float = 0.5
+    workers: int = 1
+    max_queue: int = 64
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+def render_png(prompt: str, seed: int, width: int, height: int) -> bytes:
+    """Deterministic placeholder portrait: colors and shapes derived from prompt + seed."""
+    digest = hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).digest()
+    background = tuple(digest[0:3])
+    accent = tuple(255 - c for c in digest[3:6])
+    img = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(img)
+    cx, cy = width // 2, int(height * 0.38)
+    r = max(4, width // 5)
+    draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=accent)
+    draw.rectangle((cx - 2 * r, cy + r + 8, cx + 2 * r, height), fill=accent)
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+class SdStandin:
+    """Render queue and statistics shared by all request threads."""
+
+    def __init__(self, config: SdStandinConfig):
+        self.config = config
+        self._slots = threading.BoundedSemaphore(max(1, config.workers))
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def render_seconds(self, payload: Dict) -> float:
+        c = self.config
+        pixels = int(payload.get("width", 512)) * int(payload.get("height", 512))
+        seconds = c.base_seconds + int(payload.get("steps", 20)) * c.step_seconds * pixels / REFERENCE_PIXELS
+        if "ADetailer" in (payload.get("alwayson_scripts") or {}):
+            seconds += c.adetailer_seconds
+        return seconds
+
+    def txt2img(self, payload: Dict) -> Tuple[int, Dict]:
+        with self._lock:
+            if self.waiting >= self.config.max_queue:
+                self.rejected += 1
+                return 503, {"error": "queue full"}
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            fail = self._rng.random() < self.config.error_rate
+        width = int(payload.get("width", 512))
+        height = int(payload.get("height", 512))
+        seed = int(payload.get("seed", -1))
+        with self._slots:
+            with self._lock:
+                self.waiting -= 1
+            time.sleep(self.render_seconds(payload))
+            if fail:
+                with self._lock:
+                    self.failed += 1
+                return 500, {"error": "injected failure"}
+            png = render_png(payload.get("prompt", ""), seed, width, height)
+        with self._lock:
+            self.completed += 1
+        info = {"prompt": payload.get("prompt", ""), "width": width, "height": height, "seed": seed}
+        return 200, {
+            "images": [base64.b64encode(png).decode("ascii")],
+            "parameters": {k: v for k, v in payload.items() if k != "alwayson_scripts"},
+            "info": json.dumps(info),
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "config": asdict(self.config),
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+
+def _make_handler(standin: SdStandin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, standin.stats())
+            elif self.path == "/sdapi/v1/progress":
+                self._send_json(200, {"progress": 0.0, "state": {"job_count": standin.waiting}})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(422, {"error": "invalid JSON"})
+                return
+            if self.path != "/sdapi/v1/txt2img":
+                self._send_json(404, {"error": "not found"})
+                return
+            status, body = standin.txt2img(payload)
+            self._send_json(status, body)
+
+    return Handler
+
+
+def start_server(
+    host: str = "127.0.0.1", port: int = 0, config: Optional[SdStandinConfig] = None
+) -> Tuple[ThreadingHTTPServer, SdStandin]:
+    """Start the stand-in in a daemon thread (port 0 = pick a free port)."""
+    standin = SdStandin(config or SdStandinConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(standin))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="sd-standin", daemon=True).start()
+    return server, standin
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main():
+    defaults = SdStandinConfig()
+    parser = argparse.ArgumentParser(description="Automatic1111 txt2img stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--base-seconds", type=float, default=defaults.base_seconds)
+    parser.add_argument("--step-seconds", type=float, default=defaults.step_seconds)
+    parser.add_argument("--adetailer-seconds", type=float, default=defaults.adetailer_seconds)
+    parser.add_argument("--workers", type=int, default=defaults.workers, help="jobs rendered at once")
+    parser.add_argument("--max-queue", type=int, default=defaults.max_queue)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    config = SdStandinConfig(
+        base_seconds=args.base_seconds,
+        step_seconds=args.step_seconds,
+        adetailer_seconds=args.adetailer_seconds,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server, _ = start_server(args.host, args.port, config)
+    print(f"[SD stand-in] Listening on {server_url(server)} ({config})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from llm_pipeline import character_generator
+
+
+class _SlowRetriever:
+    def retrieve(self, query, k=3):
+        time.sleep(0.2)  # stands in for embedding, NumPy and BM25 work
+        return [{"id": "kiel.txt#1", "text": "Labskaus in the Kiel harbor"}]
+
+
+def test_retrieval_runs_off_the_event_loop(monkeypatch):
+    async def fake_chat_json_async(system_prompt, user_instruction):
+        return [{"name": "Hein", "murderer_label": True, "source_references": ["kiel.txt#1"]}]
+
+    monkeypatch.setattr(character_generator, "chat_json_async", fake_chat_json_async)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        characters = await character_generator.generate_characters_async({"location": "Kiel"}, 2, _SlowRetriever())
+        task.cancel()
+        return characters, ticks
+
+    characters, ticks = asyncio.run(main())
+    assert len(characters) == 2 and characters[0]["name"] == "Hein"
+    assert ticks >= 5  # the loop kept running while the retriever blocked
@@ -0,0 +1,10 @@
+from rag.embeddings import tokenize
+
+
+def test_tokenize_keeps_eszett_and_umlauts():
+    assert tokenize("Straße Fußball") == ["straße", "fußball"]
+    assert tokenize("Grünkohl mit Pinkel, Rote Grütze!") == ["grünkohl", "mit", "pinkel", "rote", "grütze"]
+
+
+def test_tokenize_splits_on_underscores_and_punctuation():
+    assert tokenize("Labskaus_Kiel 2024-05") == ["labskaus", "kiel", "2024", "05"]
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from llm_pipeline import export_jobs
+from llm_pipeline.pdf_cache import PdfCache
+
+
+def _setup(monkeypatch, tmp_path):
+    cache = PdfCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(export_jobs, "get_pdf_cache", lambda: cache)
+    monkeypatch.setattr(export_jobs, "archive_key", lambda data: f"zip-{data['id']}")
+    return cache
+
+
+def test_export_rendered_by_another_process_is_served_from_the_cache(monkeypatch, tmp_path):
+    cache = _setup(monkeypatch, tmp_path)
+    data = {"id": "m1"}
+    assert export_jobs.export_status("m1", data) == "none"
+
+    # Another worker is rendering: only its marker file is visible here
+    open(export_jobs._marker_path("m1"), "w").close()
+    assert export_jobs.export_status("m1", data) == "running"
+    assert export_jobs.get_export("m1", data) is None
+
+    cache.put("zip-m1", b"PK archive")
+    export_jobs.os.remove(export_jobs._marker_path("m1"))
+    assert export_jobs.export_status("m1", data) == "ready"
+    assert export_jobs.get_export("m1", data) == b"PK archive"
+
+
+def test_running_export_is_waited_for_briefly(monkeypatch, tmp_path):
+    _setup(monkeypatch, tmp_path)
+    release = threading.Event()
+    monkeypatch.setattr(export_jobs, "render_archive", lambda data: release.wait() and "zip-m2")
+    export_jobs.schedule_export("m2", {"id": "m2"})
+
+    started = time.monotonic()
+    assert export_jobs.get_export("m2", {"id": "m2"}, timeout=0.05) is None
+    assert time.monotonic() - started < 1
+    assert export_jobs.export_status("m2") == "running"
+    release.set()
+    assert export_jobs.drain_exports(5)
+    assert export_jobs.export_status("m2") == "ready"
+    assert not export_jobs._running_elsewhere("m2")
+
+
+def test_executor_is_created_once_under_concurrent_first_use(monkeypatch):
+    monkeypatch.setattr(export_jobs, "_executor", None)
+    barrier = threading.Barrier(8)
+    executors = []
+
+    def first_use():
+        barrier.wait()
+        executors.append(export_jobs._get_executor())
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(e) for e in executors}) == 1
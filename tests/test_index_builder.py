@@ -0,0 +1,17 @@
+from rag.index_builder import build_index
+from rag.retriever import RagRetriever
+
+
+def test_ids_keep_extension_so_same_stem_files_do_not_collide(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "foo.txt").write_text("Labskaus in the Kiel harbor", encoding="utf-8")
+    (corpus / "foo.md").write_text("Franzbrötchen from Hamburg", encoding="utf-8")
+    build_index(str(corpus), str(tmp_path / "index"))
+
+    # Incremental build: the reused rows get the same ID scheme
+    (corpus / "bar.txt").write_text("Rote Grütze", encoding="utf-8")
+    build_index(str(corpus), str(tmp_path / "index"))
+
+    ids = RagRetriever(index_path=str(tmp_path / "index")).ids
+    assert sorted(ids) == ["bar.txt#1", "foo.md#1", "foo.txt#1"]
@@ -0,0 +1,28 @@
+import json
+
+from openai import OpenAI
+
+from llm_pipeline import cassette, llm_client
+from standins import lm_studio_server
+
+
+def test_chat_record_then_replay_without_the_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(cassette, "_active", None)
+    server, standin = lm_studio_server.start_server(
+        config=lm_studio_server.LmStandinConfig(prefill_tps=1e9, decode_tps=1e9)
+    )
+    monkeypatch.setattr(llm_client, "client", OpenAI(base_url=lm_studio_server.server_url(server), api_key="test"))
+    path = str(tmp_path / "run.jsonl.gz")
+    system = "You design murder-mystery cases. Output JSON only."
+    prompt = "Create a murder mystery case in Kiel about a harbor scandal."
+
+    cassette.use_cassette(path, "record")
+    recorded = llm_client.chat_json(system, prompt)
+    server.shutdown()
+    server.server_close()
+    assert isinstance(recorded, dict) and "raw_text" not in recorded
+
+    replaying = cassette.use_cassette(path, "replay")
+    assert llm_client.chat_json(system, prompt) == recorded
+    assert replaying.stats()["replayed"] == 1 and replaying.stats()["fallbacks"] == 0
+    json.dumps(recorded)  # what the cassette stored is plain JSON
@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+from llm_pipeline.mystery_store import MysteryStore
+
+MYSTERY = {"case_data": {"title": "Tod im Hafen"}, "characters": [{"name": "Greta", "image_id": "p1"}]}
+
+
+def _set_accessed(store, mystery_id, accessed):
+    store._conn().execute("UPDATE mysteries SET accessed = ? WHERE id = ?", (accessed, mystery_id))
+
+
+def test_put_get_round_trip(tmp_path):
+    store = MysteryStore(str(tmp_path / "m.sqlite3"))
+    store.put("m1", MYSTERY)
+    assert store.get("m1") == MYSTERY
+    assert store.get("missing") is None and store.get(None) is None
+    assert store.referenced_portraits() == {"p1"}
+    # Another instance (another server process) sees the same rows
+    assert MysteryStore(str(tmp_path / "m.sqlite3")).get("m1") == MYSTERY
+
+
+def test_cleanup_deletes_only_mysteries_not_opened_within_the_ttl(tmp_path):
+    store = MysteryStore(str(tmp_path / "m.sqlite3"), ttl_seconds=100)
+    store.put("old", MYSTERY)
+    store.put("recent", {"characters": [{"image_id": "p2"}]})
+    now = time.time()
+    _set_accessed(store, "old", now - 200)
+    _set_accessed(store, "recent", now - 200)
+    # Opening a mystery refreshes its access time
+    assert store.get("recent") is not None
+
+    assert store.cleanup(now) == 1
+    assert store.get("old") is None and store.get("recent") is not None
+    # The expired mystery's portraits are no longer pinned
+    assert store.referenced_portraits() == {"p2"}
+
+
+def test_cleanup_runs_on_writes_at_most_once_per_interval(tmp_path):
+    store = MysteryStore(str(tmp_path / "m.sqlite3"), ttl_seconds=100, cleanup_interval=3600)
+    store.put("a", MYSTERY)  # first write runs the cleanup
+    _set_accessed(store, "a", time.time() - 200)
+    store.put("b", MYSTERY)  # within the interval: no cleanup
+    assert store.get("a") is not None
+
+    _set_accessed(store, "a", time.time() - 200)
+    store._last_cleanup -= 3600
+    store.put("c", MYSTERY)
+    assert store.get("a") is None and store.get("b") is not None
+
+
+def test_cleanup_failure_does_not_fail_the_write(tmp_path, monkeypatch):
+    store = MysteryStore(str(tmp_path / "m.sqlite3"))
+
+    def broken(now=None):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "cleanup", broken)
+    store.put("m1", MYSTERY)
+    assert store.get("m1") == MYSTERY
@@ -0,0 +1,41 @@
+import os
+
+from llm_pipeline.pdf_cache import PdfCache, content_key, tee_into_cache
+
+
+def test_hits_misses_and_content_keys(tmp_path):
+    cache = PdfCache(str(tmp_path))
+    key = content_key("menu", {"starter": "Labskaus", "main": "Aalsuppe"})
+    assert key == content_key("menu", {"main": "Aalsuppe", "starter": "Labskaus"})
+    assert cache.get(key) is None
+    cache.put(key, b"%PDF-1")
+    assert cache.get(key) == b"%PDF-1"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, 6)
+
+    # Overwriting a key replaces its size instead of adding to it
+    cache.put(key, b"%PDF-22")
+    assert cache.stats()["bytes"] == 7
+    # A new instance counts what is already on disk
+    assert PdfCache(str(tmp_path)).stats()["bytes"] == 7
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=250)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, b"x" * 100)
+        os.utime(cache._path(key), (i, i))
+    assert cache.get("a") is None and cache.get("b") is not None  # "a" was evicted; "b" is now the newest
+    cache.put("d", b"x" * 100)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert cache.stats()["bytes"] == 200
+
+
+def test_tee_stores_the_stream_only_once_complete(tmp_path):
+    cache = PdfCache(str(tmp_path))
+    stream = tee_into_cache(iter([b"PK", b"zip"]), cache, "archive")
+    assert next(stream) == b"PK"
+    assert cache.get("archive") is None
+    assert list(stream) == [b"zip"]
+    assert cache.get("archive") == b"PKzip"
@@ -0,0 +1,93 @@
+import pytest
+
+from llm_pipeline import pdf_generator
+
+MENU = {"starter": {"name": "Grüße aus Kiel", "ingredients": "Labskaus, Rote Bete", "preparation": "Kochen"}}
+
+
+@pytest.mark.skipif(pdf_generator._find_font_file() is None, reason="DejaVuSans.ttf not installed")
+def test_documents_share_the_parsed_font_but_embed_their_own_subset():
+    template = pdf_generator._parsed_font()
+    used_before = len(list(template.subset.items()))
+    first = pdf_generator.render_document("menu", (MENU,))
+    second = pdf_generator.render_document("menu", (MENU,))
+    assert first.startswith(b"%PDF-") and len(first) == len(second)
+    assert b"DejaVu" in second
+    # The per-process template is only copied, never drawn with
+    assert len(list(template.subset.items())) == used_before
+
+
+def test_render_pool_is_closed_and_restartable():
+    jobs = [(f"menu{i}.pdf", "menu", (MENU,)) for i in range(2)]
+    assert len(list(pdf_generator.render_documents(jobs, workers=2))) == 2
+    pdf_generator.close_render_pool()
+    assert pdf_generator._render_pool is None
+    assert len(list(pdf_generator.render_documents(jobs, workers=2))) == 2
+    pdf_generator.close_render_pool()
+
+
+def test_character_sheet_hides_portrait_bookkeeping(monkeypatch):
+    printed = []
+    monkeypatch.setattr(pdf_generator, "_kv", lambda pdf, key, value: printed.append(key))
+    character = {
+        "name": "Hein Mück",
+        "occupation": "Harbor pilot",
+        "image_id": "a" * 64,
+        "image_path": "/portraits/" + "a" * 64 + ".png",
+        "preview_image_id": "b" * 64,
+        "full_image_path": "/portraits/" + "a" * 64 + ".png",
+    }
+    pdf_generator._build_character_pdf(character, {"location": "Kiel"})
+    assert printed == ["Name", "Occupation"]
+
+
+def test_character_sheet_says_when_only_the_preview_portrait_exists(monkeypatch, tmp_path):
+    from PIL import Image
+
+    from image_tool import portrait_store
+
+    monkeypatch.setattr(portrait_store, "PORTRAIT_STORE_DIR", str(tmp_path))
+    Image.new("RGB", (8, 8)).save(tmp_path / ("b" * 64 + ".png"))
+    paragraphs = []
+    monkeypatch.setattr(pdf_generator, "_paragraph", lambda pdf, text: paragraphs.append(text))
+    character = {"name": "Hein Mück", "image_id": "a" * 64, "preview_image_id": "b" * 64}
+
+    pdf_generator._build_character_pdf(character, {"location": "Kiel"})
+    assert any(text.startswith("Preview portrait") for text in paragraphs)
+
+    Image.new("RGB", (8, 8)).save(tmp_path / ("a" * 64 + ".png"))
+    paragraphs.clear()
+    pdf_generator._build_character_pdf(character, {"location": "Kiel"})
+    assert not any(text.startswith("Preview portrait") for text in paragraphs)
+
+
+def test_image_cache_is_created_once_and_outside_the_pdf_cache(monkeypatch):
+    import os
+    import threading
+
+    from llm_pipeline import pdf_cache, pdf_images
+
+    monkeypatch.setattr(pdf_images, "_image_cache", None)
+    barrier = threading.Barrier(8)
+    caches = []
+
+    def first_use():
+        barrier.wait()
+        caches.append(pdf_images._get_image_cache())
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in caches}) == 1
+    image_dir = os.path.abspath(caches[0].directory)
+    assert not image_dir.startswith(os.path.abspath(pdf_cache.PDF_CACHE_DIR) + os.sep)
+
+
+@pytest.mark.skipif(pdf_generator._find_font_file("B") is None, reason="DejaVuSans-Bold.ttf not installed")
+def test_headings_use_the_bold_face():
+    pdf = pdf_generator._build_menu_pdf(MENU)
+    used = {key for key, font in pdf.fonts.items() if list(font.subset.items())}
+    assert {"dejavu", "dejavuB"} <= used
+    assert b"+DejaVuSansBold" in bytes(pdf.output())
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+
+from image_tool.portrait_store import PortraitStore
+
+
+def test_render_lock_serializes_an_id_and_is_dropped_after_release(tmp_path):
+    store = PortraitStore(str(tmp_path))
+    inside = []
+
+    def render(i):
+        with store.render_lock("abc"):
+            inside.append(i)
+            assert len(inside) == 1
+            time.sleep(0.01)
+            inside.remove(i)
+
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for i in range(100):
+        with store.render_lock(f"portrait-{i}"):
+            pass
+    assert store._key_locks == {}
+
+
+def test_eviction_keeps_portraits_of_stored_mysteries(tmp_path):
+    from llm_pipeline.mystery_store import MysteryStore
+
+    mysteries = MysteryStore(str(tmp_path / "mysteries.sqlite3"), ttl_seconds=60)
+    store = PortraitStore(str(tmp_path / "portraits"), max_bytes=2500, referenced=mysteries.referenced_portraits)
+    store.store("kept", b"x" * 1000)
+    mysteries.put("m1", {"characters": [{"name": "Hein", "image_id": "kept", "preview_image_id": "kept-preview"}]})
+
+    for i in range(3):
+        time.sleep(0.01)  # distinct mtimes: "kept" stays the least recently used file
+        store.store(f"new-{i}", b"x" * 1000)
+    assert store.lookup("kept") is not None
+    assert store.lookup("new-0") is None
+
+    # Once the mystery expires, its portraits are ordinary LRU entries again
+    mysteries.cleanup(now=time.time() + 120)
+    assert mysteries.referenced_portraits() == set()
+    os.utime(store.path_for("kept"), (0, 0))
+    store.store("new-3", b"x" * 1000)
+    assert store.lookup("kept") is None
@@ -0,0 +1,24 @@
+import tracemalloc
+
+from llm_pipeline.profiling import StageProfiler
+
+
+def test_memory_stage_stops_tracemalloc_it_started(tmp_path):
+    profiler = StageProfiler(cpu=False, memory=True, directory=str(tmp_path))
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            data = [bytes(1000) for _ in range(100)]
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    assert [record["stage"] for record in profiler._memory_stages] == ["inner", "outer"]
+    del data
+
+
+def test_memory_stage_leaves_tracing_started_elsewhere_on(tmp_path):
+    tracemalloc.start()
+    try:
+        with StageProfiler(cpu=False, memory=True, directory=str(tmp_path)).stage("stage"):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,52 @@
+import time
+
+from rag import registry as registry_module
+from rag.index_builder import build_index
+from rag.registry import RetrieverRegistry
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_failed_initial_load_serves_one_empty_retriever_until_index_is_valid(tmp_path, monkeypatch, capsys):
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    (index_dir / "vectors.npy").write_bytes(b"not a numpy file")
+    (index_dir / "ids.json").write_text('["doc#1"]', encoding="utf-8")
+
+    loads = []
+    real_retriever = registry_module.RagRetriever
+
+    def counting_retriever(*args, **kwargs):
+        if kwargs.get("load", True):
+            loads.append(kwargs)
+        return real_retriever(*args, **kwargs)
+
+    monkeypatch.setattr(registry_module, "RagRetriever", counting_retriever)
+    registry = RetrieverRegistry(str(index_dir), poll_seconds=0.05).start()
+    try:
+        first = registry.get(timeout=5)
+        time.sleep(0.3)  # several polls of the unchanged broken index
+        second = registry.get(timeout=5)
+
+        assert first is second
+        assert len(first) == 0
+        assert len(loads) == 1  # not retried per request or per poll
+        assert registry.stats()["load_error"]
+        assert capsys.readouterr().out.count("Could not load retrieval index") == 1
+
+        corpus = tmp_path / "corpus"
+        corpus.mkdir()
+        (corpus / "kiel.txt").write_text("Labskaus at the Kiel harbor", encoding="utf-8")
+        build_index(str(corpus), str(index_dir))
+
+        assert _wait_for(lambda: len(registry.get()) == 1)
+        assert registry.stats()["load_error"] is None
+    finally:
+        registry.stop()
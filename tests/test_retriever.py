@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from rag.bm25 import BM25Index
+from rag.index_builder import build_index
+from rag.retriever import RagRetriever
+
+
+def _build(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "kiel.txt").write_text("Labskaus in the Kiel harbor", encoding="utf-8")
+    (corpus / "hamburg.txt").write_text("Franzbrötchen at the Hamburg Fischmarkt", encoding="utf-8")
+    build_index(str(corpus), str(tmp_path / "index"))
+    return RagRetriever(index_path=str(tmp_path / "index"), mode="bm25")
+
+
+def test_bm25_postings_are_loaded_memory_mapped(tmp_path):
+    retriever = _build(tmp_path)
+    assert isinstance(retriever.bm25.rows, np.memmap)
+    assert retriever.memory_footprint()["mapped_bytes"] > 0
+
+    rebuilt = BM25Index(retriever.metadata.get(row)["text"] for row in range(len(retriever)))
+    for query in ("fischmarkt", "kiel harbor", "the"):
+        rows, scores = retriever.bm25.search(query, 5)
+        expected_rows, expected_scores = rebuilt.search(query, 5)
+        assert rows.tolist() == expected_rows.tolist()
+        assert np.allclose(scores, expected_scores)
+    assert retriever.retrieve("Fischmarkt", k=1)[0]["id"] == "hamburg.txt#1"
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    retriever = _build(tmp_path)
+    with pytest.raises(ValueError):
+        retriever.retrieve("Kiel", mode="hybird")
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from llm_pipeline.scheduler import LlmScheduler, QueueFull, current_job
+
+
+def test_admission_beyond_the_limits_raises_queue_full():
+    scheduler = LlmScheduler(max_jobs=3, max_jobs_per_tenant=2)
+    a1 = scheduler.admit("a")
+    scheduler.admit("a")
+    with pytest.raises(QueueFull) as per_tenant:
+        scheduler.admit("a")
+    assert per_tenant.value.retry_after >= 1
+    scheduler.admit("b")
+    with pytest.raises(QueueFull):
+        scheduler.admit("c")
+    assert scheduler.stats()["rejected_jobs"] == 2
+
+    # A finished job frees its place, also when the job body raised
+    scheduler.finish(a1)
+    with pytest.raises(RuntimeError):
+        with scheduler.job("c"):
+            raise RuntimeError("generation failed")
+    assert len(scheduler._jobs) == 2
+    assert scheduler.status("c")["position"] == 0
+
+
+def test_waiting_calls_are_served_by_priority_then_oldest_job_per_tenant():
+    scheduler = LlmScheduler(max_concurrency=1, max_jobs_per_tenant=5)
+    a1, a2, a3 = (scheduler.admit("a") for _ in range(3))
+    b1 = scheduler.admit("b")
+    c1 = scheduler.admit("c", "batch")
+    served = []
+
+    async def call(name, job):
+        current_job.set(job)
+        async with scheduler.slot_async():
+            served.append(name)
+
+    async def main():
+        async with scheduler.slot_async():
+            # Queued in the worst order: the batch call and tenant a's later jobs first
+            tasks = []
+            for name, job in (("c1", c1), ("a3", a3), ("a2", a2), ("a1", a1), ("b1", b1)):
+                tasks.append(asyncio.create_task(call(name, job)))
+                await asyncio.sleep(0)
+            assert scheduler.stats()["waiting_calls"] == 5
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    # b's only job does not wait behind a's second and third
+    assert served == ["a1", "b1", "a2", "a3", "c1"]
+    assert scheduler.status("b")["position"] == 2
+    assert scheduler.stats()["running_calls"] == 0
+
+
+def _post(app_, path="/", body=b"location=Hamburg"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [], "client": ("127.0.0.1", 1)}
+    asyncio.run(app_(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+
+def test_generation_answers_429_when_full_and_releases_its_job_on_failure(monkeypatch):
+    import asgi
+
+    scheduler = LlmScheduler(max_jobs=1)
+    monkeypatch.setattr(asgi, "get_scheduler", lambda: scheduler)
+
+    async def failing(form):
+        raise RuntimeError("LLM backend down")
+
+    monkeypatch.setattr(asgi, "generate_mystery", failing)
+    app_ = asgi.MysteryASGI(lambda environ, start_response: [])
+    status, _ = _post(app_)
+    assert status == 500
+    assert scheduler._jobs == []
+
+    scheduler.admit("someone else")
+    status, headers = _post(app_)
+    assert status == 429
+    assert int(headers[b"retry-after"]) >= 1
+    assert len(scheduler._jobs) == 1
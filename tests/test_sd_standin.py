@@ -0,0 +1,32 @@
+from image_tool import image_generator
+from image_tool.portrait_store import PortraitStore
+from llm_pipeline import cassette
+from standins import sd_server
+
+
+def test_txt2img_record_then_replay_without_the_server(monkeypatch, tmp_path):
+    monkeypatch.setattr(cassette, "_active", None)
+    server, standin = sd_server.start_server(
+        config=sd_server.SdStandinConfig(base_seconds=0, step_seconds=0, adetailer_seconds=0)
+    )
+    monkeypatch.setattr(image_generator, "SD_API_URL", sd_server.server_url(server))
+    path = str(tmp_path / "run.jsonl.gz")
+
+    monkeypatch.setattr(image_generator, "get_portrait_store", lambda: PortraitStore(str(tmp_path / "recorded")))
+    cassette.use_cassette(path, "record")
+    recorded = image_generator._raw_generate_image_api("harbor pilot, portrait", "blurry", "Hein", profile="preview")
+    server.shutdown()
+    server.server_close()
+    assert standin.completed == 1
+    with open(recorded, "rb") as f:
+        png = f.read()
+    assert png.startswith(b"\x89PNG")
+
+    # Fresh store and no server: the render comes from the cassette
+    monkeypatch.setattr(image_generator, "get_portrait_store", lambda: PortraitStore(str(tmp_path / "replayed")))
+    replaying = cassette.use_cassette(path, "replay")
+    replayed = image_generator._raw_generate_image_api("harbor pilot, portrait", "blurry", "Hein", profile="preview")
+    assert replayed != recorded
+    with open(replayed, "rb") as f:
+        assert f.read() == png
+    assert replaying.stats()["replayed"] == 1 and replaying.stats()["fallbacks"] == 0
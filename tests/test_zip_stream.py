@@ -0,0 +1,26 @@
+import io
+import zipfile
+
+from llm_pipeline.zip_stream import stream_zip
+
+
+def test_streamed_zip_is_a_valid_archive(tmp_path):
+    files = [("menu.pdf", b"%PDF-menu" * 100), ("character_Hein_Mück.pdf", b"%PDF-hein"), ("empty.pdf", b"")]
+    produced = []
+
+    def members():
+        for name, data in files:
+            produced.append(name)
+            yield name, data
+
+    chunks = []
+    for chunk in stream_zip(members(), copy_to=str(tmp_path / "copy.zip")):
+        # Each member is sent before the next one is even produced
+        chunks.append((chunk, len(produced)))
+    assert [count for _, count in chunks[: len(files)]] == [1, 2, 3]
+
+    data = b"".join(chunk for chunk, _ in chunks)
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert [(i.filename, archive.read(i)) for i in archive.infolist()] == files
+    assert (tmp_path / "copy.zip").read_bytes() == data